@@ -0,0 +1,227 @@
+import os
+import queue
+import smtplib
+import threading
+import time
+from datetime import datetime
+from email.message import EmailMessage
+
+import requests
+
+# Defaults, overridable from .env
+ALERT_SMTP_HOST = os.getenv('ALERT_SMTP_HOST', 'smtp.gmail.com')
+ALERT_SMTP_PORT = int(os.getenv('ALERT_SMTP_PORT', 465))
+ALERT_SMTP_SSL = os.getenv('ALERT_SMTP_SSL', 'true').lower() == 'true'
+ALERT_SENDER = os.getenv('ALERT_SENDER', '')
+ALERT_PASSWORD = os.getenv('ALERT_PASSWORD', '')
+ALERT_RECIPIENTS = os.getenv('ALERT_RECIPIENTS', '')
+ALERT_DIGEST_WINDOW = float(os.getenv('ALERT_DIGEST_WINDOW', 30))
+ALERT_MAX_QUEUE = int(os.getenv('ALERT_MAX_QUEUE', 1000))
+ALERT_LOCATION_URL = os.getenv('ALERT_LOCATION_URL', 'https://ipinfo.io')
+ALERT_LOCATION_TTL = int(os.getenv('ALERT_LOCATION_TTL', 3600))
+ALERT_LOCATION_TIMEOUT = float(os.getenv('ALERT_LOCATION_TIMEOUT', 3))
+SMTP_TIMEOUT = 10
+SMTP_IDLE_SECONDS = 120
+
+
+class AlertDispatcher:
+    """
+    Sends military-mode activation alerts without blocking the request.
+
+    `notify` only puts the event on a bounded queue. A background thread waits
+    `digest_window` seconds after the first event of a burst and then sends every event
+    collected so far as one digest email. The server location is looked up with a
+    timeout and cached for `location_ttl` seconds. The SMTP connection is kept open
+    between digests and closed after SMTP_IDLE_SECONDS without alerts. Host, port and
+    TLS are configurable, so a local SMTP stub can stand in for the real server.
+
+    Alerts are disabled (`notify` returns False) until a sender and at least one
+    recipient are configured. The password is optional for servers that don't log in.
+    """
+
+    def __init__(self, host=ALERT_SMTP_HOST, port=ALERT_SMTP_PORT, use_ssl=ALERT_SMTP_SSL,
+                 sender=ALERT_SENDER, password=ALERT_PASSWORD, recipients=ALERT_RECIPIENTS,
+                 digest_window=ALERT_DIGEST_WINDOW, max_queue=ALERT_MAX_QUEUE,
+                 location_url=ALERT_LOCATION_URL, location_ttl=ALERT_LOCATION_TTL,
+                 location_timeout=ALERT_LOCATION_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.use_ssl = use_ssl
+        self.sender = sender
+        self.password = password
+        self.recipients = [r.strip() for r in recipients.split(',') if r.strip()] \
+            if isinstance(recipients, str) else list(recipients)
+        self.digest_window = digest_window
+        self.location_url = location_url
+        self.location_ttl = location_ttl
+        self.location_timeout = location_timeout
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._smtp = None
+        self._smtp_used_at = 0.0
+        self._location = None
+        self._location_expires = 0.0
+        self._thread = None
+        self._thread_pid = None
+        self._start_lock = threading.Lock()
+        self._idle = threading.Event()
+        self._idle.set()
+        self.alerts_queued = 0
+        self.alerts_dropped = 0
+        self.alerts_skipped = 0
+        self.digests_sent = 0
+        self.send_failures = 0
+        self.connections_opened = 0
+
+    # --- Producer side ---
+    @property
+    def enabled(self):
+        return bool(self.sender and self.recipients)
+
+    def notify(self, **details):
+        """Queue an activation alert. Never blocks; returns False if alerts are disabled or the queue is full."""
+        if not self.enabled:
+            if not self.alerts_skipped:
+                print("Alert dispatcher: ALERT_SENDER or ALERT_RECIPIENTS is not set; military mode alerts are disabled")
+            self.alerts_skipped += 1
+            return False
+        self._ensure_started()
+        event = {'time': datetime.utcnow().isoformat(timespec='seconds') + 'Z', **details}
+        try:
+            self._idle.clear()
+            self._queue.put_nowait(event)
+            self.alerts_queued += 1
+            return True
+        except queue.Full:
+            self.alerts_dropped += 1
+            return False
+
+    def _ensure_started(self):
+        # Start lazily so each forked worker gets its own dispatcher thread
+        if self._thread is not None and self._thread_pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or self._thread_pid != os.getpid() or not self._thread.is_alive():
+                self._smtp = None  # never share a socket inherited from the parent
+                self._thread = threading.Thread(target=self._run, name='alert-dispatcher', daemon=True)
+                self._thread_pid = os.getpid()
+                self._thread.start()
+
+    def wait_idle(self, timeout=None):
+        """Block until every queued alert has been sent (or failed). Useful in tests."""
+        return self._idle.wait(timeout)
+
+    # --- Location ---
+    def location(self):
+        now = time.monotonic()
+        if self._location is None or now >= self._location_expires:
+            try:
+                res = requests.get(self.location_url, timeout=self.location_timeout).json()
+                self._location = f"Location: {res.get('city')}, {res.get('region')}, {res.get('country')}"
+                self._location_expires = now + self.location_ttl
+            except Exception as e:
+                print(f"Alert dispatcher: location lookup failed: {e}")
+                # Retry on the next digest rather than caching the failure for the full TTL
+                return self._location or "Location not available."
+        return self._location
+
+    # --- SMTP ---
+    def _connect(self):
+        if self.use_ssl:
+            server = smtplib.SMTP_SSL(self.host, self.port, timeout=SMTP_TIMEOUT)
+        else:
+            server = smtplib.SMTP(self.host, self.port, timeout=SMTP_TIMEOUT)
+        if self.password:
+            server.login(self.sender, self.password)
+        self.connections_opened += 1
+        return server
+
+    def _close_smtp(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                pass
+            self._smtp = None
+
+    def _send(self, message):
+        # Reuse the open connection; if the server dropped it, reconnect once
+        for attempt in (1, 2):
+            try:
+                if self._smtp is None:
+                    self._smtp = self._connect()
+                self._smtp.send_message(message)
+                self._smtp_used_at = time.monotonic()
+                return True
+            except (smtplib.SMTPServerDisconnected, ConnectionError) as e:
+                self._smtp = None
+                if attempt == 2:
+                    print(f"Alert dispatcher: email failed: {e}")
+            except Exception as e:
+                print(f"Alert dispatcher: email failed: {e}")
+                self._close_smtp()
+                break
+        return False
+
+    # --- Digest ---
+    def _compose(self, events, location):
+        message = EmailMessage()
+        message['From'] = self.sender
+        message['To'] = ', '.join(self.recipients)
+        if len(events) == 1:
+            message['Subject'] = "Military Mode Activated"
+        else:
+            message['Subject'] = f"Military Mode Activated ({len(events)} times)"
+        lines = ["Military Mode Alert!", "", location, ""]
+        for event in events:
+            lines.append(', '.join(f"{key}: {value}" for key, value in event.items()))
+        message.set_content('\n'.join(lines))
+        return message
+
+    def _collect(self):
+        try:
+            first = self._queue.get(timeout=SMTP_IDLE_SECONDS)
+        except queue.Empty:
+            return []
+        events = [first]
+        deadline = time.monotonic() + self.digest_window
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                events.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        # Anything that arrived in the meantime goes into this digest too
+        while True:
+            try:
+                events.append(self._queue.get_nowait())
+            except queue.Empty:
+                return events
+
+    def _run(self):
+        while True:
+            events = self._collect()
+            if events:
+                if self._send(self._compose(events, self.location())):
+                    self.digests_sent += 1
+                    print(f"Alert digest with {len(events)} alert(s) sent to {', '.join(self.recipients)}")
+                else:
+                    self.send_failures += 1
+            elif self._smtp is not None and time.monotonic() - self._smtp_used_at >= SMTP_IDLE_SECONDS:
+                self._close_smtp()
+            if self._queue.empty():
+                self._idle.set()
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'queue_depth': self._queue.qsize(),
+            'alerts_queued': self.alerts_queued,
+            'alerts_dropped': self.alerts_dropped,
+            'alerts_skipped': self.alerts_skipped,
+            'digests_sent': self.digests_sent,
+            'send_failures': self.send_failures,
+            'connections_opened': self.connections_opened,
+            'connected': self._smtp is not None,
+        }
@@ -1,12 +1,10 @@
-from flask import Flask, after_this_request, render_template, request, jsonify, send_file, abort, redirect, url_for, flash
-import speech_recognition as sr
-from gtts import gTTS
+from flask import Flask, Response, current_app, render_template, request, jsonify, send_file, abort, redirect, url_for, flash, stream_with_context
 import os
+import io
 import uuid
-from deep_translator import GoogleTranslator
-import requests
+import base64
 import time
-from threading import Thread
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FutureTimeoutError
 from flask_login import (
     LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 )
@@ -16,44 +14,35 @@ from wtforms.validators import DataRequired, Email, Length, EqualTo, ValidationE
 from flask_wtf.file import FileAllowed
 from dotenv import load_dotenv, find_dotenv
 from datetime import datetime
-from werkzeug.utils import secure_filename
 import bcrypt
-from security import init_app
-from google.cloud import texttospeech
-from routes.security_routes import security_bp
-from cryptography.fernet import InvalidToken
 import json
-from flask_migrate import Migrate
-from supabase import create_client, Client
-import smtplib
-
-# --- NEW Imports --- 
-from google.cloud import speech
-from google.cloud import translate_v2 as translate # Use v2 for simplicity
-
-import yt_dlp
-from yt_dlp.utils import DownloadError
-from pydub import AudioSegment # <-- Import pydub
-
-# --- Load .env --- 
-print("--- Attempting to load .env file ---")
-# Use find_dotenv() to explicitly locate the file and check existence
-dotenv_path = find_dotenv()
-if dotenv_path:
-    print(f"--- Found .env file at: {dotenv_path} ---")
-    # Load verbosely, override existing vars if needed
-    loaded = load_dotenv(dotenv_path=dotenv_path, verbose=True, override=True)
-    print(f"--- load_dotenv() returned: {loaded} ---")
-else:
-    print("--- WARNING: .env file not found! --- ")
-
-# --- Explicitly Check Environment Variables --- 
-db_url_from_env = os.getenv('DATABASE_URL')
-print(f"--- Value of os.getenv('DATABASE_URL'): {db_url_from_env} ---")
-gcp_creds_from_env = os.getenv('GOOGLE_APPLICATION_CREDENTIALS')
-print(f"--- Value of os.getenv('GOOGLE_APPLICATION_CREDENTIALS'): {gcp_creds_from_env} ---")
-gcs_bucket_from_env = os.getenv('GCS_BUCKET_NAME')
-print(f"--- Value of os.getenv('GCS_BUCKET_NAME'): {gcs_bucket_from_env} ---")
+import queue
+
+# --- Load .env ---
+# Loaded once, before the modules below read their defaults from the environment
+load_dotenv(find_dotenv(), override=True)
+
+from security import SecurityManager, EnvelopeEncryptor, PUBLIC_DEFAULT_SECRETS, StreamEncryptor, decrypt_stream, stream_plaintext_size, STREAM_SUFFIX
+from routes.security_routes import security_bp
+from route_registry import RouteRegistry
+from translation_cache import cached_translate, translation_cache
+from sentence_pipeline import translate_and_synthesize_sentences
+from audio_store import AudioStore, publish_artifact, fetch_artifact
+from audio_janitor import ArtifactJanitor
+from alert_dispatcher import AlertDispatcher
+from jobs import JobQueue, QueueFullError
+from shared_state import get_state_backend, make_cache
+from history_writer import WriteBehindBuffer
+from long_audio import MAX_CHUNK_MS, RECOGNITION_SAMPLE_RATE, recognize_long_audio
+from audio_pipeline import AudioDecodeError, decode_to_pcm
+from audio_probe import probe_audio, passthrough_encoding
+from streaming_stt import StreamingSessionManager, format_sse
+from gcp_clients import ClientRegistry, registry as gcp_clients, get_speech_client, get_tts_client
+from cryptography.fernet import Fernet, InvalidToken
+
+# Heavy libraries (google-cloud, pydub, yt-dlp, gTTS, speech_recognition, supabase)
+# are imported by the code that needs them, and API clients are created on first
+# use, so importing this module and building the app with create_app() stay cheap.
 
 
 # --- Language Map ---
@@ -87,84 +76,42 @@ language_map = {
     'ar-SA': 'Arabic'
 }
 
-# --- Import the new YouTube processing function ---
-from youtube_feature import process_youtube_video
-
-# --- Load .env --- 
-print("--- Attempting to load .env file ---")
-# Use find_dotenv() to explicitly locate the file and check existence
-dotenv_path = find_dotenv()
-if dotenv_path:
-    print(f"--- Found .env file at: {dotenv_path} ---")
-    # Load verbosely, override existing vars if needed
-    loaded = load_dotenv(dotenv_path=dotenv_path, verbose=True, override=True)
-    print(f"--- load_dotenv() returned: {loaded} ---")
-else:
-    print("--- WARNING: .env file not found! --- ")
-
-# --- Explicitly Check DATABASE_URL --- 
-db_url_from_env = os.getenv('DATABASE_URL')
-print(f"--- Value of os.getenv('DATABASE_URL'): {db_url_from_env} ---")
-
-gcp_creds_from_env = os.getenv('GOOGLE_APPLICATION_CREDENTIALS')
-print(f"--- Value of os.getenv('GOOGLE_APPLICATION_CREDENTIALS'): {gcp_creds_from_env} ---")
-
-
-# --- GCS Bucket Configuration ---
-GCS_BUCKET_NAME_FROM_ENV = os.getenv('GCS_BUCKET_NAME')
-print(f"--- Value of os.getenv('GCS_BUCKET_NAME'): {GCS_BUCKET_NAME_FROM_ENV} ---")
-
-# --- TTS Timeout Configuration ---
-
-
-# --- App Initialization and Configuration ---
-app = Flask(__name__, instance_relative_config=True)
-
-# Set secret key for CSRF protection
-app.config['SECRET_KEY'] = os.getenv('FLASK_SECRET_KEY', 'dev-secret-key-please-change-in-production')
-
-# Set GCS bucket name and verify configuration
-app.config['GCS_BUCKET_NAME'] = os.getenv('GCS_BUCKET_NAME')
-if not app.config['GCS_BUCKET_NAME']:
-    print("Warning: GCS_BUCKET_NAME not set in environment variables")
-else:
-    print(f"GCS Bucket Name configured: {app.config['GCS_BUCKET_NAME']}")
-
-# Verify Google Cloud credentials
-gcp_credentials_path = os.getenv('GOOGLE_APPLICATION_CREDENTIALS')
-if not gcp_credentials_path:
-    print("Warning: GOOGLE_APPLICATION_CREDENTIALS not set in environment variables")
-elif not os.path.exists(gcp_credentials_path):
-    print(f"Warning: Google Cloud credentials file not found at {gcp_credentials_path}")
-else:
-    print(f"Google Cloud credentials found at: {gcp_credentials_path}")
-
-# --- Supabase Configuration ---
-supabase_url = os.getenv('SUPABASE_URL')
-supabase_key = os.getenv('SUPABASE_KEY')
-if not supabase_url or not supabase_key:
-    print("Warning: Supabase configuration incomplete")
-else:
-    print("Supabase configuration verified")
-supabase: Client = create_client(supabase_url, supabase_key)
-
-# --- Initialize Login Manager ---
+# --- Supabase ---
+def _create_supabase_client():
+    from supabase import create_client
+    supabase_url = os.getenv('SUPABASE_URL')
+    supabase_key = os.getenv('SUPABASE_KEY')
+    if not supabase_url or not supabase_key:
+        raise RuntimeError("Supabase configuration incomplete (SUPABASE_URL / SUPABASE_KEY)")
+    return create_client(supabase_url, supabase_key)
+
+# Created on first query and shared per process, like the Google Cloud clients
+supabase_clients = ClientRegistry({'supabase': _create_supabase_client})
+
+def get_supabase():
+    return supabase_clients.get('supabase')
+
+# --- Login Manager ---
 login_manager = LoginManager()
-login_manager.init_app(app)
 login_manager.login_view = 'login'
 
-# --- Initialize Google Cloud Services ---
-speech_client = speech.SpeechClient()
-translate_client = translate.Client()
-
-# --- Initialize TTS Clients ---
+# --- Routes ---
+# Views register here at import time and are attached to the app by create_app()
+routes = RouteRegistry()
 
+# --- Shared State ---
+# With STATE_BACKEND=sqlite (several workers on one host) or redis (several hosts),
+# caches, job records and audio artifacts are shared, so any worker can answer any
+# request. The default, memory, keeps everything in the process as before. Live
+# streaming sessions always stay in the process that opened them.
+state_backend = get_state_backend()
 
 # --- Initialize YouTube Processing ---
-yt_dlp.utils.std_headers['User-Agent'] = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+# Videos are processed by a bounded background pool so web workers stay free
+youtube_jobs = JobQueue('youtube', store=state_backend)
 
 # --- Add Security Headers ---
-@app.after_request
+@routes.after_request
 def add_security_headers(response):
     response.headers['X-Content-Type-Options'] = 'nosniff'
     response.headers['X-Frame-Options'] = 'SAMEORIGIN'
@@ -172,32 +119,99 @@ def add_security_headers(response):
     return response
 
 # --- Context Processor ---
-@app.context_processor
+@routes.context_processor
 def inject_now():
     return {'datetime': datetime}
 
-
-# --- Main Execution ---
-if __name__ == '__main__':
-    print("Starting Flask server...")
-    app.run(debug=os.environ.get('FLASK_DEBUG', 'False').lower() == 'true',
-            host=os.environ.get('FLASK_RUN_HOST', '127.0.0.1'),
-            port=int(os.environ.get('FLASK_RUN_PORT', 5000)))
-
 # --- Audio Folder Setup ---
 audio_folder = os.path.join(os.getcwd(), 'audio')
 if not os.path.exists(audio_folder):
     os.makedirs(audio_folder)
-app.config['UPLOAD_FOLDER'] = audio_folder
+# Uploads are processed in memory, so cap their size
+MAX_UPLOAD_BYTES = int(os.getenv('MAX_UPLOAD_BYTES', 25 * 1024 * 1024))
+
+# --- Deduplicated TTS Audio Store ---
+audio_store = AudioStore(audio_folder)
+audio_store.shared = state_backend
+
+# --- Audio Artifact Janitor ---
+# One background thread expires temporary files in audio/ (store blobs are left to
+# the store). Leftovers from a previous run are picked up at startup.
+PLAYED_ARTIFACT_TTL = int(os.getenv('PLAYED_ARTIFACT_TTL', 60))
+# Browser cache lifetime for immutable store blobs served by /play
+PLAY_CACHE_MAX_AGE = int(os.getenv('PLAY_CACHE_MAX_AGE', 31536000))
+audio_janitor = ArtifactJanitor(audio_folder, protected=audio_store.is_store_filename)
+audio_store.in_use = audio_janitor.is_in_flight
+audio_janitor.adopt_existing()
+
+# --- Military Mode Artifacts ---
+# Encrypted audio is decrypted on the fly by /play. The key is held in memory only,
+# for as long as the artifact itself lives. With a shared backend it is wrapped with
+# the keyring first, so the backend never holds a usable key.
+SECURE_ARTIFACT_TTL = int(os.getenv('SECURE_ARTIFACT_TTL', 300))
+secure_artifact_keys = make_cache('secure_artifact_keys', SECURE_ARTIFACT_TTL)
+
+def remember_secure_artifact(filename, key, owner):
+    if state_backend is not None:
+        key = security_manager.keyring.encrypt(key.encode())
+    secure_artifact_keys.set(filename, {'key': key, 'owner': owner})
+
+def secure_artifact_secret(filename):
+    secret = secure_artifact_keys.get(filename)
+    if secret and state_backend is not None:
+        try:
+            secret = {**secret, 'key': security_manager.keyring.decrypt(secret['key']).decode()}
+        except InvalidToken:
+            return None
+    return secret
 
 # Using the existing language map defined earlier in the file
 
-# --- Initialize API Clients ---
-speech_client = speech.SpeechClient()
-translate_client = translate.Client()
+# --- Translation Worker Pool ---
+# Bounded pool shared by all requests; each target language of /upload_translate
+# runs as one task so N targets take roughly as long as the slowest one.
+TRANSLATION_MAX_WORKERS = int(os.getenv('TRANSLATION_MAX_WORKERS', 8))
+translation_executor = ThreadPoolExecutor(max_workers=TRANSLATION_MAX_WORKERS, thread_name_prefix='translate')
+
+# --- Live Streaming Sessions ---
+streaming_sessions = StreamingSessionManager()
+# Comment line sent on otherwise idle SSE streams so proxies keep them open
+STREAM_KEEPALIVE_SECONDS = 15
+
+# --- Password Hashing Pool ---
+# bcrypt is deliberately slow; run it on a small dedicated pool so a burst of
+# logins can't occupy every request thread.
+BCRYPT_MAX_WORKERS = int(os.getenv('BCRYPT_MAX_WORKERS', 2))
+BCRYPT_TIMEOUT = int(os.getenv('BCRYPT_TIMEOUT', 10))
+bcrypt_executor = ThreadPoolExecutor(max_workers=BCRYPT_MAX_WORKERS, thread_name_prefix='bcrypt')
+
+def run_bcrypt(fn, *args):
+    future = bcrypt_executor.submit(fn, *args)
+    try:
+        return future.result(timeout=BCRYPT_TIMEOUT)
+    except FutureTimeoutError:
+        # Nobody is waiting for it any more, so don't let it hold a worker once it reaches the front
+        future.cancel()
+        raise
+
+def hash_password(password):
+    return run_bcrypt(lambda: bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8'))
 
-# --- Initialize TTS Clients ---
-tts_client = texttospeech.TextToSpeechClient()
+# Shown (with a 503) when the bcrypt pool times out, so overload doesn't read as a wrong password
+PASSWORD_POOL_BUSY_MESSAGE = 'The server is busy right now. Please try again in a moment.'
+
+def verify_password(password, stored_hash):
+    """Check a password against its hash. Raises FutureTimeoutError if the bcrypt pool is saturated."""
+    if not stored_hash:
+        return False
+    try:
+        return run_bcrypt(bcrypt.checkpw, password.encode('utf-8'), stored_hash.encode('utf-8'))
+    except FutureTimeoutError:
+        print(f"Error verifying password: timed out after {BCRYPT_TIMEOUT}s waiting for the bcrypt pool")
+        raise
+    except Exception as e:
+        print(f"Error verifying password: {e}")
+        return False
 
 # --- User Class ---
 class User(UserMixin):
@@ -209,7 +223,7 @@ class User(UserMixin):
     @staticmethod
     def get(user_id):
         try:
-            response = supabase.table('users').select('*').eq('id', user_id).execute()
+            response = get_supabase().table('users').select('*').eq('id', user_id).execute()
             if response.data:
                 user_data = response.data[0]
                 return User(
@@ -224,7 +238,7 @@ class User(UserMixin):
     @staticmethod
     def get_by_email(email):
         try:
-            response = supabase.table('users').select('*').eq('email', email).execute()
+            response = get_supabase().table('users').select('*').eq('email', email).execute()
             if response.data:
                 user_data = response.data[0]
                 return User(
@@ -236,27 +250,60 @@ class User(UserMixin):
             print(f"Error fetching user by email: {e}")
         return None
 
+    @staticmethod
+    def get_with_password_hash(email):
+        """Fetch a user and their password hash in one query, for login."""
+        try:
+            response = get_supabase().table('users').select('id, email, is_admin, password_hash').eq('email', email).execute()
+            if response.data:
+                user_data = response.data[0]
+                user = User(
+                    id=user_data['id'],
+                    email=user_data['email'],
+                    is_admin=user_data.get('is_admin', False)
+                )
+                return user, user_data.get('password_hash')
+        except Exception as e:
+            print(f"Error fetching user for login: {e}")
+        return None, None
+
     def set_password(self, password):
         try:
-            hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-            supabase.table('users').update({'password_hash': hashed_password}).eq('id', self.id).execute()
+            hashed_password = hash_password(password)
+            get_supabase().table('users').update({'password_hash': hashed_password}).eq('id', self.id).execute()
         except Exception as e:
             print(f"Error setting password: {e}")
+        finally:
+            user_cache.invalidate(self.id)
 
     def check_password(self, password):
         try:
-            response = supabase.table('users').select('password_hash').eq('id', self.id).execute()
+            response = get_supabase().table('users').select('password_hash').eq('id', self.id).execute()
             if response.data:
                 stored_hash = response.data[0]['password_hash']
-                return bcrypt.checkpw(password.encode('utf-8'), stored_hash.encode('utf-8'))
+                return verify_password(password, stored_hash)
+        except FutureTimeoutError:
+            raise
         except Exception as e:
             print(f"Error checking password: {e}")
         return False
 
+# --- User Cache ---
+# Identity is looked up on every authenticated request; keep it in memory for a
+# short while instead of querying Supabase each time. Password changes invalidate it.
+USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', 300))
+user_cache = make_cache('users', USER_CACHE_TTL)
+
 # --- User Loader Callback ---
 @login_manager.user_loader
 def load_user(user_id):
-    return User.get(user_id)
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        return User(**cached)
+    user = User.get(user_id)
+    if user:
+        user_cache.set(user_id, {'id': user.id, 'email': user.email, 'is_admin': user.is_admin})
+    return user
 
 # --- Forms ---
 
@@ -311,12 +358,12 @@ class SignupForm(FlaskForm):
 
     def validate_email(self, email):
         try:
-            response = supabase.table('users').select('*').eq('email', email.data).execute()
-            if response.data:
-                raise ValidationError('That email is already taken. Please choose a different one.')
+            response = get_supabase().table('users').select('id').eq('email', email.data).limit(1).execute()
         except Exception as e:
             print(f"Error checking email: {e}")
             raise ValidationError('Error checking email availability. Please try again.')
+        if response.data:
+            raise ValidationError('That email is already taken. Please choose a different one.')
 
 class LoginForm(FlaskForm):
     email = StringField('Email', validators=[DataRequired(), Email()])
@@ -335,10 +382,94 @@ class ChangePasswordForm(FlaskForm):
     ])
     submit = SubmitField('Change Password')
 
+# --- Live Stream Form ---
+class StreamStartForm(FlaskForm):
+    source_language = SelectField('Source Language', 
+        choices=[(code, name) for code, name in language_map.items()],
+        validators=[DataRequired(message='Please select a source language')]
+    )
+    target_languages = SelectMultipleField('Target Languages', 
+        choices=[(code, name) for code, name in language_map.items()],
+        validators=[DataRequired(message='Please select at least one target language')]
+    )
+
 # --- Routes ---
 
+def run_youtube_job(app, job, video_url, source_lang, target_lang, user_id):
+    """Background body of a /youtube job; returns the JSON result or raises ValueError."""
+    from youtube_feature import process_youtube_video
+    with app.app_context():
+        original_transcript, tts_audio_filename, translated_text, error_message = process_youtube_video(
+            youtube_url=video_url,
+            source_lang_code=source_lang,
+            target_lang_code=target_lang,
+            speech_client=get_speech_client(),
+            upload_folder=current_app.config['UPLOAD_FOLDER'],
+            progress_callback=job.set_stage,
+            on_segment=job.add_segment
+        )
+
+        if error_message:
+            current_app.logger.error(f"Error from process_youtube_video: {error_message}")
+            raise ValueError(error_message)
+        
+        if not original_transcript or not tts_audio_filename or not translated_text:
+            current_app.logger.error("Processing returned incomplete data")
+            raise ValueError("Processing failed to return all required information.")
+
+        # Save to history with language names
+        job.set_stage('saving')
+        target_lang_name = language_map.get(target_lang, target_lang)
+        
+        # Save to Supabase
+        save_translation_history(
+            user_id=user_id,
+            source_lang_code=source_lang,
+            target_lang_name=target_lang_name,
+            original_text=original_transcript,
+            translated_text=translated_text
+        )
+        
+        current_app.logger.info(f"Saved YouTube translation to history for user {user_id}")
+
+        return {
+            'original_text': original_transcript,
+            'translated_text': translated_text,
+            'audio_filename': tts_audio_filename
+        }
+
+@routes.route('/youtube/jobs/<string:job_id>')
+@login_required
+def youtube_job_status(job_id):
+    job = youtube_jobs.get(job_id)
+    if not job or job.owner != current_user.id:
+        return jsonify({'success': False, 'error': 'Job not found or expired.'}), 404
+
+    response = {
+        'success': job.status != 'failed',
+        'job_id': job.id,
+        'status': job.status,
+        'stage': job.stage
+    }
+    if job.status == 'running':
+        # Sentences whose audio is ready, in order, so the page can start playback early
+        response['segments'] = [
+            {
+                'translated_text': segment['translated_text'],
+                'audio_url': url_for('play', filename=segment['audio_filename'])
+            }
+            for segment in job.ready_segments() if segment['audio_filename']
+        ]
+    elif job.status == 'finished':
+        response['original_text'] = job.result['original_text']
+        response['translated_text'] = job.result['translated_text']
+        response['audio_url'] = url_for('play', filename=job.result['audio_filename'])
+    elif job.status == 'failed':
+        response['error'] = job.error
+    return jsonify(response)
+
 # --- YouTube Video Processing Route ---
-@app.route('/youtube', methods=['GET', 'POST'])
+@routes.route('/youtube', methods=['GET', 'POST'])
 @login_required
 def youtube():
     form = YouTubeForm()
@@ -347,85 +478,54 @@ def youtube():
         source_lang = form.source_language.data
         target_lang = form.target_language.data
 
+        # Validate YouTube URL
+        if not video_url.startswith('https://www.youtube.com/') and not video_url.startswith('https://youtu.be/'):
+            return jsonify({'success': False, 'error': "Invalid YouTube URL format"})
+
+        # The pipeline runs in the background; the page polls the status URL
+        user_id = current_user.id
+        app = current_app._get_current_object()
         try:
-            # Validate YouTube URL
-            if not video_url.startswith('https://www.youtube.com/') and not video_url.startswith('https://youtu.be/'):
-                raise ValueError("Invalid YouTube URL format")
-
-            # Process the video
-            original_transcript, tts_audio_filename, translated_text, error_message = process_youtube_video(
-                youtube_url=video_url,
-                source_lang_code=source_lang,
-                target_lang_code=target_lang,
-                speech_client=speech_client,
-                upload_folder=app.config['UPLOAD_FOLDER']
+            job = youtube_jobs.submit(
+                lambda job: run_youtube_job(app, job, video_url, source_lang, target_lang, user_id),
+                owner=user_id
             )
+        except QueueFullError as e:
+            current_app.logger.warning(f"YouTube job rejected: {e}")
+            return jsonify({'success': False, 'error': "The server is busy processing other videos. Please try again shortly."}), 503
 
-            if error_message:
-                app.logger.error(f"Error from process_youtube_video: {error_message}")
-                return jsonify({'success': False, 'error': error_message})
-            
-            if not original_transcript or not tts_audio_filename or not translated_text:
-                app.logger.error("Processing returned incomplete data")
-                return jsonify({'success': False, 'error': "Processing failed to return all required information."})
-
-            # Save to history with language names
-            source_lang_name = language_map.get(source_lang, source_lang)
-            target_lang_name = language_map.get(target_lang, target_lang)
-            
-            # Save to Supabase
-            save_translation_history(
-                user_id=current_user.id,
-                source_lang_code=source_lang,
-                target_lang_name=target_lang_name,
-                original_text=original_transcript,
-                translated_text=translated_text
-            )
-            
-            app.logger.info(f"Saved YouTube translation to history for user {current_user.id}")
-            
-            return jsonify({
-                'success': True,
-                'original_text': original_transcript,
-                'translated_text': translated_text,
-                'audio_url': url_for('play', filename=tts_audio_filename)
-            })
-        except ValueError as e:
-            app.logger.error(f"YouTube processing ValueError: {str(e)}")
-            return jsonify({'success': False, 'error': str(e)})
-        except Exception as e:
-            app.logger.error(f"An unexpected error occurred in /youtube route: {str(e)}", exc_info=True)
-            return jsonify({'success': False, 'error': "An unexpected server error occurred. Please try again."})
+        current_app.logger.info(f"Queued YouTube job {job.id} for user {user_id}")
+        return jsonify({
+            'success': True,
+            'job_id': job.id,
+            'status': job.status,
+            'status_url': url_for('youtube_job_status', job_id=job.id)
+        }), 202
 
     return render_template('youtube.html', form=form)
 
 # --- Routes ---
-@app.route('/')
+@routes.route('/')
 def home():
     # Render home page, potentially show different content if logged in
     return render_template('home.html')
 
-@app.route('/signup', methods=['GET', 'POST'])
+@routes.route('/signup', methods=['GET', 'POST'])
 def signup():
     if current_user.is_authenticated:
         return redirect(url_for('translate_page'))
     form = SignupForm()
     if form.validate_on_submit():
         try:
-            # Check if user already exists
-            existing_user = User.get_by_email(form.email.data)
-            if existing_user:
-                flash('Email already registered. Please login instead.', 'danger')
-                return redirect(url_for('login'))
-
+            # SignupForm.validate_email has already rejected registered emails
             # Create new user
-            hashed_password = bcrypt.hashpw(form.password.data.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+            hashed_password = hash_password(form.password.data)
             user_data = {
                 'email': form.email.data,
                 'password_hash': hashed_password,
                 'is_admin': False
             }
-            result = supabase.table('users').insert(user_data).execute()
+            result = get_supabase().table('users').insert(user_data).execute()
             
             if result.data:
                 user = User(
@@ -433,23 +533,34 @@ def signup():
                     email=result.data[0]['email'],
                     is_admin=result.data[0].get('is_admin', False)
                 )
+                user_cache.set(user.id, {'id': user.id, 'email': user.email, 'is_admin': user.is_admin})
                 login_user(user)
                 flash('Your account has been created! You are now logged in.', 'success')
                 return redirect(url_for('translate_page'))
             else:
                 flash('Error creating account. Please try again.', 'danger')
+        except FutureTimeoutError:
+            flash(PASSWORD_POOL_BUSY_MESSAGE, 'warning')
+            return render_template('signup.html', title='Sign Up', form=form), 503
         except Exception as e:
             flash(f'An error occurred during sign up: {e}', 'danger')
     return render_template('signup.html', title='Sign Up', form=form)
 
-@app.route('/login', methods=['GET', 'POST'])
+@routes.route('/login', methods=['GET', 'POST'])
 def login():
     if current_user.is_authenticated:
         return redirect(url_for('translate_page'))
     form = LoginForm()
     if form.validate_on_submit():
-        user = User.get_by_email(form.email.data)
-        if user and user.check_password(form.password.data):
+        # One query for identity and hash; bcrypt runs on the dedicated pool
+        user, stored_hash = User.get_with_password_hash(form.email.data)
+        try:
+            password_ok = bool(user) and verify_password(form.password.data, stored_hash)
+        except FutureTimeoutError:
+            flash(PASSWORD_POOL_BUSY_MESSAGE, 'warning')
+            return render_template('login.html', title='Login', form=form), 503
+        if password_ok:
+            user_cache.set(user.id, {'id': user.id, 'email': user.email, 'is_admin': user.is_admin})
             login_user(user)
             next_page = request.args.get('next')
             return redirect(next_page) if next_page else redirect(url_for('home'))
@@ -457,14 +568,14 @@ def login():
             flash('Login Unsuccessful. Please check email and password.', 'danger')
     return render_template('login.html', title='Login', form=form)
 
-@app.route('/logout')
+@routes.route('/logout')
 @login_required # Ensure user is logged in to log out
 def logout():
     logout_user()
     flash('You have been logged out.', 'info')
     return redirect(url_for('home'))
 
-@app.route('/translate', methods=['GET'])
+@routes.route('/translate', methods=['GET'])
 @login_required
 def translate_page():
     form = UploadForm()
@@ -476,13 +587,96 @@ def translate_page():
                          all_language_names_json=all_language_names_json,
                          title="Translate")
 
-@app.route('/upload_translate', methods=['POST'])
+def translate_and_synthesize_target(target_lang_code, source_lang_code, transcript, user_id, user_email, on_segment=None):
+    """Translate, synthesize and save history for a single target language.
+
+    Runs on the translation worker pool, so it must not touch request-bound
+    objects such as current_user; callers pass the user details in explicitly.
+    Errors are returned as a result entry instead of being raised.
+    on_segment(index, segment) is called as each sentence's audio becomes ready.
+    """
+    from google.cloud import texttospeech
+    try:
+        def synthesize(text):
+            # Shared Text-to-Speech client (one gRPC channel per process)
+            tts_client = get_tts_client()
+            
+            # Set the text input to be synthesized
+            synthesis_input = texttospeech.SynthesisInput(text=text)
+            
+            # Build the voice request, select the language code and voice type
+            voice = texttospeech.VoiceSelectionParams(
+                language_code=target_lang_code,  # Use full language code for TTS
+                ssml_gender=texttospeech.SsmlVoiceGender.NEUTRAL
+            )
+            
+            # Select the type of audio file you want returned
+            audio_config = texttospeech.AudioConfig(
+                audio_encoding=texttospeech.AudioEncoding.MP3
+            )
+            
+            # Perform the text-to-speech request
+            response = tts_client.synthesize_speech(
+                input=synthesis_input,
+                voice=voice,
+                audio_config=audio_config
+            )
+            return response.audio_content
+        
+        # Translate sentence by sentence in one batch through the translate_v2 client, then
+        # synthesize the sentences in parallel (Google Text-to-Speech); each sentence's audio
+        # is reused from the store if it was synthesized before.
+        print(f"User {user_email} - Translating and synthesizing {target_lang_code} sentence by sentence...")
+        translated_text, segments, audio_filename = translate_and_synthesize_sentences(
+            transcript=transcript,
+            source_lang_code=source_lang_code,
+            target_lang_code=target_lang_code,
+            synthesize=synthesize,
+            audio_store=audio_store,
+            voice={'provider': 'google-cloud-tts', 'ssml_gender': 'NEUTRAL'},
+            on_segment=on_segment
+        )
+        print(f"User {user_email} - Translation and audio ready for {target_lang_code}: {len(segments)} sentence(s)")
+        
+        # Get the language name for display
+        target_lang_name = language_map.get(target_lang_code, target_lang_code)
+        
+        # Save to history
+        if save_translation_history(
+            user_id=user_id,
+            source_lang_code=source_lang_code,
+            target_lang_name=target_lang_name,
+            original_text=transcript,
+            translated_text=translated_text
+        ):
+            print(f"User {user_email} - History saved.")
+        else:
+            print(f"User {user_email} - Failed to save history.")
+        
+        return {
+            'target_lang': target_lang_name,
+            'translated_text': translated_text,
+            'audio_filename': audio_filename,
+            'segments': segments
+        }
+        
+    except Exception as e:
+        print(f"User {user_email} - ERROR during translation for {target_lang_code}: {e}")
+        return {
+            'target_lang': language_map.get(target_lang_code, target_lang_code),
+            'error': str(e)
+        }
+
+@routes.route('/upload_translate', methods=['POST'])
 @login_required
 def upload_translate():
+    from google.cloud import speech
+    import google.api_core.exceptions
+
     form = UploadForm()
     if not form.validate():
         # Log validation errors for debugging
-        app.logger.error(f"Form validation errors: {form.errors}")
+        current_app.logger.error(f"Form validation errors: {form.errors}")
         return jsonify({"error": f"Form validation failed: {form.errors}"}), 400
     
     file = form.audio_file.data
@@ -497,89 +691,97 @@ def upload_translate():
     if not source_lang_code or not target_lang_codes:
         return jsonify({"error": "Source and target languages are required."}), 400
     
-    # Create upload path
-    upload_path = os.path.join(app.config['UPLOAD_FOLDER'], f"upload_{uuid.uuid4().hex}.webm")
-    
     # Initialize variables
     transcript = None
     detected_language_code = None
-    tts_file_path: str | None = None
-    resampled_path: str | None = None
-    all_results = []
 
     try:
-        # 1. Save Uploaded WebM File
+        # 1. Read the uploaded audio into memory (size is capped by MAX_CONTENT_LENGTH)
         try:
-            file.save(upload_path)
-            app.logger.info(f"User {current_user.email} - Saved uploaded audio to {upload_path}")
+            upload_bytes = file.read()
+            current_app.logger.info(f"User {current_user.email} - Received {len(upload_bytes)} bytes of uploaded audio")
         except Exception as e:
-            app.logger.error(f"User {current_user.email} - Failed to save uploaded file: {e}")
-            if upload_path and os.path.exists(upload_path): 
-                try: os.remove(upload_path)
-                except: pass
-            return jsonify({"error": "Failed to save uploaded audio file."}), 500
-
-        # 2. Resample Audio & Speech-to-Text (Google Cloud)
-        print(f"User {current_user.email} - Processing audio file: {upload_path} with Google Speech API")
+            current_app.logger.error(f"User {current_user.email} - Failed to read uploaded file: {e}")
+            return jsonify({"error": "Failed to read uploaded audio file."}), 500
+        if not upload_bytes:
+            return jsonify({"error": "Uploaded audio file is empty."}), 400
+
+        # 2. Decode & Speech-to-Text (Google Cloud)
+        print(f"User {current_user.email} - Processing uploaded audio with Google Speech API")
         try:
-            # --- Resample Audio using pydub --- 
-            print(f"User {current_user.email} - Loading uploaded file for resampling...")
-            try: 
-                audio = AudioSegment.from_file(upload_path) 
-            except Exception as pydub_err:
-                print(f"Pydub direct load failed ({pydub_err}), trying with explicit format 'webm'...")
-                audio = AudioSegment.from_file(upload_path, format="webm")
+            response = None
+
+            # --- Send the upload as-is when the Speech API accepts its codec (e.g. browser WEBM_OPUS) ---
+            audio_info = probe_audio(upload_bytes)
+            passthrough = passthrough_encoding(audio_info, len(upload_bytes), MAX_CHUNK_MS)
+            print(f"User {current_user.email} - Probed upload: {audio_info}; passthrough: {passthrough}")
+            if passthrough:
+                encoding_name, sample_rate, channels = passthrough
+                config = speech.RecognitionConfig(
+                    encoding=getattr(speech.RecognitionConfig.AudioEncoding, encoding_name),
+                    sample_rate_hertz=sample_rate,
+                    audio_channel_count=channels,
+                    enable_automatic_punctuation=True,
+                    language_code=source_lang_code,
+                    enable_word_time_offsets=False,
+                )
+                try:
+                    print(f"User {current_user.email} - Sending {encoding_name} audio to Google Speech API without transcoding...")
+                    response = get_speech_client().recognize(config=config, audio=speech.RecognitionAudio(content=upload_bytes))
+                except google.api_core.exceptions.InvalidArgument as e:
+                    # e.g. the recording turned out longer than the synchronous limit
+                    print(f"User {current_user.email} - Passthrough rejected ({e}), falling back to transcoding...")
+                    response = None
+
+            if response is None:
+                # --- Decode, downmix and resample in one ffmpeg pipe; nothing is written to disk ---
+                print(f"User {current_user.email} - Decoding uploaded audio to {RECOGNITION_SAMPLE_RATE} Hz PCM...")
+                audio = decode_to_pcm(upload_bytes, sample_rate=RECOGNITION_SAMPLE_RATE)
                 
-            target_sample_rate = 48000
-            print(f"User {current_user.email} - Resampling audio to {target_sample_rate} Hz...")
-            resampled_audio = audio.set_frame_rate(target_sample_rate)
-            
-            flac_filename = f"resampled_{uuid.uuid4().hex}.flac"
-            resampled_path = os.path.join(app.config['UPLOAD_FOLDER'], flac_filename)
-            print(f"User {current_user.email} - Exporting resampled audio to {resampled_path}...")
-            resampled_audio.export(resampled_path, format="flac", parameters=["-ac", "1"])
-            print(f"User {current_user.email} - Resampling complete.")
-            
-            with open(resampled_path, "rb") as audio_file_content:
-                content = audio_file_content.read()
-
-            audio_google = speech.RecognitionAudio(content=content)
-            
-            print(f"User {current_user.email} - Using source language code: {source_lang_code}")
-            config = speech.RecognitionConfig(
-                encoding=speech.RecognitionConfig.AudioEncoding.FLAC,
-                sample_rate_hertz=target_sample_rate,
-                audio_channel_count=1,
-                enable_automatic_punctuation=True,
-                language_code=source_lang_code,
-                enable_word_time_offsets=False,
-            )
-
-            print(f"User {current_user.email} - Full RecognitionConfig being sent:\n{config}")
-            print(f"User {current_user.email} - Sending FLAC audio to Google Speech API...")
-            response = speech_client.recognize(config=config, audio=audio_google)
-            print(f"User {current_user.email} - Received response from Google Speech API.")
-
-            if not response.results:
-                print(f"User {current_user.email} - Google Speech API returned no results.")
-                return jsonify({"error": "Speech recognition could not understand audio (no results)."}), 400
-
-            result = response.results[0]
-            if not result.alternatives:
-                print(f"User {current_user.email} - Google Speech API result has no alternatives.")
-                return jsonify({"error": "Speech recognition could not understand audio (no alternatives)."}), 400
+                if len(audio) > MAX_CHUNK_MS:
+                    # Too long for one synchronous recognize(); split at silences and recognize in parallel
+                    print(f"User {current_user.email} - Audio is {len(audio) / 1000:.1f}s, using chunked recognition...")
+                    transcript = recognize_long_audio(audio, source_lang_code)
+                    detected_language_code = source_lang_code
+                else:
+                    print(f"User {current_user.email} - Using source language code: {source_lang_code}")
+                    config = speech.RecognitionConfig(
+                        encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
+                        sample_rate_hertz=RECOGNITION_SAMPLE_RATE,
+                        audio_channel_count=1,
+                        enable_automatic_punctuation=True,
+                        language_code=source_lang_code,
+                        enable_word_time_offsets=False,
+                    )
+
+                    print(f"User {current_user.email} - Full RecognitionConfig being sent:\n{config}")
+                    print(f"User {current_user.email} - Sending LINEAR16 audio to Google Speech API...")
+                    response = get_speech_client().recognize(config=config, audio=speech.RecognitionAudio(content=audio.raw_data))
+            del upload_bytes
+
+            if response is not None:
+                print(f"User {current_user.email} - Received response from Google Speech API.")
+
+                if not response.results:
+                    print(f"User {current_user.email} - Google Speech API returned no results.")
+                    return jsonify({"error": "Speech recognition could not understand audio (no results)."}), 400
+
+                result = response.results[0]
+                if not result.alternatives:
+                    print(f"User {current_user.email} - Google Speech API result has no alternatives.")
+                    return jsonify({"error": "Speech recognition could not understand audio (no alternatives)."}), 400
             
-            transcript = result.alternatives[0].transcript
-            detected_language_code = result.language_code
-            if not detected_language_code:
-                detected_language_code = "en-US" 
-                print(f"User {current_user.email} - Language detection failed, defaulting to 'en-US'.")
+                transcript = result.alternatives[0].transcript
+                detected_language_code = result.language_code
+                if not detected_language_code:
+                    detected_language_code = "en-US" 
+                    print(f"User {current_user.email} - Language detection failed, defaulting to 'en-US'.")
             
             print(f"User {current_user.email} - Recognized (Lang: {detected_language_code}): {transcript}")
 
         except Exception as e:
-            print(f"User {current_user.email} - ERROR during Google Speech API call or Resampling: {e}")
-            if "ffmpeg" in str(e).lower() or "pydub" in str(e).lower():
+            print(f"User {current_user.email} - ERROR during Google Speech API call or audio decoding: {e}")
+            if isinstance(e, AudioDecodeError) or "ffmpeg" in str(e).lower() or "pydub" in str(e).lower():
                 return jsonify({"error": f"Audio processing failed (pydub/ffmpeg issue): {e}"}), 500
             return jsonify({"error": f"Speech recognition service error: {e}"}), 503
 
@@ -598,79 +800,26 @@ def upload_translate():
             else:
                 print(f"User {current_user.email} - Invalid target language code: {target_lang_code}")
 
-        results = []
-        for target_lang_code in target_lang_codes:
-            try:
-                # Get base language code for translation (remove country code)
-                base_lang_code = target_lang_code.split('-')[0]
-                source_base_lang = source_lang_code.split('-')[0]
-                
-                # Translate Text
-                print(f"User {current_user.email} - Translating text to {target_lang_code}...")
-                translated_text = GoogleTranslator(source=source_base_lang, target=base_lang_code).translate(transcript)
-                print(f"User {current_user.email} - Translation to {target_lang_code} completed.")
-                
-                # Text-to-Speech (Google Text-to-Speech)
-                print(f"User {current_user.email} - Generating TTS audio via Google Text-to-Speech for {target_lang_code}...")
-                
-                # Initialize Text-to-Speech client
-                tts_client = texttospeech.TextToSpeechClient()
-                
-                # Set the text input to be synthesized
-                synthesis_input = texttospeech.SynthesisInput(text=translated_text)
-                
-                # Build the voice request, select the language code and voice type
-                voice = texttospeech.VoiceSelectionParams(
-                    language_code=target_lang_code,  # Use full language code for TTS
-                    ssml_gender=texttospeech.SsmlVoiceGender.NEUTRAL
-                )
-                
-                # Select the type of audio file you want returned
-                audio_config = texttospeech.AudioConfig(
-                    audio_encoding=texttospeech.AudioEncoding.MP3
-                )
-                
-                # Perform the text-to-speech request
-                response = tts_client.synthesize_speech(
-                    input=synthesis_input,
-                    voice=voice,
-                    audio_config=audio_config
-                )
-                
-                # Save audio
-                audio_filename = f"translated_{target_lang_code}_{uuid.uuid4().hex}.mp3"
-                audio_path = os.path.join(app.config['UPLOAD_FOLDER'], audio_filename)
-                with open(audio_path, "wb") as out:
-                    out.write(response.audio_content)
-                print(f"User {current_user.email} - Google Text-to-Speech audio saved for {target_lang_code}.")
-                
-                # Get the language name for display
-                target_lang_name = language_map.get(target_lang_code, target_lang_code)
-                
-                # Save to history
-                if save_translation_history(
-                    user_id=current_user.id,
-                    source_lang_code=source_lang_code,
-                    target_lang_name=target_lang_name,
-                    original_text=transcript,
-                    translated_text=translated_text
-                ):
-                    print(f"User {current_user.email} - History saved.")
-                else:
-                    print(f"User {current_user.email} - Failed to save history.")
-                
-                results.append({
-                    'target_lang': target_lang_name,
-                    'translated_text': translated_text,
-                    'audio_filename': audio_filename
-                })
-                
-            except Exception as e:
-                print(f"User {current_user.email} - ERROR during translation for {target_lang_code}: {e}")
-                results.append({
-                    'target_lang': language_map.get(target_lang_code, target_lang_code),
-                    'error': str(e)
-                })
+        # current_user is request-bound, so resolve it here rather than in the workers.
+        user_id = current_user.id
+        user_email = current_user.email
+
+        if request.accept_mimetypes.best_match(['application/json', 'text/event-stream']) == 'text/event-stream':
+            # Progress stream: transcript now, then each target (and its sentences) as it is ready
+            return upload_translate_events(transcript, detected_language_code, source_lang_code,
+                                           target_lang_codes, user_id, user_email)
+
+        # Translate + synthesize every target concurrently; map() keeps the requested order.
+        results = list(translation_executor.map(
+            lambda target_lang_code: translate_and_synthesize_target(
+                target_lang_code=target_lang_code,
+                source_lang_code=source_lang_code,
+                transcript=transcript,
+                user_id=user_id,
+                user_email=user_email
+            ),
+            target_lang_codes
+        ))
         
         return jsonify({
             'message': 'Translation completed successfully',
@@ -683,93 +832,289 @@ def upload_translate():
         print(f"User {current_user.email} - ERROR in upload_translate: {e}")
         return jsonify({"error": "An unexpected error occurred."}), 500
 
-    finally:
-        # Clean up the temporary uploaded webm file
-        if upload_path and os.path.exists(upload_path):
-            try:
-                os.remove(upload_path)
-                print(f"User {current_user.email} - Cleaned up temp upload file: {upload_path}")
-            except Exception as e:
-                print(f"User {current_user.email} - Error cleaning up temp upload file {upload_path}: {e}")
-        # Clean up the temporary resampled flac file
-        if resampled_path and os.path.exists(resampled_path):
+def upload_translate_events(transcript, detected_language_code, source_lang_code, target_lang_codes, user_id, user_email):
+    """
+    Server-Sent Events variant of the /upload_translate response.
+
+    Emits `transcript` straight away, `segment` as each translated sentence's audio is
+    ready, `translation` as each target language completes (in completion order, with
+    its position in the request), and finally `done`.
+    """
+    events = queue.Queue()
+
+    def submit(position, target_lang_code):
+        future = translation_executor.submit(
+            translate_and_synthesize_target,
+            target_lang_code=target_lang_code,
+            source_lang_code=source_lang_code,
+            transcript=transcript,
+            user_id=user_id,
+            user_email=user_email,
+            on_segment=lambda index, segment: events.put(('segment', {
+                'position': position,
+                'target_lang_code': target_lang_code,
+                'index': index,
+                'translated_text': segment['translated_text'],
+                'audio_filename': segment['audio_filename']
+            }))
+        )
+        future.add_done_callback(lambda f: events.put(('translation', dict(f.result(), position=position))))
+
+    def generate():
+        yield format_sse('transcript', {
+            'detected_source_language': detected_language_code,
+            'original_text': transcript,
+            'targets': len(target_lang_codes)
+        })
+        for position, target_lang_code in enumerate(target_lang_codes):
+            submit(position, target_lang_code)
+        remaining = len(target_lang_codes)
+        while remaining:
             try:
-                os.remove(resampled_path)
-                print(f"User {current_user.email} - Cleaned up temp resampled file: {resampled_path}")
-            except Exception as e:
-                print(f"User {current_user.email} - Error cleaning up temp resampled file {resampled_path}: {e}")
+                event, data = events.get(timeout=STREAM_KEEPALIVE_SECONDS)
+            except queue.Empty:
+                yield ": keep-alive\n\n"
+                continue
+            if event == 'translation':
+                remaining -= 1
+            yield format_sse(event, data)
+        yield format_sse('done', {'message': 'Translation completed successfully'})
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
 
-@app.route('/play/<path:filename>') # Use path converter for flexibility
+# --- Live Streaming Recognition ---
+# The browser posts MediaRecorder chunks while recording and listens for interim/final
+# transcripts on an SSE stream. Sessions live in the worker that created them.
+@routes.route('/stream/start', methods=['POST'])
+@login_required
+def stream_start():
+    form = StreamStartForm()
+    if not form.validate():
+        current_app.logger.error(f"Stream form validation errors: {form.errors}")
+        return jsonify({"error": f"Form validation failed: {form.errors}"}), 400
+
+    source_lang_code = form.source_language.data
+    target_lang_codes = form.target_languages.data
+    user_id = current_user.id
+    user_email = current_user.email
+
+    def translate_targets(transcript, emit):
+        # Start translating the moment the final transcript is known
+        futures = {
+            translation_executor.submit(
+                translate_and_synthesize_target,
+                target_lang_code=target_lang_code,
+                source_lang_code=source_lang_code,
+                transcript=transcript,
+                user_id=user_id,
+                user_email=user_email
+            ): index
+            for index, target_lang_code in enumerate(target_lang_codes)
+        }
+        for future in as_completed(futures):
+            result = dict(future.result(), index=futures[future])
+            if result.get('audio_filename'):
+                result['audio_url'] = play_url_prefix + result['audio_filename']
+            emit('translation', result)
+
+    play_url_prefix = url_for('play', filename='')
+    try:
+        session = streaming_sessions.create(user_id, source_lang_code, on_complete=translate_targets)
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 503
+
+    print(f"User {user_email} - Started live stream {session.id} ({source_lang_code})")
+    return jsonify({
+        'session_id': session.id,
+        'chunk_url': url_for('stream_chunk', session_id=session.id),
+        'stop_url': url_for('stream_stop', session_id=session.id),
+        'events_url': url_for('stream_events', session_id=session.id)
+    })
+
+@routes.route('/stream/<string:session_id>/chunk', methods=['POST'])
+@login_required
+def stream_chunk(session_id):
+    session = streaming_sessions.get(session_id, current_user.id)
+    if not session:
+        return jsonify({"error": "Stream not found or expired."}), 404
+    try:
+        session.feed(request.get_data())
+    except Exception as e:
+        return jsonify({"error": f"Could not accept audio chunk: {e}"}), 409
+    return ('', 204)
+
+@routes.route('/stream/<string:session_id>/stop', methods=['POST'])
+@login_required
+def stream_stop(session_id):
+    session = streaming_sessions.get(session_id, current_user.id)
+    if not session:
+        return jsonify({"error": "Stream not found or expired."}), 404
+    session.close()
+    return ('', 204)
+
+@routes.route('/stream/<string:session_id>/events')
+@login_required
+def stream_events(session_id):
+    session = streaming_sessions.get(session_id, current_user.id)
+    if not session:
+        return jsonify({"error": "Stream not found or expired."}), 404
+
+    def generate():
+        for item in session.events():
+            if item is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield format_sse(*item)
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@routes.route('/play/<path:filename>') # Use path converter for flexibility
 # @login_required # Optional: Make audio files private? Requires storing user association.
 def play(filename):
-    file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
     print(f"Attempting to play: {file_path}")
 
     # Security check: Ensure filename doesn't try to escape the UPLOAD_FOLDER
     # os.path.abspath converts to absolute path
     # os.path.commonpath checks if file_path is inside UPLOAD_FOLDER
-    if not os.path.exists(file_path) or \
-       os.path.commonpath([os.path.abspath(app.config['UPLOAD_FOLDER'])]) != \
-       os.path.commonpath([os.path.abspath(app.config['UPLOAD_FOLDER']), os.path.abspath(file_path)]):
+    inside_folder = os.path.commonpath([os.path.abspath(current_app.config['UPLOAD_FOLDER'])]) == \
+        os.path.commonpath([os.path.abspath(current_app.config['UPLOAD_FOLDER']), os.path.abspath(file_path)])
+    if inside_folder and not os.path.exists(file_path):
+        # Created on another host; pull it from the shared backend if it is there
+        fetch_shared_artifact(filename, file_path)
+    if not inside_folder or not os.path.exists(file_path):
         print(f"File not found or invalid path: {file_path}")
         return abort(404, description="Audio file not found or path is invalid.")
 
-    @after_this_request
-    def remove_file(response):
-        # Keep the delayed deletion, maybe reduce delay if not needed after playback starts
-        # Note: This might delete file before download completes on slow connections
-        def delete():
-            time.sleep(10) # Short buffer to allow audio playback start
-            try:
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                    print(f"Deleted file after serving: {file_path}")
-            except Exception as e:
-                print(f"Error deleting file after serving {file_path}: {e}")
-        # Running deletion in background is important not to block response
-        Thread(target=delete).start()
-        # Ensure the response is sent with correct headers for streaming/download if needed
-        response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
-        response.headers['Pragma'] = 'no-cache'
-        response.headers['Expires'] = '0'
-        return response
+    if filename.endswith(STREAM_SUFFIX):
+        return play_encrypted(filename, file_path)
+
+    # Shared TTS blobs are content-addressed and reused across requests, so they
+    # are never deleted after serving; the store evicts them under its byte budget.
+    # Anything else is a temporary artifact that the janitor removes once its TTL expires.
+    is_shared = audio_store.is_store_filename(filename)
+    if is_shared:
+        audio_store.get(os.path.basename(filename))
+    else:
+        audio_janitor.track(file_path, ttl=PLAYED_ARTIFACT_TTL)
 
+    # Hold the file while it is being streamed so it can't be removed mid-download
+    audio_janitor.acquire(file_path)
     try:
-        return send_file(file_path, mimetype="audio/mpeg") # Use mpeg for mp3
+        # conditional=True answers Range requests with 206 and If-None-Match/If-Modified-Since
+        # with 304, so the <audio> player can seek and replay without re-downloading.
+        # Store blobs are immutable and named by a keyed content hash, which doubles as a strong ETag.
+        response = send_file(
+            file_path,
+            mimetype="audio/mpeg", # Use mpeg for mp3
+            conditional=True,
+            etag=audio_store.key_from_filename(filename) if is_shared else True,
+            max_age=PLAY_CACHE_MAX_AGE if is_shared else None
+        )
     except Exception as e:
+        audio_janitor.release(file_path)
         print(f"Error sending file {file_path}: {e}")
         abort(500, description="Could not send audio file.")
+    response.call_on_close(lambda: audio_janitor.release(file_path))
+
+    response.headers['Accept-Ranges'] = 'bytes'
+    if is_shared:
+        # private: the user's browser may keep it, shared proxies and CDNs must not
+        response.headers['Cache-Control'] = f'private, max-age={PLAY_CACHE_MAX_AGE}, immutable'
+    else:
+        # Temporary artifacts may still be replayed, but must be revalidated
+        response.headers['Cache-Control'] = 'private, no-cache'
+    return response
 
-@app.route('/history')
+def fetch_shared_artifact(filename, file_path):
+    """Copy an artifact another host published into the local audio folder."""
+    name = os.path.basename(filename)
+    if audio_store.is_store_filename(name):
+        return audio_store.fetch_shared(name)
+    if name.endswith(STREAM_SUFFIX):
+        content = fetch_artifact(state_backend, name)
+        if content is not None:
+            tmp_path = f"{file_path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, 'wb') as out:
+                out.write(content)
+            os.replace(tmp_path, file_path)
+            audio_janitor.track(file_path, ttl=SECURE_ARTIFACT_TTL)
+            return name
+    return None
+
+def play_encrypted(filename, file_path):
+    """Serve a military-mode artifact to its owner, decrypting it chunk by chunk as it is sent."""
+    secret = secure_artifact_secret(os.path.basename(filename))
+    if not secret or not current_user.is_authenticated or current_user.id != secret['owner']:
+        return abort(404, description="Audio file not found or path is invalid.")
+
+    def generate():
+        try:
+            with open(file_path, 'rb') as encrypted:
+                for chunk in decrypt_stream(secret['key'], encrypted):
+                    yield chunk
+        except InvalidToken as e:
+            # Headers are already sent; cutting the body short is all we can do
+            print(f"Decryption failed while streaming {file_path}: {e}")
+
+    audio_janitor.acquire(file_path)
+    try:
+        response = Response(generate(), mimetype="audio/mpeg")
+        response.content_length = stream_plaintext_size(file_path)
+    except Exception as e:
+        audio_janitor.release(file_path)
+        print(f"Error sending file {file_path}: {e}")
+        abort(500, description="Could not send audio file.")
+    response.call_on_close(lambda: audio_janitor.release(file_path))
+    response.headers['Accept-Ranges'] = 'none'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+# Create a pagination-like object to match template expectations
+class HistoryPagination:
+    def __init__(self, data):
+        self.items = data['translations']
+        self.page = data['current_page']
+        self.pages = data['pages']
+        self.total = data['total']
+        self.has_prev = self.page > 1
+        self.has_next = data['has_next']
+        self.prev_num = self.page - 1
+        self.next_num = self.page + 1
+        # Keyset cursors for the Previous/Next links
+        self.prev_cursor = data['prev_cursor']
+        self.next_cursor = data['next_cursor']
+        
+    def iter_pages(self, left_edge=2, left_current=2, right_current=3, right_edge=2):
+        last = 0
+        for num in range(1, self.pages + 1):
+            if (num <= left_edge or
+                (num > self.page - left_current - 1 and
+                 num < self.page + right_current) or
+                num > self.pages - right_edge):
+                if last + 1 != num:
+                    yield None
+                yield num
+                last = num
+
+@routes.route('/history')
 @login_required
 def history():
     page = request.args.get('page', 1, type=int)
-    history_data = get_translation_history(user_id=current_user.id, page=page)
+    history_data = get_translation_history(
+        user_id=current_user.id,
+        page=page,
+        after=request.args.get('after'),
+        before=request.args.get('before')
+    )
     
     if history_data:
-        # Create a pagination-like object to match template expectations
-        class HistoryPagination:
-            def __init__(self, data):
-                self.items = data['translations']
-                self.page = data['current_page']
-                self.pages = data['pages']
-                self.has_prev = self.page > 1
-                self.has_next = self.page < self.pages
-                self.prev_num = self.page - 1
-                self.next_num = self.page + 1
-                
-            def iter_pages(self, left_edge=2, left_current=2, right_current=3, right_edge=2):
-                last = 0
-                for num in range(1, self.pages + 1):
-                    if (num <= left_edge or
-                        (num > self.page - left_current - 1 and
-                         num < self.page + right_current) or
-                        num > self.pages - right_edge):
-                        if last + 1 != num:
-                            yield None
-                        yield num
-                        last = num
-
         history = HistoryPagination(history_data)
         return render_template('history.html', 
                              title='Translation History',
@@ -781,13 +1126,35 @@ def history():
                          history=None,
                          language_map=language_map)
 
-@app.route('/delete_history/<string:history_id>', methods=['POST'])
+@routes.route('/api/history')
+@login_required
+def api_history():
+    """JSON history feed; pass next_cursor back as ?after= to continue."""
+    per_page = min(max(request.args.get('limit', 10, type=int), 1), 100)
+    history_data = get_translation_history(
+        user_id=current_user.id,
+        per_page=per_page,
+        after=request.args.get('after'),
+        before=request.args.get('before')
+    )
+    if history_data is None:
+        return jsonify({'error': 'Could not load translation history.'}), 500
+    return jsonify({
+        'items': [dict(item, timestamp=item['timestamp'].isoformat() if isinstance(item['timestamp'], datetime) else item['timestamp'])
+                  for item in history_data['translations']],
+        'total': history_data['total'],
+        'next_cursor': history_data['next_cursor'],
+        'prev_cursor': history_data['prev_cursor']
+    })
+
+@routes.route('/delete_history/<string:history_id>', methods=['POST'])
 @login_required
 def delete_history(history_id):
     try:
-        # Verify the history entry belongs to the current user
-        result = supabase.table('translation_history')\
-            .select('*')\
+        # Delete the entry; the user_id filter ensures it belongs to the current user,
+        # and the deleted rows come back so no separate ownership query is needed
+        result = get_supabase().table('translation_history')\
+            .delete()\
             .eq('id', history_id)\
             .eq('user_id', current_user.id)\
             .execute()
@@ -796,63 +1163,47 @@ def delete_history(history_id):
             flash('You do not have permission to delete this entry.', 'danger')
             return redirect(url_for('history'))
 
-        # Delete the entry
-        supabase.table('translation_history')\
-            .delete()\
-            .eq('id', history_id)\
-            .eq('user_id', current_user.id)\
-            .execute()
-        
+        adjust_history_count(current_user.id, -len(result.data))
         flash('History entry deleted successfully.', 'success')
     except Exception as e:
         flash(f'Error deleting history entry: {e}', 'danger')
 
     return redirect(url_for('history'))
 
-@app.route('/change-password', methods=['GET', 'POST'])
+@routes.route('/change-password', methods=['GET', 'POST'])
 @login_required
 def change_password():
     form = ChangePasswordForm()
     if form.validate_on_submit():
-        if current_user.check_password(form.current_password.data):
-            try:
-                hashed_password = bcrypt.hashpw(form.new_password.data.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-                supabase.table('users').update({'password_hash': hashed_password}).eq('id', current_user.id).execute()
+        try:
+            if current_user.check_password(form.current_password.data):
+                hashed_password = hash_password(form.new_password.data)
+                get_supabase().table('users').update({'password_hash': hashed_password}).eq('id', current_user.id).execute()
+                user_cache.invalidate(current_user.id)
                 flash('Your password has been updated successfully!', 'success')
                 return redirect(url_for('home'))
-            except Exception as e:
-                flash(f'Error updating password: {e}', 'danger')
-        else:
-            flash('Incorrect current password.', 'danger')
+            else:
+                flash('Incorrect current password.', 'danger')
+        except FutureTimeoutError:
+            flash(PASSWORD_POOL_BUSY_MESSAGE, 'warning')
+            return render_template('change_password.html', title='Change Password', form=form), 503
+        except Exception as e:
+            flash(f'Error updating password: {e}', 'danger')
     return render_template('change_password.html', title='Change Password', form=form)
 
 # --- Initialize Database Command (Optional but good practice) ---
-@app.cli.command("init-db")
+@routes.cli_command("init-db")
 def init_db_command():
-    """Initialize the database tables in Supabase."""
-    print("Please run the SQL commands in your Supabase SQL editor to create the tables.")
+    """Apply the schema migrations in update_db.py (or print their SQL without DATABASE_URL)."""
+    from update_db import update_database
+    update_database()
 
 # --- Context Processor --- 
-@app.context_processor
+@routes.context_processor
 def inject_now():
     """Inject datetime into template context."""
     return {'datetime': datetime}
 
-# Register blueprints
-# app.register_blueprint(security_bp, url_prefix='/api/security')
-
-# --- Main Execution ---
-if __name__ == '__main__':
-    # REMOVED SQLite specific checks/creation logic
-    # db.create_all() might need to be run manually via Supabase SQL Editor
-    # or using Flask-Migrate if you add migrations later.
-    # For now, SQLAlchemy might create tables if the DB user has permission.
-
-    print("Starting Flask server...")
-    app.run(debug=os.environ.get('FLASK_DEBUG', 'False').lower() == 'true',
-            host=os.environ.get('FLASK_RUN_HOST', '127.0.0.1'),
-            port=int(os.environ.get('FLASK_RUN_PORT', 5000)))
-
 # Add this function to handle database operations
 def save_translation_history(user_id, source_lang_code, target_lang_name, original_text, translated_text):
     try:
@@ -864,51 +1215,211 @@ def save_translation_history(user_id, source_lang_code, target_lang_name, origin
             'translated_text': translated_text,
             'timestamp': datetime.utcnow().isoformat()
         }
-        result = supabase.table('translation_history').insert(data).execute()
+        if HISTORY_ENCRYPTION:
+            try:
+                data['encrypted_data'] = history_keys.encrypt(user_id, json.dumps({
+                    'original_text': original_text,
+                    'translated_text': translated_text
+                }).encode('utf-8'))
+                data['is_encrypted'] = True
+                data['original_text'] = data['translated_text'] = ''
+            except Exception as e:
+                # Usually the users.wrapped_data_key column is missing; keep the row rather than lose it
+                # (runs on worker threads without an app context, so print rather than current_app.logger)
+                print(f"ERROR: history encryption failed for user {user_id}, storing the row unencrypted "
+                      f"(run `flask init-db` or update_db.py to add users.wrapped_data_key): {e}")
+        # Written in the background in batches; fall back to a direct insert if the buffer is full
+        if not history_writer.add(data):
+            print("History buffer full, inserting synchronously")
+            get_supabase().table('translation_history').insert(data).execute()
+        adjust_history_count(user_id, 1)
         return True
     except Exception as e:
         print(f"Error saving translation history: {e}")
         return False
 
-def get_translation_history(user_id, page=1, per_page=10):
+def insert_history_rows(rows):
+    """Bulk insert used by the history write-behind buffer."""
+    get_supabase().table('translation_history').insert(rows).execute()
+
+def forget_history_row(row):
+    """Undo the count of a history row the writer had to drop."""
+    adjust_history_count(row['user_id'], -1)
+
+history_writer = WriteBehindBuffer('history', insert_history_rows, on_drop=forget_history_row).register_shutdown()
+
+# --- Encryption Keys ---
+# Keys are derived lazily from SECURITY_MASTER_KEY (falling back to the app secret),
+# so every worker shares them. The keyring is set up by create_app(), which refuses
+# to enable HISTORY_ENCRYPTION without SECURITY_MASTER_KEY.
+security_manager = SecurityManager()
+
+# --- Encrypted History ---
+# With HISTORY_ENCRYPTION on, history text is stored encrypted under a per-user data
+# key; only the data key, wrapped by the keyring, is kept on the user row. A key
+# rotation re-wraps those data keys in the background, a batch at a time.
+HISTORY_ENCRYPTION = os.getenv('HISTORY_ENCRYPTION', 'false').lower() == 'true'
+
+def load_wrapped_data_key(user_id):
+    result = get_supabase().table('users').select('wrapped_data_key').eq('id', user_id).limit(1).execute()
+    return result.data[0].get('wrapped_data_key') if result.data else None
+
+def store_wrapped_data_key(user_id, wrapped):
+    # Only set it if the user has none yet, then read back whichever key was kept
+    get_supabase().table('users').update({'wrapped_data_key': wrapped})\
+        .eq('id', user_id)\
+        .is_('wrapped_data_key', 'null')\
+        .execute()
+    return load_wrapped_data_key(user_id)
+
+history_keys = EnvelopeEncryptor(None, load_wrapped_data_key, store_wrapped_data_key)  # keyring set in create_app()
+
+def fetch_wrapped_key_batch(after, limit):
+    query = get_supabase().table('users')\
+        .select('id, wrapped_data_key')\
+        .not_.is_('wrapped_data_key', 'null')
+    if after is not None:
+        query = query.gt('id', after)
+    result = query.order('id').limit(limit).execute()
+    return [(row['id'], row['wrapped_data_key']) for row in result.data or []]
+
+def store_wrapped_key_batch(pairs):
+    # One set-based UPDATE per batch through the rewrap_data_keys() function (update_db.py).
+    # An upsert would be an INSERT ... ON CONFLICT and trip the users table's NOT NULL columns.
+    get_supabase().rpc('rewrap_data_keys', {
+        'pairs': [{'id': str(user_id), 'wrapped_data_key': wrapped} for user_id, wrapped in pairs]
+    }).execute()
+
+security_manager.rekey_source = (fetch_wrapped_key_batch, store_wrapped_key_batch)
+
+def decrypt_history_rows(user_id, rows):
+    """Fill in the text of a page's encrypted rows in place, decrypting them in one call."""
+    encrypted = [row for row in rows if row.get('is_encrypted') and row.get('encrypted_data')]
+    if not encrypted:
+        return rows
     try:
-        # Calculate offset
-        offset = (page - 1) * per_page
-        
-        # Get total count
-        count_result = supabase.table('translation_history')\
+        plaintexts = history_keys.decrypt_many(user_id, [row['encrypted_data'] for row in encrypted])
+    except InvalidToken:
+        # The user's data key was wrapped under a keyring we no longer have; still show the plaintext rows
+        print(f"Could not unwrap the history data key for user {user_id}")
+        plaintexts = [None] * len(encrypted)
+    for row, plaintext in zip(encrypted, plaintexts):
+        if plaintext is None:
+            print(f"Could not decrypt history row {row.get('id')} for user {user_id}")
+            row['original_text'] = row['translated_text'] = '[unable to decrypt]'
+        else:
+            row.update(json.loads(plaintext))
+        del row['encrypted_data']
+    return rows
+
+# --- History Counts ---
+# Per-user totals are counted once and then kept current on insert/delete,
+# instead of running an exact count on every page view.
+HISTORY_COUNT_TTL = int(os.getenv('HISTORY_COUNT_TTL', 600))
+history_counts = make_cache('history_counts', HISTORY_COUNT_TTL)
+
+def get_history_count(user_id):
+    user_id = str(user_id)
+    total = history_counts.get(user_id)
+    if total is None:
+        count_result = get_supabase().table('translation_history')\
             .select('id', count='exact')\
-            .eq('user_id', str(user_id))\
+            .eq('user_id', user_id)\
+            .limit(1)\
             .execute()
-        total_count = count_result.count if hasattr(count_result, 'count') else 0
-        
-        # Get paginated results
-        result = supabase.table('translation_history')\
+        total = count_result.count if hasattr(count_result, 'count') and count_result.count is not None else 0
+        history_counts.set(user_id, total)
+    return total
+
+def adjust_history_count(user_id, delta):
+    """Keep the cached total in step with a write; an uncached total is left to be counted later."""
+    history_counts.incr(str(user_id), delta, minimum=0)
+
+def encode_history_cursor(row):
+    raw = f"{row['timestamp']}|{row['id']}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def decode_history_cursor(cursor):
+    """
+    The (timestamp, id) a client-supplied cursor points at, or None if it is malformed.
+    Both parts are parsed and re-serialized, so only well-formed values reach the query filter.
+    """
+    try:
+        timestamp, row_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').rsplit('|', 1)
+        timestamp = datetime.fromisoformat(timestamp.replace('Z', '+00:00')).isoformat()
+        row_id = str(int(row_id)) if row_id.isdigit() else str(uuid.UUID(row_id))
+        return timestamp, row_id
+    except Exception:
+        return None
+
+def get_translation_history(user_id, page=1, per_page=10, after=None, before=None):
+    """
+    Fetch one page of history, newest first.
+
+    Pages are addressed by a (timestamp, id) keyset cursor: `after` continues past
+    the last row of a page, `before` goes back from the first row. Without a cursor,
+    page 1 starts at the newest row and other pages (numbered links) use an offset.
+    """
+    try:
+        user_id = str(user_id)
+        query = get_supabase().table('translation_history')\
             .select('*')\
-            .eq('user_id', str(user_id))\
-            .order('timestamp', desc=True)\
-            .range(offset, offset + per_page - 1)\
-            .execute()
-        
-        # Convert timestamp strings to datetime objects
+            .eq('user_id', user_id)
+
+        boundary = decode_history_cursor(after or before) if (after or before) else None
+        backwards = bool(before and boundary)
+        if boundary:
+            timestamp, row_id = boundary
+            op = 'gt' if backwards else 'lt'
+            query = query.or_(f'timestamp.{op}."{timestamp}",and(timestamp.eq."{timestamp}",id.{op}."{row_id}")')
+            query = query.order('timestamp', desc=not backwards).order('id', desc=not backwards).limit(per_page + 1)
+        elif page > 1:
+            offset = (page - 1) * per_page
+            query = query.order('timestamp', desc=True).order('id', desc=True).range(offset, offset + per_page)
+        else:
+            query = query.order('timestamp', desc=True).order('id', desc=True).limit(per_page + 1)
+        result = query.execute()
+
+        # One extra row tells us whether there is another page in that direction
         translations = result.data
+        more = len(translations) > per_page
+        translations = translations[:per_page]
+        if backwards:
+            translations.reverse()
+        has_next = True if backwards else more
+        # A cursor means we came from a neighbouring page, so there is one to go back to
+        has_prev = more if backwards else bool(boundary) or page > 1
+
+        next_cursor = encode_history_cursor(translations[-1]) if translations and has_next else None
+        prev_cursor = encode_history_cursor(translations[0]) if translations and has_prev else None
+
+        decrypt_history_rows(user_id, translations)
+
+        # Convert timestamp strings to datetime objects
         for translation in translations:
             if isinstance(translation['timestamp'], str):
                 translation['timestamp'] = datetime.fromisoformat(translation['timestamp'].replace('Z', '+00:00'))
         
+        total_count = get_history_count(user_id)
         return {
             'translations': translations,
             'total': total_count,
-            'pages': (total_count + per_page - 1) // per_page,
-            'current_page': page
+            'pages': max((total_count + per_page - 1) // per_page, page),
+            'current_page': page,
+            'has_next': has_next,
+            'next_cursor': next_cursor,
+            'prev_cursor': prev_cursor
         }
     except Exception as e:
         print(f"Error fetching translation history: {e}")
         return None
 
-@app.route('/translate', methods=['POST'])
+@routes.route('/translate', methods=['POST'])
 @login_required
 def translate():
+    import speech_recognition as sr
+    from gtts import gTTS
+
     try:
         data = request.get_json()
         language = data.get('language', 'Hindi')
@@ -916,6 +1427,7 @@ def translate():
         enc_key = data.get('encKey', '')
         dec_key = data.get('decKey', '')
         cipher = None
+        military_key = None
 
         if military:
             # Try to get key from environment variable first
@@ -923,6 +1435,7 @@ def translate():
             if env_key:
                 try:
                     cipher = Fernet(env_key.encode())
+                    military_key = env_key
                     print("DEBUG: Using Fernet key from environment variable.")
                 except Exception as e:
                     print(f"ERROR: Invalid Fernet key from environment variable: {e}")
@@ -931,6 +1444,7 @@ def translate():
             elif enc_key and dec_key and enc_key == dec_key:
                 try:
                     cipher = Fernet(enc_key.encode())
+                    military_key = enc_key
                     print("WARNING: Using Fernet key from frontend. This is INSECURE for production!")
                 except Exception:
                     return jsonify({"error": "Invalid encryption key provided. Please check your key format."}), 400
@@ -939,8 +1453,7 @@ def translate():
 
             # Send email alert if military mode is active and cipher is initialized
             if cipher:
-                location_info = get_location()
-                async_send_email(location_info)
+                alert_dispatcher.notify(user=current_user.email, language=language)
 
         # Get audio data from request
         audio_data = request.files.get('audio')
@@ -949,8 +1462,10 @@ def translate():
 
         # Save audio file temporarily
         temp_filename = f"temp_{uuid.uuid4()}.wav"
-        temp_path = os.path.join(app.config['UPLOAD_FOLDER'], temp_filename)
+        temp_path = os.path.join(current_app.config['UPLOAD_FOLDER'], temp_filename)
         audio_data.save(temp_path)
+        # Safety net: the janitor removes it even if an error path below skips cleanup
+        audio_janitor.track(temp_path)
 
         # Initialize recognizer
         recognizer = sr.Recognizer()
@@ -967,49 +1482,37 @@ def translate():
 
         # Translate text
         try:
-            translated = GoogleTranslator(source='en', target=language).translate(english_text)
+            translated = cached_translate('en', language, english_text)
         except Exception as e:
             return jsonify({"error": f"Translation failed: {str(e)}"}), 500
 
         # Generate speech
         try:
-            tts = gTTS(text=translated, lang=language)
-            unique_filename = f"translated_{language}_{uuid.uuid4()}.mp3"
-            file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-            tts.save(file_path)
-
-            # Auto-delete thread
-            def delete_later(path):
-                time.sleep(30)  # Auto-delete after 30s
-                try:
-                    if os.path.exists(path):
-                        os.remove(path)
-                        print(f"[Auto-delete] Deleted file: {path}")
-                except Exception as e:
-                    print(f"[Auto-delete] Error: {e}")
-            Thread(target=delete_later, args=(file_path,)).start()
-
             if military and cipher:
-                # Encrypt the audio file
-                with open(file_path, "rb") as f:
-                    raw_data = f.read()
-                encrypted = cipher.encrypt(raw_data)
-
-                # Save encrypted data to a temporary file
-                encrypted_file_path = os.path.join(app.config['UPLOAD_FOLDER'], "temp_encrypted_" + str(uuid.uuid4()) + ".dat")
-                with open(encrypted_file_path, "wb") as ef:
-                    ef.write(encrypted)
-
-                # Decrypt the file back for playback
-                try:
-                    decrypted = cipher.decrypt(encrypted)
-                    with open(file_path, "wb") as df:
-                        df.write(decrypted)
-                    os.remove(encrypted_file_path)
-                except InvalidToken:
-                    return jsonify({"error": "Decryption failed on server. Please check your key."}), 400
-                except Exception as e:
-                    return jsonify({"error": f"Military mode processing error: {str(e)}"}), 500
+                # Synthesize straight into an encrypted artifact in bounded memory; the
+                # plaintext never touches disk and /play decrypts it while streaming
+                unique_filename = f"secure_{uuid.uuid4().hex}.mp3{STREAM_SUFFIX}"
+                file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], unique_filename)
+                audio_janitor.track(file_path, ttl=SECURE_ARTIFACT_TTL)
+                with open(file_path, 'wb') as out, StreamEncryptor(military_key, out) as encryptor:
+                    gTTS(text=translated, lang=language).write_to_fp(encryptor)
+                remember_secure_artifact(unique_filename, military_key, current_user.id)
+                if state_backend is not None and state_backend.remote_artifacts:
+                    with open(file_path, 'rb') as encrypted:
+                        publish_artifact(state_backend, unique_filename, encrypted.read(), ttl=SECURE_ARTIFACT_TTL)
+            else:
+                def synthesize():
+                    buffer = io.BytesIO()
+                    gTTS(text=translated, lang=language).write_to_fp(buffer)
+                    return buffer.getvalue()
+
+                unique_filename = audio_store.get_or_create(
+                    text=translated,
+                    language_code=language,
+                    synthesize=synthesize,
+                    voice={'provider': 'gtts'},
+                    encoding='mp3'
+                )
 
         except InvalidToken:
             return jsonify({"error": "Decryption failed. Please check your key."}), 400
@@ -1032,7 +1535,7 @@ def translate():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route('/test-db')
+@routes.route('/test-db')
 def test_db():
     try:
         # Try to insert a test record
@@ -1042,10 +1545,10 @@ def test_db():
             'target_language': 'English',
             'timestamp': time.time()
         }
-        result = supabase.table('translations').insert(test_data).execute()
+        result = get_supabase().table('translations').insert(test_data).execute()
         
         # Try to read it back
-        read_result = supabase.table('translations')\
+        read_result = get_supabase().table('translations')\
             .select('*')\
             .order('timestamp', desc=True)\
             .limit(1)\
@@ -1062,17 +1565,17 @@ def test_db():
             'message': f'Database connection failed: {str(e)}'
         }), 500
 
-@app.route('/test-supabase')
+@routes.route('/test-supabase')
 def test_supabase():
     try:
         # Test users table
         print("Testing users table...")
-        users_result = supabase.table('users').select('*').limit(1).execute()
+        users_result = get_supabase().table('users').select('*').limit(1).execute()
         print(f"Users table test result: {users_result.data}")
 
         # Test translation_history table
         print("Testing translation_history table...")
-        history_result = supabase.table('translation_history').select('*').limit(1).execute()
+        history_result = get_supabase().table('translation_history').select('*').limit(1).execute()
         print(f"Translation history table test result: {history_result.data}")
 
         return jsonify({
@@ -1088,28 +1591,94 @@ def test_supabase():
             'message': f'Supabase connection failed: {str(e)}'
         }), 500
 
-# Military Mode Utility Functions
-def get_location():
-    try:
-        res = requests.get("https://ipinfo.io").json()
-        return f"Location: {res.get('city')}, {res.get('region')}, {res.get('country')}"
-    except Exception:
-        return "Location not available."
-
-def async_send_email(location_info):
-    def send():
-        sender_email = "projectworkgroup51@gmail.com"
-        receiver_email = "er.dipayanlodh@gmail.com"
-        password = "obpy txyg ywzl ieqd"
-        subject = "Military Mode Activated"
-        body = f"Military Mode Alert!\n\n{location_info}"
+@routes.route('/admin/stats')
+@login_required
+def admin_stats():
+    """Runtime counters for the caches and worker pools (admins only)."""
+    if not current_user.is_admin:
+        abort(403)
+    return jsonify({
+        'translation_cache': translation_cache.stats(),
+        'audio_store': audio_store.stats(),
+        'audio_janitor': audio_janitor.stats(),
+        'gcp_clients': gcp_clients.stats(),
+        'youtube_jobs': youtube_jobs.stats(),
+        'streaming_sessions': streaming_sessions.stats(),
+        'user_cache': user_cache.stats(),
+        'history_counts': history_counts.stats(),
+        'history_writer': history_writer.stats(),
+        'history_keys': history_keys.stats(),
+        'alert_dispatcher': alert_dispatcher.stats(),
+        'keyring': security_manager.keyring.stats(),
+        'shared_state': state_backend.stats() if state_backend is not None else {'backend': 'memory'}
+    })
+
+# Military Mode Alerts
+# Activations are queued and mailed as a digest from a background thread, so the
+# request never waits on the location lookup or SMTP.
+alert_dispatcher = AlertDispatcher()
+
+# --- App Factory ---
+def create_app(config=None):
+    """
+    Build and configure the Flask app.
+
+    Only light modules are imported at startup. Google Cloud, Supabase, pydub, yt-dlp,
+    gTTS and speech_recognition are loaded by the first request that needs them, and
+    their clients are created then. With GCP_CLIENT_WARMUP=true each worker process
+    creates its Google clients in the background when it sees its first request (or
+    call gcp_clients.warm_up() from a gunicorn post_fork hook).
+    """
+    app = Flask(__name__, instance_relative_config=True)
+
+    # Set secret key for CSRF protection
+    app.config['SECRET_KEY'] = os.getenv('FLASK_SECRET_KEY', 'dev-secret-key-please-change-in-production')
+    app.config['GCS_BUCKET_NAME'] = os.getenv('GCS_BUCKET_NAME')
+    app.config['UPLOAD_FOLDER'] = audio_folder
+    app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES
+    # Gates the /api/security endpoints (key rotation, rekey job status, decrypt)
+    app.config['MILITARY_MODE_ENABLED'] = os.getenv('MILITARY_MODE_ENABLED', 'False').lower() == 'true'
+    if config:
+        app.config.update(config)
+
+    # Report missing configuration once, without echoing secrets
+    gcp_credentials_path = os.getenv('GOOGLE_APPLICATION_CREDENTIALS')
+    if not gcp_credentials_path:
+        app.logger.warning("GOOGLE_APPLICATION_CREDENTIALS not set in environment variables")
+    elif not os.path.exists(gcp_credentials_path):
+        app.logger.warning(f"Google Cloud credentials file not found at {gcp_credentials_path}")
+    if not os.getenv('SUPABASE_URL') or not os.getenv('SUPABASE_KEY'):
+        app.logger.warning("Supabase configuration incomplete")
+
+    login_manager.init_app(app)
+    # TTS blob names are keyed so /play URLs can't be derived from a guessed phrase
+    store_secret = os.getenv('AUDIO_STORE_SECRET') or os.getenv('SECURITY_MASTER_KEY') or app.config.get('SECRET_KEY')
+    if store_secret and store_secret not in PUBLIC_DEFAULT_SECRETS:
+        audio_store.set_secret(store_secret)
+    else:
+        app.logger.warning("No AUDIO_STORE_SECRET or SECURITY_MASTER_KEY configured; "
+                           "synthesized speech is only deduplicated within each worker process")
+    app.audio_store = audio_store
+    security_manager.init_app(app)
+    if HISTORY_ENCRYPTION and (not os.getenv('SECURITY_MASTER_KEY') or security_manager.ephemeral):
+        # Data keys wrapped under a random or session-derived key become unreadable after a
+        # restart, on other workers, or when FLASK_SECRET_KEY is rotated
+        raise RuntimeError("HISTORY_ENCRYPTION=true requires SECURITY_MASTER_KEY to be set to a private value")
+    history_keys.keyring = security_manager.keyring
+
+    routes.init_app(app)
+    app.register_blueprint(security_bp, url_prefix='/api/security')
+
+    if os.getenv('GCP_CLIENT_WARMUP', 'False').lower() == 'true':
+        # Not here: under gunicorn --preload this runs in the master, and forked workers
+        # discard inherited clients
+        app.before_request(gcp_clients.warm_up_in_background)
+    return app
 
-        try:
-            with smtplib.SMTP_SSL("smtp.gmail.com", 465) as server:
-                server.login(sender_email, password)
-                message = f"Subject: {subject}\n\n{body}"
-                server.sendmail(sender_email, receiver_email, message)
-                print(f"Email sent successfully to {receiver_email}")
-        except Exception as e:
-            print(f"Email failed: {e}")
-    Thread(target=send).start()
+# --- Main Execution ---
+if __name__ == '__main__':
+    app = create_app()
+    print("Starting Flask server...")
+    app.run(debug=os.environ.get('FLASK_DEBUG', 'False').lower() == 'true',
+            host=os.environ.get('FLASK_RUN_HOST', '127.0.0.1'),
+            port=int(os.environ.get('FLASK_RUN_PORT', 5000)))
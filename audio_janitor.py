@@ -0,0 +1,159 @@
+import os
+import heapq
+import threading
+import time
+
+# Defaults, overridable from .env
+AUDIO_ARTIFACT_TTL = int(os.getenv('AUDIO_ARTIFACT_TTL', 300))
+AUDIO_FOLDER_MAX_BYTES = int(os.getenv('AUDIO_FOLDER_MAX_BYTES', 1024 * 1024 * 1024))
+JANITOR_BATCH_SIZE = 100
+IN_FLIGHT_GRACE = 30
+BUDGET_CHECK_INTERVAL = 10
+
+
+class ArtifactJanitor:
+    """
+    Deletes temporary audio artifacts when their TTL runs out.
+
+    One background thread sleeps until the earliest expiry in a heap and then removes
+    everything due in one batch, replacing a sleeping thread per file. Files that are
+    being downloaded (see `acquire`/`release`) are postponed instead of deleted.
+    The folder as a whole is kept under `max_bytes` by expiring the oldest tracked
+    artifacts early. Files matched by `protected` are never touched.
+    """
+
+    def __init__(self, directory, max_bytes=AUDIO_FOLDER_MAX_BYTES, protected=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.protected = protected or (lambda name: False)
+        self._heap = []  # (expires_at, path)
+        self._expiry = {}  # path -> expires_at (latest wins; stale heap entries are skipped)
+        self._in_flight = {}  # path -> active downloads
+        self._cond = threading.Condition()
+        self._thread = None
+        self._thread_pid = None
+        self._last_budget_check = 0.0
+        self.deleted = 0
+        self.postponed = 0
+        self.budget_evictions = 0
+
+    # --- Tracking ---
+    def track(self, path, ttl=AUDIO_ARTIFACT_TTL):
+        """Schedule `path` for deletion `ttl` seconds from now (extends an existing schedule)."""
+        expires_at = time.time() + ttl
+        with self._cond:
+            if self._expiry.get(path, 0) >= expires_at:
+                return
+            self._expiry[path] = expires_at
+            heapq.heappush(self._heap, (expires_at, path))
+            self._cond.notify()
+        self._ensure_started()
+
+    def acquire(self, path):
+        """Mark `path` as being served so it is not deleted mid-download."""
+        with self._cond:
+            self._in_flight[path] = self._in_flight.get(path, 0) + 1
+
+    def release(self, path):
+        with self._cond:
+            count = self._in_flight.get(path, 0) - 1
+            if count > 0:
+                self._in_flight[path] = count
+            else:
+                self._in_flight.pop(path, None)
+
+    def is_in_flight(self, path):
+        with self._cond:
+            return path in self._in_flight
+
+    def adopt_existing(self, ttl=AUDIO_ARTIFACT_TTL):
+        """Track leftover artifacts found on disk (e.g. from a previous run)."""
+        if not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            if not self.protected(name):
+                self.track(os.path.join(self.directory, name), ttl)
+
+    # --- Background sweep ---
+    def _ensure_started(self):
+        if self._thread is not None and self._thread_pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._cond:
+            if self._thread is None or self._thread_pid != os.getpid() or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='audio-janitor', daemon=True)
+                self._thread_pid = os.getpid()
+                self._thread.start()
+
+    def _due(self, now):
+        due = []
+        while self._heap and self._heap[0][0] <= now and len(due) < JANITOR_BATCH_SIZE:
+            expires_at, path = heapq.heappop(self._heap)
+            if self._expiry.get(path) != expires_at:
+                continue  # rescheduled or already removed
+            if path in self._in_flight:
+                # Still downloading; try again shortly
+                self.postponed += 1
+                self._expiry[path] = now + IN_FLIGHT_GRACE
+                heapq.heappush(self._heap, (now + IN_FLIGHT_GRACE, path))
+                continue
+            del self._expiry[path]
+            due.append(path)
+        return due
+
+    def _delete(self, paths):
+        for path in paths:
+            try:
+                if os.path.exists(path):
+                    os.remove(path)
+                    self.deleted += 1
+            except Exception as e:
+                print(f"Janitor: error deleting {path}: {e}")
+
+    def _enforce_budget(self):
+        if time.time() - self._last_budget_check < BUDGET_CHECK_INTERVAL:
+            return
+        self._last_budget_check = time.time()
+        try:
+            usage = sum(entry.stat().st_size for entry in os.scandir(self.directory) if entry.is_file())
+        except OSError:
+            return
+        if usage <= self.max_bytes:
+            return
+        with self._cond:
+            # Expire the oldest tracked artifacts first
+            candidates = sorted((expires_at, path) for path, expires_at in self._expiry.items()
+                                if path not in self._in_flight)
+            early = []
+            for _, path in candidates:
+                if usage <= self.max_bytes:
+                    break
+                try:
+                    usage -= os.path.getsize(path)
+                except OSError:
+                    pass
+                del self._expiry[path]
+                early.append(path)
+        self.budget_evictions += len(early)
+        self._delete(early)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                now = time.time()
+                if not self._heap:
+                    self._cond.wait(timeout=60)
+                elif self._heap[0][0] > now:
+                    self._cond.wait(timeout=self._heap[0][0] - now)
+                due = self._due(time.time())
+            self._delete(due)
+            self._enforce_budget()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'live': len(self._expiry),
+                'in_flight': sum(self._in_flight.values()),
+                'deleted': self.deleted,
+                'postponed': self.postponed,
+                'budget_evictions': self.budget_evictions,
+            }
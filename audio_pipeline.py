@@ -0,0 +1,38 @@
+import os
+import subprocess
+
+FFMPEG_BINARY = os.getenv('FFMPEG_BINARY', 'ffmpeg')
+PCM_SAMPLE_RATE = 16000
+PCM_SAMPLE_WIDTH = 2  # bytes, s16le
+
+
+class AudioDecodeError(Exception):
+    """Raised when ffmpeg cannot decode the supplied audio."""
+
+
+def ffmpeg_pipe(data, output_args, input_args=None, timeout=120):
+    """
+    Run ffmpeg with `data` on stdin and return what it writes to stdout.
+    Nothing touches the disk; memory use is the input plus the output.
+    """
+    command = [FFMPEG_BINARY, '-hide_banner', '-loglevel', 'error', '-nostdin']
+    command += (input_args or []) + ['-i', 'pipe:0'] + output_args + ['pipe:1']
+    try:
+        completed = subprocess.run(command, input=data, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=timeout)
+    except FileNotFoundError as e:
+        raise AudioDecodeError(f"ffmpeg not found ({FFMPEG_BINARY}): {e}")
+    except subprocess.TimeoutExpired:
+        raise AudioDecodeError("ffmpeg timed out while processing audio")
+    if completed.returncode != 0:
+        raise AudioDecodeError(f"ffmpeg failed: {completed.stderr.decode('utf-8', 'replace').strip()}")
+    return completed.stdout
+
+
+def decode_to_pcm(data, sample_rate=PCM_SAMPLE_RATE, input_format=None):
+    """Decode any container/codec ffmpeg understands to mono 16-bit PCM in memory."""
+    input_args = ['-f', input_format] if input_format else None
+    raw = ffmpeg_pipe(data, ['-vn', '-ac', '1', '-ar', str(sample_rate), '-f', 's16le', '-acodec', 'pcm_s16le'], input_args)
+    if not raw:
+        raise AudioDecodeError("ffmpeg produced no audio")
+    from pydub import AudioSegment
+    return AudioSegment(data=raw, sample_width=PCM_SAMPLE_WIDTH, frame_rate=sample_rate, channels=1)
@@ -0,0 +1,185 @@
+import struct
+from collections import namedtuple
+
+AudioInfo = namedtuple('AudioInfo', ['container', 'codec', 'sample_rate', 'channels', 'duration_ms'])
+
+# Limits for synchronous recognize() with inline content
+MAX_INLINE_BYTES = 10 * 1024 * 1024
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+
+# EBML / Matroska element ids
+_EBML_HEADER = 0x1A45DFA3
+_SEGMENT = 0x18538067
+_INFO = 0x1549A966
+_TIMECODE_SCALE = 0x2AD7B1
+_DURATION = 0x4489
+_TRACKS = 0x1654AE6B
+_TRACK_ENTRY = 0xAE
+_CODEC_ID = 0x86
+_AUDIO = 0xE1
+_SAMPLING_FREQUENCY = 0xB5
+_CHANNELS = 0x9F
+
+
+def _read_vint(data, pos, keep_marker=False):
+    """Read an EBML variable-length integer. Returns (value or None if 'unknown', length)."""
+    first = data[pos]
+    mask = 0x80
+    length = 1
+    while length <= 8 and not first & mask:
+        mask >>= 1
+        length += 1
+    if length > 8:
+        raise ValueError("invalid EBML vint")
+    value = first if keep_marker else first & (mask - 1)
+    all_ones = value == mask - 1
+    for byte in data[pos + 1:pos + length]:
+        value = (value << 8) | byte
+        all_ones = all_ones and byte == 0xFF
+    if len(data) < pos + length:
+        raise ValueError("truncated EBML vint")
+    if not keep_marker and all_ones:
+        return None, length
+    return value, length
+
+
+def _ebml_children(data, start, end):
+    """Yield (id, body_start, body_end) for the elements between start and end."""
+    pos = start
+    while pos < end:
+        element_id, n = _read_vint(data, pos, keep_marker=True)
+        size, m = _read_vint(data, pos + n)
+        body_start = pos + n + m
+        body_end = end if size is None else min(body_start + size, end)
+        yield element_id, body_start, body_end
+        pos = body_end
+
+
+def _ebml_uint(data, start, end):
+    return int.from_bytes(data[start:end], 'big')
+
+
+def _ebml_float(data, start, end):
+    if end - start == 4:
+        return struct.unpack('>f', data[start:end])[0]
+    if end - start == 8:
+        return struct.unpack('>d', data[start:end])[0]
+    return None
+
+
+def _probe_webm(data):
+    codec = sample_rate = channels = duration = None
+    timecode_scale = 1000000
+    for element_id, start, end in _ebml_children(data, 0, len(data)):
+        if element_id != _SEGMENT:
+            continue
+        for child_id, c_start, c_end in _ebml_children(data, start, end):
+            if child_id == _INFO:
+                for info_id, i_start, i_end in _ebml_children(data, c_start, c_end):
+                    if info_id == _TIMECODE_SCALE:
+                        timecode_scale = _ebml_uint(data, i_start, i_end)
+                    elif info_id == _DURATION:
+                        duration = _ebml_float(data, i_start, i_end)
+            elif child_id == _TRACKS:
+                for entry_id, e_start, e_end in _ebml_children(data, c_start, c_end):
+                    if entry_id != _TRACK_ENTRY:
+                        continue
+                    for field_id, f_start, f_end in _ebml_children(data, e_start, e_end):
+                        if field_id == _CODEC_ID:
+                            codec = data[f_start:f_end].decode('ascii', 'replace').rstrip('\x00')
+                        elif field_id == _AUDIO:
+                            for audio_id, a_start, a_end in _ebml_children(data, f_start, f_end):
+                                if audio_id == _SAMPLING_FREQUENCY:
+                                    sample_rate = _ebml_float(data, a_start, a_end)
+                                elif audio_id == _CHANNELS:
+                                    channels = _ebml_uint(data, a_start, a_end)
+                # Clusters follow the track list; nothing more to read
+                break
+        break
+    if codec is None:
+        return None
+    duration_ms = int(duration * timecode_scale / 1000000) if duration else None
+    return AudioInfo('webm', 'opus' if codec == 'A_OPUS' else codec.lower(),
+                     int(sample_rate) if sample_rate else None, channels or 1, duration_ms)
+
+
+def _probe_ogg(data):
+    index = data.find(b'OpusHead', 0, 512)
+    if index < 0 or len(data) < index + 16:
+        return AudioInfo('ogg', 'unknown', None, None, None)
+    channels = data[index + 9]
+    input_rate = struct.unpack('<I', data[index + 12:index + 16])[0]
+    return AudioInfo('ogg', 'opus', input_rate, channels, None)
+
+
+def _probe_flac(data):
+    if len(data) < 42:
+        return None
+    info = data[8:42]
+    sample_rate = (info[10] << 12) | (info[11] << 4) | (info[12] >> 4)
+    channels = ((info[12] >> 1) & 0x07) + 1
+    total_samples = ((info[13] & 0x0F) << 32) | int.from_bytes(info[14:18], 'big')
+    duration_ms = int(total_samples * 1000 / sample_rate) if sample_rate and total_samples else None
+    return AudioInfo('flac', 'flac', sample_rate, channels, duration_ms)
+
+
+def _probe_wav(data):
+    pos = 12
+    fmt = None
+    while pos + 8 <= len(data):
+        chunk_id = data[pos:pos + 4]
+        chunk_size = struct.unpack('<I', data[pos + 4:pos + 8])[0]
+        body = pos + 8
+        if chunk_id == b'fmt ' and chunk_size >= 16:
+            fmt = struct.unpack('<HHIIHH', data[body:body + 16])
+        elif chunk_id == b'data' and fmt:
+            audio_format, channels, sample_rate, byte_rate, _, bits = fmt
+            codec = f"pcm_s{bits}le" if audio_format == 1 else f"wav_format_{audio_format}"
+            duration_ms = int(chunk_size * 1000 / byte_rate) if byte_rate else None
+            return AudioInfo('wav', codec, sample_rate, channels, duration_ms)
+        pos = body + chunk_size + (chunk_size & 1)
+    return None
+
+
+def probe_audio(data):
+    """
+    Identify container, codec, sample rate, channel count and (when the header has
+    it) duration from the first bytes of an audio file, without spawning ffprobe.
+    Returns an AudioInfo, or None if the format isn't recognized.
+    """
+    try:
+        if data[:4] == struct.pack('>I', _EBML_HEADER):
+            return _probe_webm(data)
+        if data[:4] == b'OggS':
+            return _probe_ogg(data)
+        if data[:4] == b'fLaC':
+            return _probe_flac(data)
+        if data[:4] == b'RIFF' and data[8:12] == b'WAVE':
+            return _probe_wav(data)
+    except (ValueError, IndexError, struct.error) as e:
+        print(f"Audio probe failed: {e}")
+    return None
+
+
+def passthrough_encoding(info, size, max_duration_ms):
+    """
+    Return (encoding name, sample rate, channels) if audio described by `info` can be
+    sent to the Speech API as-is, otherwise None. Unknown durations are allowed
+    through; the caller falls back to transcoding if the API rejects the input.
+    """
+    if info is None or size > MAX_INLINE_BYTES or not info.sample_rate:
+        return None
+    if info.duration_ms is not None and info.duration_ms > max_duration_ms:
+        return None
+    if info.channels not in (1, 2):
+        return None
+    if info.container == 'webm' and info.codec == 'opus' and info.sample_rate in OPUS_SAMPLE_RATES:
+        return 'WEBM_OPUS', info.sample_rate, info.channels
+    if info.container == 'ogg' and info.codec == 'opus':
+        rate = info.sample_rate if info.sample_rate in OPUS_SAMPLE_RATES else 48000
+        return 'OGG_OPUS', rate, info.channels
+    if info.container == 'flac' and 8000 <= info.sample_rate <= 48000:
+        return 'FLAC', info.sample_rate, info.channels
+    if info.container == 'wav' and info.codec == 'pcm_s16le' and 8000 <= info.sample_rate <= 48000:
+        return 'LINEAR16', info.sample_rate, info.channels
+    return None
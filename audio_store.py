@@ -0,0 +1,295 @@
+import os
+import hashlib
+import hmac
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+# Defaults, overridable from .env
+AUDIO_STORE_MAX_BYTES = int(os.getenv('AUDIO_STORE_MAX_BYTES', 512 * 1024 * 1024))
+# How often the directory is rescanned for blobs written by other worker processes
+AUDIO_STORE_RESCAN_INTERVAL = int(os.getenv('AUDIO_STORE_RESCAN_INTERVAL', 60))
+STORE_PREFIX = 'tts_'
+SHARED_ARTIFACT_TTL = int(os.getenv('SHARED_ARTIFACT_TTL', 24 * 3600))
+
+
+def publish_artifact(backend, filename, content, ttl=SHARED_ARTIFACT_TTL):
+    """Copy an audio artifact to a shared backend that holds artifacts; a no-op otherwise."""
+    if backend is None or not backend.remote_artifacts:
+        return
+    try:
+        backend.set(f"artifact:{filename}", content, ttl=ttl)
+    except Exception as e:
+        # The local copy is still served; other hosts just won't find it
+        print(f"Audio store: could not publish {filename}: {e}")
+
+
+def fetch_artifact(backend, filename):
+    """The bytes of an artifact published by another host, or None."""
+    if backend is None or not backend.remote_artifacts:
+        return None
+    try:
+        return backend.get(f"artifact:{filename}")
+    except Exception as e:
+        print(f"Audio store: could not fetch {filename}: {e}")
+        return None
+
+
+class AudioStore:
+    """
+    Deduplicated store for synthesized speech.
+
+    Each blob is named after a keyed hash (HMAC) of (text, language code, voice
+    parameters, encoding), so the same sentence in the same voice is synthesized once
+    and then served to everyone, but nobody without the server secret can work out a
+    blob's name from a guessed phrase. Set the secret with `set_secret`; until then
+    names are keyed with a random per-process key. Blobs live next to the other audio files so /play can serve
+    them by name. The store is kept under `max_bytes` by evicting the least recently
+    used blobs. File access times are used as the LRU clock so the order survives
+    restarts, while mtimes stay fixed so HTTP Last-Modified/ETag validators are stable.
+
+    Several worker processes may share the directory. A blob another worker wrote is
+    adopted into the index on first lookup, and the directory is rescanned every
+    AUDIO_STORE_RESCAN_INTERVAL seconds so the byte budget covers the whole directory.
+
+    If `shared` is set to a shared_state backend that holds artifacts (Redis), new blobs
+    are also copied there and `fetch_shared` pulls a blob another host created.
+    """
+
+    def __init__(self, directory, max_bytes=AUDIO_STORE_MAX_BYTES, rescan_interval=AUDIO_STORE_RESCAN_INTERVAL,
+                 secret=None):
+        self.directory = directory
+        self.set_secret(secret)
+        self.max_bytes = max_bytes
+        self.rescan_interval = rescan_interval
+        self._last_scan = time.monotonic()
+        self._index = OrderedDict()  # key -> size, oldest first
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Optional callable(path) -> bool; blobs being served are skipped by eviction
+        self.in_use = None
+        # Optional shared_state backend; blobs are published to it when it stores artifacts
+        self.shared = None
+        self.shared_fetches = 0
+        if not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    # --- Keys and names ---
+    def set_secret(self, secret):
+        """Key blob names with `secret` (str or bytes); None means a random per-process key."""
+        if secret is None:
+            self._name_key = os.urandom(32)
+        else:
+            if isinstance(secret, str):
+                secret = secret.encode('utf-8')
+            self._name_key = hashlib.sha256(b'audio-store-names\x00' + secret).digest()
+
+    def make_key(self, text, language_code, voice=None, encoding='mp3'):
+        payload = json.dumps({
+            'text': text,
+            'language_code': language_code,
+            'voice': voice or {},
+            'encoding': encoding,
+        }, sort_keys=True, ensure_ascii=False)
+        return hmac.new(self._name_key, payload.encode('utf-8'), hashlib.sha256).hexdigest()
+
+    @staticmethod
+    def filename_for(key, encoding='mp3'):
+        return f"{STORE_PREFIX}{key}.{encoding}"
+
+    @staticmethod
+    def is_store_filename(filename):
+        """True if `filename` names a shared blob that must not be deleted after serving."""
+        name = os.path.basename(filename)
+        return name.startswith(STORE_PREFIX) and not name.endswith('.tmp')
+
+    @staticmethod
+    def key_from_filename(filename):
+        """The keyed content hash embedded in a blob name, usable as a strong ETag."""
+        return os.path.splitext(os.path.basename(filename))[0][len(STORE_PREFIX):]
+
+    def path_for(self, filename):
+        return os.path.join(self.directory, filename)
+
+    # --- Index ---
+    def _load_index(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not self.is_store_filename(name):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((st.st_atime, name, st.st_size))
+        for _, name, size in sorted(entries):
+            self._index[name] = size
+            self._total_bytes += size
+
+    def _rescan(self):
+        # Pick up blobs written (or evicted) by other workers; caller holds the lock
+        self._last_scan = time.monotonic()
+        on_disk = {}
+        for name in os.listdir(self.directory):
+            if self.is_store_filename(name):
+                try:
+                    st = os.stat(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                on_disk[name] = (st.st_atime, st.st_size)
+        for name in [name for name in self._index if name not in on_disk]:
+            self._total_bytes -= self._index.pop(name)
+        # Unknown blobs go to the old end of the LRU order, oldest access first
+        for atime, name, size in sorted(((atime, name, size) for name, (atime, size) in on_disk.items()
+                                         if name not in self._index), reverse=True):
+            self._index[name] = size
+            self._index.move_to_end(name, last=False)
+            self._total_bytes += size
+
+    def _touch(self, filename):
+        self._index.move_to_end(filename)
+        path = self.path_for(filename)
+        try:
+            os.utime(path, (time.time(), os.stat(path).st_mtime))
+        except OSError:
+            pass
+
+    def _evict(self):
+        victims = []
+        excess = self._total_bytes - self.max_bytes
+        # Oldest first, never the newest blob and never one that is being downloaded
+        for filename, size in list(self._index.items())[:-1]:
+            if excess <= 0:
+                break
+            if self.in_use and self.in_use(self.path_for(filename)):
+                continue
+            victims.append(filename)
+            excess -= size
+        for filename in victims:
+            self._total_bytes -= self._index.pop(filename)
+            self.evictions += 1
+            try:
+                os.remove(self.path_for(filename))
+            except OSError as e:
+                print(f"Audio store: error evicting {filename}: {e}")
+
+    def _key_lock(self, filename):
+        with self._lock:
+            return self._key_locks.setdefault(filename, threading.Lock())
+
+    # --- Public API ---
+    def get(self, filename):
+        """Return `filename` if the blob exists, refreshing its LRU position."""
+        with self._lock:
+            if filename in self._index and os.path.exists(self.path_for(filename)):
+                self._touch(filename)
+                self.hits += 1
+                return filename
+            if filename in self._index:
+                # Removed behind our back (another worker evicted it)
+                self._total_bytes -= self._index.pop(filename)
+                return None
+            try:
+                size = os.stat(self.path_for(filename)).st_size
+            except OSError:
+                return None
+            # Written by another worker sharing the directory
+            self._index[filename] = size
+            self._total_bytes += size
+            self._touch(filename)
+            self.hits += 1
+            return filename
+
+    def put(self, filename, audio_content, publish=True):
+        """Write a blob atomically and account for it in the byte budget."""
+        if publish:
+            publish_artifact(self.shared, filename, audio_content)
+        path = self.path_for(filename)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'wb') as out:
+            out.write(audio_content)
+        os.replace(tmp_path, path)
+        with self._lock:
+            if filename in self._index:
+                self._total_bytes -= self._index.pop(filename)
+            self._index[filename] = len(audio_content)
+            self._total_bytes += len(audio_content)
+            if time.monotonic() - self._last_scan >= self.rescan_interval:
+                self._rescan()
+            self._evict()
+        return filename
+
+    def fetch_shared(self, filename):
+        """Copy a blob created on another host into this store. Returns the filename or None."""
+        if not self.is_store_filename(filename):
+            return None
+        audio_content = fetch_artifact(self.shared, filename)
+        if audio_content is None:
+            return None
+        with self._lock:
+            self.shared_fetches += 1
+        return self.put(filename, audio_content, publish=False)
+
+    def get_or_create(self, text, language_code, synthesize, voice=None, encoding='mp3'):
+        """
+        Return the filename of the blob for this utterance, calling `synthesize()`
+        (which must return the encoded audio bytes) only on a miss.
+        """
+        key = self.make_key(text, language_code, voice, encoding)
+        filename = self.filename_for(key, encoding)
+        if self.get(filename):
+            return filename
+        # Serialize concurrent misses for the same utterance so it is synthesized once
+        with self._key_lock(filename):
+            if self.get(filename):
+                return filename
+            with self._lock:
+                self.misses += 1
+            self.put(filename, synthesize())
+        with self._lock:
+            self._key_locks.pop(filename, None)
+        return filename
+
+    def combine(self, filenames, encoding='mp3'):
+        """
+        Return a blob holding the given blobs back to back (MP3 frames concatenate
+        cleanly). A single blob is returned as-is.
+        """
+        if len(filenames) == 1:
+            return filenames[0]
+
+        def concatenate():
+            parts = []
+            for filename in filenames:
+                with open(self.path_for(filename), 'rb') as part:
+                    parts.append(part.read())
+            return b''.join(parts)
+
+        return self.get_or_create(
+            text='\n'.join(filenames),
+            language_code='',
+            synthesize=concatenate,
+            voice={'combined': True},
+            encoding=encoding
+        )
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'blobs': len(self._index),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'shared_fetches': self.shared_fetches,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
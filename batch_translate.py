@@ -0,0 +1,76 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from gcp_clients import get_translate_client
+from translation_cache import translation_cache, base_language, cached_translate
+
+# Translation API v2 request limits
+MAX_SEGMENTS_PER_CALL = int(os.getenv('TRANSLATE_MAX_SEGMENTS_PER_CALL', 128))
+MAX_CHARS_PER_CALL = int(os.getenv('TRANSLATE_MAX_CHARS_PER_CALL', 5000))
+TRANSLATE_MAX_WORKERS = int(os.getenv('TRANSLATE_MAX_WORKERS', 8))
+
+translate_executor = ThreadPoolExecutor(max_workers=TRANSLATE_MAX_WORKERS, thread_name_prefix='batch-translate')
+
+
+def _pack(segments):
+    """Group segments into calls that respect the per-request segment and size limits."""
+    batch, size = [], 0
+    for segment in segments:
+        if batch and (len(batch) >= MAX_SEGMENTS_PER_CALL or size + len(segment) > MAX_CHARS_PER_CALL):
+            yield batch
+            batch, size = [], 0
+        batch.append(segment)
+        size += len(segment)
+    if batch:
+        yield batch
+
+
+def _translate_call(segments, source, target):
+    try:
+        results = get_translate_client().translate(
+            values=segments,
+            source_language=base_language(source),
+            target_language=base_language(target),
+            format_='text'
+        )
+        return [result['translatedText'] for result in results]
+    except Exception as e:
+        # Keep working without Cloud Translation credentials/quota
+        print(f"Batch translation call failed ({e}), falling back to per-segment translation")
+        return [cached_translate(source, target, segment) for segment in segments]
+
+
+def translate_batch(segments, source, target):
+    """
+    Translate many segments from `source` to `target`, returning them in order.
+
+    Cached segments are served from the translation cache; the rest are de-duplicated
+    and sent through the shared translate_v2 client in as few calls as the request
+    limits allow, with the calls for one batch made in parallel.
+    """
+    translated = [None] * len(segments)
+    misses = {}
+    for index, segment in enumerate(segments):
+        if not segment or not segment.strip():
+            translated[index] = segment
+            continue
+        cached = translation_cache.get(source, target, segment)
+        if cached is not None:
+            translated[index] = cached
+        else:
+            misses.setdefault(segment, []).append(index)
+
+    if misses:
+        unique = list(misses)
+        calls = list(_pack(unique))
+        if len(calls) == 1:
+            # Common case; no need to hop to the pool for a single call
+            outputs = [_translate_call(calls[0], source, target)]
+        else:
+            outputs = translate_executor.map(lambda batch: _translate_call(batch, source, target), calls)
+        for batch, results in zip(calls, outputs):
+            for segment, result in zip(batch, results):
+                translation_cache.put(source, target, segment, result)
+                for index in misses[segment]:
+                    translated[index] = result
+    return translated
+
@@ -0,0 +1,333 @@
+"""
+Benchmark /upload_translate, /youtube and /history end to end, offline.
+
+Google Speech/Translate/TTS, gTTS, yt-dlp and Supabase are replaced by the fakes in
+benchmarks/fake_providers.py. They answer after a simulated latency and fail a set
+fraction of calls. The real Flask routes, worker pools, caches and audio store run
+unchanged, driven through the test client at each concurrency level. For every
+scenario and level the report shows:
+- p50/p95/p99 latency, throughput and process CPU per request;
+- calls, latency and CPU per request for each stage (fake provider calls and
+  wrapped app functions; app stages include the provider calls they make).
+
+    python benchmarks/end_to_end.py --concurrency 1,4,16 --requests 40
+    python benchmarks/end_to_end.py --latency all=0 --save-baseline benchmarks/baseline.json
+    python benchmarks/end_to_end.py --latency all=0 --compare benchmarks/baseline.json
+
+Setting --latency all=0 isolates the app's own overhead. --compare exits with
+status 1 when a scenario regressed by more than --threshold percent. Needs the
+packages in requirements.txt but no credentials, network or ffmpeg, unless the
+--fixture long upload is used, which goes through ffmpeg.
+"""
+import argparse
+import atexit
+import contextlib
+import io
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_providers  # noqa: E402
+
+SCENARIOS = ('upload', 'youtube', 'history')
+FIXTURE_SECONDS = {'short': 8, 'long': 75}
+JOB_TIMEOUT = 300
+# Stages reported per request, in pipeline order
+STAGE_ORDER = ('probe', 'decode', 'download', 'recognize_chunked', 'speech', 'translate_batch', 'translate',
+               'synthesize', 'tts', 'history_save', 'history_query', 'supabase')
+
+
+def parse_mapping(text, cast):
+    """'speech=300,tts=120' -> {'speech': 300, 'tts': 120}; 'all=0' sets every provider."""
+    mapping = {}
+    for item in filter(None, (part.strip() for part in (text or '').split(','))):
+        name, _, value = item.partition('=')
+        names = fake_providers.DEFAULT_LATENCY_MS if name == 'all' else [name]
+        for provider in names:
+            if provider not in fake_providers.DEFAULT_LATENCY_MS:
+                raise SystemExit(f"unknown provider {provider!r} (expected {', '.join(fake_providers.DEFAULT_LATENCY_MS)} or all)")
+            mapping[provider] = cast(value)
+    return mapping
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an unsorted list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))]
+
+
+# --- Scenarios ---
+class Scenario:
+    """Each method performs one operation: a request, or for /youtube a job followed to completion."""
+
+    def __init__(self, args, upload_audio):
+        self.args = args
+        self.upload_audio = upload_audio
+        self.targets = [code.strip() for code in args.targets.split(',') if code.strip()]
+
+    def upload(self, client, state):
+        response = client.post('/upload_translate', content_type='multipart/form-data', data={
+            'audio_file': (io.BytesIO(self.upload_audio), 'fixture.wav'),
+            'source_language': 'en-US',
+            'target_languages': self.targets,
+        })
+        if response.status_code != 200:
+            return False, response.status_code
+        results = response.get_json().get('results', [])
+        return all('error' not in result for result in results), response.status_code
+
+    def youtube(self, client, state):
+        response = client.post('/youtube', data={
+            'video_url': 'https://www.youtube.com/watch?v=benchmark',
+            'source_language': 'en-US',
+            'target_language': self.targets[0],
+        })
+        if response.status_code != 202:
+            return False, response.status_code
+        status_url = response.get_json()['status_url']
+        deadline = time.monotonic() + JOB_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(self.args.poll_interval)
+            status = client.get(status_url).get_json()
+            if status['status'] in ('finished', 'failed'):
+                return status['status'] == 'finished', response.status_code
+        return False, 'timeout'
+
+    def history(self, client, state):
+        # Alternate the rendered page with cursor-paged JSON, following next_cursor
+        state['history_calls'] = state.get('history_calls', 0) + 1
+        if state['history_calls'] % 2:
+            response = client.get('/history')
+            return response.status_code == 200, response.status_code
+        cursor = state.get('cursor')
+        response = client.get('/api/history' + (f'?after={cursor}' if cursor else ''))
+        if response.status_code != 200:
+            return False, response.status_code
+        state['cursor'] = response.get_json().get('next_cursor')
+        return True, response.status_code
+
+
+def run_level(flask_app, recorder, scenario, name, concurrency, requests, user_ids):
+    """Run `requests` operations of `name` over `concurrency` threads and summarize them."""
+    operation = getattr(scenario, name)
+    latencies, failures, statuses = [], [], {}
+    remaining = [requests]
+    lock = threading.Lock()
+
+    def worker(user_id):
+        client = flask_app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = user_id
+            session['_fresh'] = True
+        state = {}
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            started = time.perf_counter()
+            try:
+                ok, status = operation(client, state)
+            except Exception as e:
+                ok, status = False, type(e).__name__
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+                if not ok:
+                    failures.append(status)
+
+    recorder.reset()
+    threads = [threading.Thread(target=worker, args=(user_ids[n],)) for n in range(concurrency)]
+    started, started_cpu = time.perf_counter(), time.process_time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall, cpu = time.perf_counter() - started, time.process_time() - started_cpu
+
+    stages = {}
+    for stage, samples in recorder.snapshot().items():
+        stage_walls = [w for w, _ in samples]
+        stages[stage] = {
+            'calls_per_request': round(len(samples) / requests, 3),
+            'p50_ms': round(percentile(stage_walls, 50) * 1000, 2),
+            'p95_ms': round(percentile(stage_walls, 95) * 1000, 2),
+            'cpu_ms_per_request': round(sum(c for _, c in samples) / requests * 1000, 3),
+        }
+    return {
+        'requests': requests,
+        'concurrency': concurrency,
+        'errors': len(failures),
+        'statuses': statuses,
+        'throughput_rps': round(requests / wall, 3),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'cpu_ms_per_request': round(cpu / requests * 1000, 3),
+        'stages': stages,
+    }
+
+
+# --- Reporting ---
+def print_result(key, result):
+    print(f"\n{key}: {result['requests']} requests, {result['errors']} failed {result['statuses']}")
+    print(f"  latency p50 {result['p50_ms']:9.1f} ms   p95 {result['p95_ms']:9.1f} ms   p99 {result['p99_ms']:9.1f} ms")
+    print(f"  throughput {result['throughput_rps']:8.2f} req/s   process CPU {result['cpu_ms_per_request']:8.2f} ms/request")
+    print(f"  {'stage':<18} {'calls/req':>9} {'p50 ms':>9} {'p95 ms':>9} {'CPU ms/req':>11}")
+    stages = result['stages']
+    for stage in sorted(stages, key=lambda s: STAGE_ORDER.index(s) if s in STAGE_ORDER else len(STAGE_ORDER)):
+        row = stages[stage]
+        print(f"  {stage:<18} {row['calls_per_request']:>9.2f} {row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} "
+              f"{row['cpu_ms_per_request']:>11.2f}")
+
+
+def compare(results, baseline, threshold):
+    """Print changes against a saved baseline; returns the keys that regressed."""
+    regressed = []
+    print(f"\nComparison with baseline from {baseline['meta'].get('created', '?')} (threshold {threshold:.0f}%)")
+    for key, current in results.items():
+        previous = baseline['results'].get(key)
+        if previous is None:
+            print(f"  {key}: not in baseline")
+            continue
+        changes = []
+        worse = False
+        for metric, higher_is_worse in (('p50_ms', True), ('p95_ms', True), ('p99_ms', True),
+                                        ('throughput_rps', False), ('cpu_ms_per_request', True)):
+            before, after = previous[metric], current[metric]
+            change = (after - before) / before * 100 if before else 0.0
+            flag = ''
+            if metric != 'p50_ms' and (change > threshold if higher_is_worse else change < -threshold):
+                flag, worse = ' !', True
+            changes.append(f"{metric} {before:.1f} -> {after:.1f} ({change:+.1f}%){flag}")
+        if current['errors'] > previous['errors']:
+            changes.append(f"errors {previous['errors']} -> {current['errors']} !")
+            worse = True
+        print(f"  {key}{'  REGRESSED' if worse else ''}")
+        for change in changes:
+            print(f"    {change}")
+        if worse:
+            regressed.append(key)
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help="comma-separated: upload, youtube, history")
+    parser.add_argument('--concurrency', default='1,4,16', help="comma-separated concurrency levels")
+    parser.add_argument('--requests', type=int, default=40, help="requests per scenario and level")
+    parser.add_argument('--warmup', type=int, default=2, help="unmeasured requests per scenario first")
+    parser.add_argument('--latency', default='', help="median ms per provider, e.g. speech=300,tts=120 or all=0")
+    parser.add_argument('--errors', default='', help="failure rate per provider, e.g. translate=0.02")
+    parser.add_argument('--jitter', type=float, default=0.35, help="log-normal sigma of provider latency")
+    parser.add_argument('--repeat-ratio', type=float, default=0.0,
+                        help="share of transcripts repeated from a small pool (exercises the caches)")
+    parser.add_argument('--targets', default='hi-IN,es-ES', help="target languages for uploads")
+    parser.add_argument('--fixture', choices=sorted(FIXTURE_SECONDS), default='short',
+                        help="generated upload audio; long exceeds the sync limit and needs ffmpeg")
+    parser.add_argument('--audio', help="use this 16-bit WAV recording as the upload fixture instead")
+    parser.add_argument('--history-rows', type=int, default=200, help="history rows seeded per user")
+    parser.add_argument('--poll-interval', type=float, default=0.1, help="seconds between /youtube job polls")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save-baseline', metavar='PATH')
+    parser.add_argument('--compare', metavar='PATH')
+    parser.add_argument('--threshold', type=float, default=10.0, help="regression threshold in percent")
+    parser.add_argument('--verbose', action='store_true', help="show the app's own log output")
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    for name in scenarios:
+        if name not in SCENARIOS:
+            raise SystemExit(f"unknown scenario {name!r}")
+    levels = [int(level) for level in args.concurrency.split(',')]
+    latency_ms = parse_mapping(args.latency, float)
+    error_rate = parse_mapping(args.errors, float)
+
+    # Audio, caches and history live in a scratch directory, so every run starts cold
+    workdir = tempfile.mkdtemp(prefix='voice-translation-bench-')
+    atexit.register(shutil.rmtree, workdir, True)
+    os.chdir(workdir)
+    os.environ['TRANSLATION_CACHE_DIR'] = os.path.join(workdir, 'cache')
+
+    if args.audio:
+        upload_audio, _, _ = fake_providers.load_fixture(args.audio)
+    else:
+        upload_audio = fake_providers.wav_bytes(fake_providers.make_fixture(FIXTURE_SECONDS[args.fixture]))
+    from pydub import AudioSegment
+    video_pcm = fake_providers.make_fixture(FIXTURE_SECONDS['long'], seed=args.seed + 11)
+    video_audio = AudioSegment(data=video_pcm, sample_width=2, frame_rate=fake_providers.FIXTURE_SAMPLE_RATE, channels=1)
+
+    import app as app_module
+    flask_app = app_module.create_app({'SECRET_KEY': 'benchmark', 'WTF_CSRF_ENABLED': False})
+    if not args.verbose:
+        flask_app.logger.setLevel(logging.WARNING)
+    recorder = fake_providers.StageRecorder()
+    transcripts = fake_providers.TranscriptSource(repeat_ratio=args.repeat_ratio, seed=args.seed)
+    supabase = fake_providers.install(
+        app_module, recorder, transcripts,
+        youtube_audio=(fake_providers.silent_mp3(64), video_audio),
+        latency_ms=latency_ms, error_rate=error_rate, jitter=args.jitter, seed=args.seed
+    )
+    user_ids = [f"bench-user-{n}" for n in range(max(levels))]
+    for n, user_id in enumerate(user_ids):
+        supabase.seed_user(user_id, f"{user_id}@example.com", history_rows=args.history_rows, seed=args.seed + n)
+
+    scenario = Scenario(args, upload_audio)
+    print(f"Offline end-to-end benchmark in {workdir}")
+    print(f"provider latency ms: {dict(fake_providers.DEFAULT_LATENCY_MS, **latency_ms)}")
+    print(f"provider error rates: {dict(fake_providers.DEFAULT_ERROR_RATE, **error_rate)}")
+
+    results = {}
+    for name in scenarios:
+        for concurrency in [None] + levels:
+            # The app prints progress for every request; keep it out of the report
+            with open(os.devnull, 'w') as devnull, \
+                    contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(devnull):
+                if concurrency is None:
+                    if args.warmup:
+                        run_level(flask_app, recorder, scenario, name, 1, args.warmup, user_ids)
+                    continue
+                result = run_level(flask_app, recorder, scenario, name, concurrency, args.requests, user_ids)
+            results[f"{name}@{concurrency}"] = result
+            print_result(f"{name}@{concurrency}", result)
+
+    meta = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'requests': args.requests,
+        'latency_ms': dict(fake_providers.DEFAULT_LATENCY_MS, **latency_ms),
+        'error_rate': dict(fake_providers.DEFAULT_ERROR_RATE, **error_rate),
+        'jitter': args.jitter,
+        'repeat_ratio': args.repeat_ratio,
+        'fixture': args.audio or args.fixture,
+        'targets': args.targets,
+    }
+    if args.save_baseline:
+        path = os.path.join(ROOT, args.save_baseline) if not os.path.isabs(args.save_baseline) else args.save_baseline
+        with open(path, 'w') as out:
+            json.dump({'meta': meta, 'results': results}, out, indent=2, sort_keys=True)
+        print(f"\nBaseline saved to {path}")
+    if args.compare:
+        path = os.path.join(ROOT, args.compare) if not os.path.isabs(args.compare) else args.compare
+        with open(path) as f:
+            baseline = json.load(f)
+        if baseline['meta'].get('latency_ms') != meta['latency_ms'] or baseline['meta'].get('error_rate') != meta['error_rate']:
+            print("\nWarning: the baseline was recorded with different provider settings")
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
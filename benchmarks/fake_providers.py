@@ -0,0 +1,543 @@
+"""
+Local stand-ins for Google Speech/Translate/TTS, gTTS, yt-dlp and Supabase, used by
+benchmarks/end_to_end.py.
+
+Each fake answers with the same shapes as the real client, after a simulated
+latency drawn from a log-normal distribution around a median, and fails a
+configurable fraction of calls. Every call is timed (wall and thread CPU) into a
+StageRecorder, together with the app functions wrapped by `install`. Audio fixtures
+are synthesized deterministically so runs are reproducible without shipping
+recordings; `load_fixture` accepts a real 16-bit WAV file instead.
+"""
+import io
+import math
+import random
+import re
+import struct
+import threading
+import time
+import uuid
+import wave
+from collections import defaultdict
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+FIXTURE_SAMPLE_RATE = 16000
+
+# Default simulated latencies in ms (median, before jitter) and failure rates
+DEFAULT_LATENCY_MS = {
+    'speech': 350,
+    'translate': 90,
+    'tts': 180,
+    'supabase': 35,
+    'download': 1500,
+}
+DEFAULT_ERROR_RATE = {name: 0.0 for name in DEFAULT_LATENCY_MS}
+
+WORDS = (
+    'the weather report said rain would arrive before noon and the market would close early '
+    'please send the documents to the office on the third floor by friday afternoon '
+    'our train leaves from platform nine at seven thirty so we should pack tonight '
+    'the doctor asked him to drink more water and to walk for twenty minutes every day '
+    'children were playing football in the park while their parents talked about school '
+    'a new library opened downtown with thousands of books and a quiet reading garden'
+).split()
+
+
+class ProviderError(Exception):
+    """Raised by a fake provider to simulate a failed upstream call."""
+
+
+# --- Timing ---
+class StageRecorder:
+    """Thread-safe collection of (wall seconds, thread CPU seconds) samples per stage."""
+
+    def __init__(self):
+        self._samples = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def record(self, stage, wall, cpu):
+        with self._lock:
+            self._samples[stage].append((wall, cpu))
+
+    def wrap(self, stage, fn):
+        def timed(*args, **kwargs):
+            started, started_cpu = time.perf_counter(), time.thread_time()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - started, time.thread_time() - started_cpu)
+        timed.__wrapped__ = fn
+        return timed
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return {stage: list(samples) for stage, samples in self._samples.items()}
+
+
+class Provider:
+    """Simulated upstream service: log-normal latency around `median_ms`, failing `error_rate` of calls."""
+
+    def __init__(self, name, recorder, median_ms, jitter=0.35, error_rate=0.0, seed=None):
+        self.name = name
+        self.recorder = recorder
+        self.median_ms = median_ms
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def call(self, respond):
+        """Wait the simulated latency, maybe fail, and return respond()."""
+        with self._lock:
+            delay = self.median_ms / 1000.0 * math.exp(self._random.gauss(0, self.jitter)) if self.median_ms else 0.0
+            failed = self._random.random() < self.error_rate
+        started, started_cpu = time.perf_counter(), time.thread_time()
+        try:
+            time.sleep(delay)
+            if failed:
+                raise ProviderError(f"simulated {self.name} failure")
+            return respond()
+        finally:
+            self.recorder.record(self.name, time.perf_counter() - started, time.thread_time() - started_cpu)
+
+
+# --- Canned content ---
+class TranscriptSource:
+    """
+    Transcripts returned by the fake Speech API. A `repeat_ratio` share of calls
+    reuse a small fixed set (warm translation cache and audio store); the rest are
+    new sentences, so translation and synthesis go to the providers.
+    """
+
+    def __init__(self, sentences=3, words_per_sentence=9, repeat_ratio=0.0, pool_size=5, seed=None):
+        self.sentences = sentences
+        self.words_per_sentence = words_per_sentence
+        self.repeat_ratio = repeat_ratio
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._pool = [self._make() for _ in range(pool_size)]
+
+    def _make(self):
+        sentences = []
+        for _ in range(self.sentences):
+            words = [self._random.choice(WORDS) for _ in range(self.words_per_sentence)]
+            sentences.append(' '.join(words).capitalize() + '.')
+        return ' '.join(sentences)
+
+    def next(self):
+        with self._lock:
+            if self._random.random() < self.repeat_ratio:
+                return self._random.choice(self._pool)
+            return self._make()
+
+
+def make_fixture(seconds, sample_rate=FIXTURE_SAMPLE_RATE, burst_ms=2600, gap_ms=700, seed=7):
+    """
+    Mono 16-bit PCM that looks like speech to the silence splitter: voiced bursts
+    (a few harmonics with a syllable-rate envelope) separated by quiet gaps.
+    """
+    rng = random.Random(seed)
+    frames = bytearray()
+    total = int(seconds * sample_rate)
+    position = 0
+    while position < total:
+        burst = min(int(burst_ms * sample_rate / 1000 * rng.uniform(0.7, 1.3)), total - position)
+        pitch = rng.uniform(110, 220)
+        for n in range(burst):
+            t = n / sample_rate
+            envelope = 0.5 - 0.5 * math.cos(2 * math.pi * 4 * t)
+            value = sum(math.sin(2 * math.pi * pitch * k * t) / k for k in (1, 2, 3))
+            frames += struct.pack('<h', int(9000 * envelope * value / 1.8))
+        position += burst
+        gap = min(int(gap_ms * sample_rate / 1000), total - position)
+        frames += b'\x00\x00' * gap
+        position += gap
+    return bytes(frames)
+
+
+def wav_bytes(pcm, sample_rate=FIXTURE_SAMPLE_RATE):
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(sample_rate)
+        out.writeframes(pcm)
+    return buffer.getvalue()
+
+
+def load_fixture(path):
+    """Read a 16-bit WAV recording; returns (wav bytes, mono PCM, sample rate)."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    with wave.open(io.BytesIO(data), 'rb') as source:
+        if source.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit PCM WAV fixtures are supported")
+        pcm = source.readframes(source.getnframes())
+        if source.getnchannels() == 2:
+            samples = struct.unpack(f'<{len(pcm) // 2}h', pcm)
+            pcm = struct.pack(f'<{len(samples) // 2}h', *((l + r) // 2 for l, r in zip(samples[::2], samples[1::2])))
+        return data, pcm, source.getframerate()
+
+
+def silent_mp3(frames):
+    """`frames` silent MPEG-1 Layer III frames (128 kbps, 44.1 kHz, about 26 ms each)."""
+    frame = b'\xff\xfb\x90\x64' + b'\x00' * 413
+    return frame * max(frames, 1)
+
+
+# --- Google Cloud fakes ---
+class FakeSpeechClient:
+    def __init__(self, provider, transcripts):
+        self.provider = provider
+        self.transcripts = transcripts
+
+    def recognize(self, config=None, audio=None, **kwargs):
+        language_code = getattr(config, 'language_code', None) or 'en-US'
+
+        def respond():
+            alternative = SimpleNamespace(transcript=self.transcripts.next(), confidence=0.93)
+            return SimpleNamespace(results=[SimpleNamespace(alternatives=[alternative], language_code=language_code.lower())])
+        return self.provider.call(respond)
+
+
+class FakeTranslateClient:
+    def __init__(self, provider):
+        self.provider = provider
+
+    @staticmethod
+    def render(text, target):
+        return f"[{target}] {text}"
+
+    def translate(self, values, source_language=None, target_language='en', format_=None, **kwargs):
+        single = isinstance(values, str)
+        items = [values] if single else list(values)
+
+        def respond():
+            results = [{'input': value, 'translatedText': self.render(value, target_language)} for value in items]
+            return results[0] if single else results
+        return self.provider.call(respond)
+
+
+def fake_google_translator(provider):
+    """A deep_translator.GoogleTranslator replacement backed by the translate provider."""
+    class FakeGoogleTranslator:
+        def __init__(self, source='auto', target='en', **kwargs):
+            self.source = source
+            self.target = target
+
+        def translate(self, text, **kwargs):
+            return provider.call(lambda: FakeTranslateClient.render(text, self.target))
+
+    return FakeGoogleTranslator
+
+
+class FakeTTSClient:
+    def __init__(self, provider):
+        self.provider = provider
+
+    def synthesize_speech(self, input=None, voice=None, audio_config=None, **kwargs):
+        text = getattr(input, 'text', '') or ''
+        return self.provider.call(lambda: SimpleNamespace(audio_content=silent_mp3(len(text) // 3)))
+
+
+def fake_gtts(provider):
+    """A gtts.gTTS replacement backed by the tts provider."""
+    class FakeGTTS:
+        def __init__(self, text, lang='en', **kwargs):
+            self.text = text
+            self.lang = lang
+
+        def write_to_fp(self, fp):
+            fp.write(provider.call(lambda: silent_mp3(len(self.text) // 3)))
+
+        def save(self, path):
+            with open(path, 'wb') as out:
+                self.write_to_fp(out)
+
+    return FakeGTTS
+
+
+# --- yt-dlp fake ---
+def fake_youtube_dl(provider, audio_bytes):
+    """A yt_dlp.YoutubeDL replacement that 'downloads' the fixture into the output folder."""
+    class FakeYoutubeDL:
+        def __init__(self, options=None):
+            self.options = options or {}
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def extract_info(self, url, download=True):
+            video_id = uuid.uuid4().hex[:11]
+            folder = self.options.get('paths', {}).get('home', '.')
+
+            def respond():
+                info = {'id': video_id, 'webpage_url': url}
+                if download:
+                    path = f"{folder}/{video_id}.mp3"
+                    with open(path, 'wb') as out:
+                        out.write(audio_bytes)
+                    info['filepath'] = path
+                return info
+            return provider.call(respond)
+
+    return FakeYoutubeDL
+
+
+# --- Supabase fake ---
+_FILTER_TERM = re.compile(r'^(\w+)\.(eq|neq|gt|gte|lt|lte)\."((?:[^"\\]|\\.)*)"$')
+_COMPARE = {
+    'eq': lambda a, b: a == b,
+    'neq': lambda a, b: a != b,
+    'gt': lambda a, b: a is not None and a > b,
+    'gte': lambda a, b: a is not None and a >= b,
+    'lt': lambda a, b: a is not None and a < b,
+    'lte': lambda a, b: a is not None and a <= b,
+}
+
+
+def _split_top_level(expression):
+    parts, depth, current = [], 0, ''
+    for char in expression:
+        if char == ',' and depth == 0:
+            parts.append(current)
+            current = ''
+            continue
+        depth += char == '('
+        depth -= char == ')'
+        current += char
+    if current:
+        parts.append(current)
+    return parts
+
+
+def _parse_logic(expression, combine=any):
+    """Compile the subset of PostgREST or=/and= filters the app uses into a row predicate."""
+    predicates = []
+    for part in _split_top_level(expression):
+        part = part.strip()
+        if part.startswith('and(') and part.endswith(')'):
+            predicates.append(_parse_logic(part[4:-1], all))
+        elif part.startswith('or(') and part.endswith(')'):
+            predicates.append(_parse_logic(part[3:-1], any))
+        else:
+            match = _FILTER_TERM.match(part)
+            if not match:
+                raise ValueError(f"fake supabase: unsupported filter {part!r}")
+            column, op, value = match.groups()
+            predicates.append(lambda row, column=column, op=op, value=value: _COMPARE[op](_as_text(row.get(column)), value))
+    return lambda row: combine(predicate(row) for predicate in predicates)
+
+
+def _as_text(value):
+    return value if value is None or isinstance(value, str) else str(value)
+
+
+class FakeQuery:
+    """Chainable query with the postgrest-py methods app.py uses."""
+
+    def __init__(self, database, table):
+        self._database = database
+        self._table = table
+        self._action = 'select'
+        self._columns = None
+        self._count = None
+        self._payload = None
+        self._filters = []
+        self._order = []
+        self._limit = None
+        self._range = None
+        self._negate = False
+
+    # Actions
+    def select(self, columns='*', count=None):
+        self._action = 'select'
+        self._columns = None if columns.strip() == '*' else [c.strip() for c in columns.split(',')]
+        self._count = count
+        return self
+
+    def insert(self, rows):
+        self._action, self._payload = 'insert', rows
+        return self
+
+    def update(self, values):
+        self._action, self._payload = 'update', values
+        return self
+
+    def delete(self):
+        self._action = 'delete'
+        return self
+
+    # Filters
+    def _filter(self, predicate):
+        if self._negate:
+            self._negate = False
+            self._filters.append(lambda row: not predicate(row))
+        else:
+            self._filters.append(predicate)
+        return self
+
+    @property
+    def not_(self):
+        self._negate = True
+        return self
+
+    def eq(self, column, value):
+        return self._filter(lambda row: _as_text(row.get(column)) == _as_text(value))
+
+    def neq(self, column, value):
+        return self._filter(lambda row: _as_text(row.get(column)) != _as_text(value))
+
+    def gt(self, column, value):
+        return self._filter(lambda row: _COMPARE['gt'](_as_text(row.get(column)), _as_text(value)))
+
+    def lt(self, column, value):
+        return self._filter(lambda row: _COMPARE['lt'](_as_text(row.get(column)), _as_text(value)))
+
+    def is_(self, column, value):
+        expected = None if value in (None, 'null') else value
+        return self._filter(lambda row: row.get(column) is expected or row.get(column) == expected)
+
+    def or_(self, expression):
+        return self._filter(_parse_logic(expression))
+
+    # Modifiers
+    def order(self, column, desc=False):
+        self._order.append((column, desc))
+        return self
+
+    def limit(self, count):
+        self._limit = count
+        return self
+
+    def range(self, start, end):
+        self._range = (start, end)
+        return self
+
+    def execute(self):
+        return self._database.provider.call(lambda: self._database.run(self))
+
+
+class FakeSupabase:
+    """In-memory tables behind a Supabase-like client; `execute()` goes through the supabase provider."""
+
+    def __init__(self, provider):
+        self.provider = provider
+        self.tables = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def run(self, query):
+        with self._lock:
+            rows = self.tables[query._table]
+            if query._action == 'insert':
+                payload = query._payload if isinstance(query._payload, list) else [query._payload]
+                inserted = []
+                for row in payload:
+                    row = dict(row)
+                    row.setdefault('id', str(uuid.uuid4()))
+                    row.setdefault('timestamp', datetime.utcnow().isoformat())
+                    rows.append(row)
+                    inserted.append(dict(row))
+                return SimpleNamespace(data=inserted, count=None)
+
+            matched = [row for row in rows if all(predicate(row) for predicate in query._filters)]
+            if query._action == 'update':
+                for row in matched:
+                    row.update(query._payload)
+                return SimpleNamespace(data=[dict(row) for row in matched], count=None)
+            if query._action == 'delete':
+                self.tables[query._table] = [row for row in rows if row not in matched]
+                return SimpleNamespace(data=[dict(row) for row in matched], count=None)
+
+            count = len(matched) if query._count else None
+            for column, desc in reversed(query._order):
+                matched.sort(key=lambda row: (row.get(column) is None, _as_text(row.get(column)) or ''), reverse=desc)
+            if query._range:
+                matched = matched[query._range[0]:query._range[1] + 1]
+            if query._limit is not None:
+                matched = matched[:query._limit]
+            if query._columns:
+                matched = [{column: row.get(column) for column in query._columns} for row in matched]
+            return SimpleNamespace(data=[dict(row) for row in matched], count=count)
+
+    def seed_user(self, user_id, email, history_rows=0, seed=None):
+        rng = random.Random(seed)
+        started = datetime.utcnow() - timedelta(days=30)
+        with self._lock:
+            self.tables['users'].append({'id': user_id, 'email': email, 'is_admin': False,
+                                         'password_hash': None, 'wrapped_data_key': None})
+            for n in range(history_rows):
+                sentence = ' '.join(rng.choice(WORDS) for _ in range(12)).capitalize() + '.'
+                self.tables['translation_history'].append({
+                    'id': str(uuid.UUID(int=rng.getrandbits(128))),
+                    'user_id': user_id,
+                    'source_language_code': 'en-US',
+                    'target_language_name': 'Hindi',
+                    'original_text': sentence,
+                    'translated_text': FakeTranslateClient.render(sentence, 'hi'),
+                    'timestamp': (started + timedelta(minutes=n * 7)).isoformat(),
+                })
+
+
+# --- Wiring ---
+def install(app_module, recorder, transcripts, youtube_audio, latency_ms=None, error_rate=None,
+            jitter=0.35, seed=0):
+    """
+    Point the app's provider seams at fakes and wrap its main stages with timers.
+
+    `youtube_audio` is (mp3 bytes written by the fake download, pydub AudioSegment
+    returned when it is decoded). Returns the FakeSupabase so callers can seed it.
+    """
+    latency_ms = dict(DEFAULT_LATENCY_MS, **(latency_ms or {}))
+    error_rate = dict(DEFAULT_ERROR_RATE, **(error_rate or {}))
+    providers = {
+        name: Provider(name, recorder, latency_ms[name], jitter, error_rate[name], seed=seed + n)
+        for n, name in enumerate(sorted(latency_ms))
+    }
+
+    import deep_translator
+    import gcp_clients
+    import sentence_pipeline
+    import youtube_feature
+
+    speech_client = FakeSpeechClient(providers['speech'], transcripts)
+    translate_client = FakeTranslateClient(providers['translate'])
+    tts_client = FakeTTSClient(providers['tts'])
+    gcp_clients.registry.override(
+        speech=lambda: speech_client,
+        tts=lambda: tts_client,
+        translate=lambda: translate_client,
+    )
+    supabase = FakeSupabase(providers['supabase'])
+    app_module.supabase_clients.override(supabase=lambda: supabase)
+    # Per-segment fallback used when a batch translation call fails
+    deep_translator.GoogleTranslator = fake_google_translator(providers['translate'])
+
+    mp3_bytes, decoded = youtube_audio
+    youtube_feature.yt_dlp = SimpleNamespace(YoutubeDL=fake_youtube_dl(providers['download'], mp3_bytes),
+                                             utils=youtube_feature.yt_dlp.utils)
+    youtube_feature.AudioSegment = SimpleNamespace(from_mp3=recorder.wrap('decode', lambda path: decoded))
+    youtube_feature.gTTS = fake_gtts(providers['tts'])
+
+    # App-side stages; these include the provider calls made inside them
+    app_module.probe_audio = recorder.wrap('probe', app_module.probe_audio)
+    app_module.decode_to_pcm = recorder.wrap('decode', app_module.decode_to_pcm)
+    app_module.recognize_long_audio = recorder.wrap('recognize_chunked', app_module.recognize_long_audio)
+    youtube_feature.recognize_long_audio_segments = recorder.wrap(
+        'recognize_chunked', youtube_feature.recognize_long_audio_segments)
+    sentence_pipeline.translate_batch = recorder.wrap('translate_batch', sentence_pipeline.translate_batch)
+    app_module.audio_store.get_or_create = recorder.wrap('synthesize', app_module.audio_store.get_or_create)
+    app_module.save_translation_history = recorder.wrap('history_save', app_module.save_translation_history)
+    app_module.get_translation_history = recorder.wrap('history_query', app_module.get_translation_history)
+    return supabase
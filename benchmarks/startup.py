@@ -0,0 +1,60 @@
+"""
+Benchmark cold start: importing the app module, create_app(), and the first request.
+
+Each run is a fresh interpreter, like a new gunicorn worker or CLI command. The
+first request is GET /login, which needs no external service. Also lists which of
+the heavy optional libraries were already imported by then.
+
+    python benchmarks/startup.py --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ('google', 'pydub', 'yt_dlp', 'gtts', 'speech_recognition', 'supabase', 'deep_translator')
+
+PROBE = '''
+import json, sys, time
+started = time.perf_counter()
+import app as app_module
+imported = time.perf_counter()
+flask_app = app_module.create_app({'SECRET_KEY': 'benchmark'})
+created = time.perf_counter()
+response = flask_app.test_client().get('/login')
+served = time.perf_counter()
+print(json.dumps({
+    'import': imported - started,
+    'create_app': created - imported,
+    'first_request': served - created,
+    'status': response.status_code,
+    'heavy_loaded': sorted({name.split('.')[0] for name in sys.modules} & set(%r)),
+}))
+''' % (HEAVY_MODULES,)
+
+
+def run_once():
+    output = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    for stage in ('import', 'create_app', 'first_request'):
+        values = [run[stage] * 1000 for run in runs]
+        print(f"{stage:<14} median {statistics.median(values):8.1f} ms   min {min(values):8.1f} ms   max {max(values):8.1f} ms")
+    total = [sum(run[stage] for stage in ('import', 'create_app', 'first_request')) * 1000 for run in runs]
+    print(f"{'total':<14} median {statistics.median(total):8.1f} ms")
+    print(f"first request status: {runs[-1]['status']}")
+    print(f"heavy modules loaded by then: {', '.join(runs[-1]['heavy_loaded']) or 'none'}")
+
+
+if __name__ == '__main__':
+    main()
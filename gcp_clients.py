@@ -0,0 +1,148 @@
+import os
+import threading
+import time
+
+
+def _create_speech_client():
+    from google.cloud import speech
+    return speech.SpeechClient()
+
+
+def _create_tts_client():
+    from google.cloud import texttospeech
+    return texttospeech.TextToSpeechClient()
+
+
+def _create_translate_client():
+    from google.cloud import translate_v2 as translate
+    return translate.Client()
+
+
+class ClientRegistry:
+    """
+    Process-wide registry of Google Cloud clients.
+
+    Each client is created on first use and then shared by every request and worker
+    thread in the process, so the gRPC channel and auth handshake are paid once.
+    gRPC channels must not be carried across fork(), so clients created in a parent
+    process are discarded in the child and rebuilt lazily there.
+    """
+
+    def __init__(self, factories):
+        self._factories = factories
+        self._clients = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._created = {name: 0 for name in factories}
+        self._reused = {name: 0 for name in factories}
+        self._init_seconds = {name: 0.0 for name in factories}
+        self._warmed_pid = None
+
+    def _check_fork(self):
+        if self._pid != os.getpid():
+            self._clients = {}
+            self._lock = threading.Lock()
+            self._pid = os.getpid()
+
+    def get(self, name):
+        """Return the shared client called `name`, creating it if needed."""
+        self._check_fork()
+        client = self._clients.get(name)
+        if client is not None:
+            self._reused[name] += 1
+            return client
+        with self._lock:
+            client = self._clients.get(name)
+            if client is None:
+                started = time.perf_counter()
+                client = self._factories[name]()
+                self._init_seconds[name] = round(time.perf_counter() - started, 4)
+                self._clients[name] = client
+                self._created[name] += 1
+                print(f"GCP client registry: created {name} client in process {self._pid}")
+            else:
+                self._reused[name] += 1
+        return client
+
+    def warm_up(self, names=None):
+        """Create clients up front (e.g. at worker start) so the first request doesn't pay for it."""
+        self._warmed_pid = os.getpid()
+        for name in names or self._factories:
+            try:
+                self.get(name)
+            except Exception as e:
+                print(f"GCP client registry: warm-up of {name} client failed: {e}")
+
+    def warm_up_in_background(self, names=None):
+        """
+        Start warming this process's clients on a background thread, once per process.
+        Cheap to call on every request; clients created before a fork are discarded in
+        the child, so each worker has to warm its own.
+        """
+        if self._warmed_pid == os.getpid():
+            return
+        with self._lock:
+            if self._warmed_pid == os.getpid():
+                return
+            self._warmed_pid = os.getpid()
+        threading.Thread(target=self.warm_up, args=(names,), name='gcp-warm-up', daemon=True).start()
+
+    def reset(self):
+        """Drop all clients; they are recreated on next use."""
+        with self._lock:
+            self._clients = {}
+
+    def override(self, **factories):
+        """Replace client factories (e.g. with local fakes for benchmarks/end_to_end.py)."""
+        with self._lock:
+            for name, factory in factories.items():
+                self._factories[name] = factory
+                self._clients.pop(name, None)
+                self._created.setdefault(name, 0)
+                self._reused.setdefault(name, 0)
+                self._init_seconds.setdefault(name, 0.0)
+
+    def stats(self):
+        return {
+            'pid': self._pid,
+            'clients': {
+                name: {
+                    'initialized': name in self._clients,
+                    'created': self._created[name],
+                    'reused': self._reused[name],
+                    'init_seconds': self._init_seconds[name],
+                }
+                for name in self._factories
+            }
+        }
+
+
+registry = ClientRegistry({
+    'speech': _create_speech_client,
+    'tts': _create_tts_client,
+    'translate': _create_translate_client,
+})
+
+# Drop inherited clients in forked children (e.g. gunicorn --preload workers)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=registry._check_fork)
+
+
+def warm_up(names=None):
+    """
+    Create this process's clients now. Call it from a gunicorn post_fork hook, e.g. in
+    gunicorn.conf.py: `def post_fork(server, worker): import gcp_clients; gcp_clients.warm_up()`.
+    """
+    registry.warm_up(names)
+
+
+def get_speech_client():
+    return registry.get('speech')
+
+
+def get_tts_client():
+    return registry.get('tts')
+
+
+def get_translate_client():
+    return registry.get('translate')
@@ -0,0 +1,158 @@
+import os
+import atexit
+import queue
+import threading
+import time
+
+# Defaults, overridable from .env
+HISTORY_BATCH_SIZE = int(os.getenv('HISTORY_BATCH_SIZE', 50))
+HISTORY_FLUSH_INTERVAL = float(os.getenv('HISTORY_FLUSH_INTERVAL', 1.0))
+HISTORY_MAX_QUEUE = int(os.getenv('HISTORY_MAX_QUEUE', 10000))
+HISTORY_MAX_RETRIES = int(os.getenv('HISTORY_MAX_RETRIES', 5))
+
+
+class WriteBehindBuffer:
+    """
+    Accepts rows without blocking and writes them in batches on a background thread.
+
+    A batch is flushed when `batch_size` rows are waiting or `flush_interval` seconds
+    have passed since the first of them arrived. `flush_fn(rows)` must insert all rows
+    in one call; failed batches are retried with exponential backoff. After `max_retries`
+    attempts the rows are tried one at a time, so one bad row doesn't take the rest of
+    the batch with it; rows that still fail are dropped, logged and passed to
+    `on_drop(row)`. Pending rows are drained at interpreter exit.
+    """
+
+    def __init__(self, name, flush_fn, batch_size=HISTORY_BATCH_SIZE, flush_interval=HISTORY_FLUSH_INTERVAL,
+                 max_queue=HISTORY_MAX_QUEUE, max_retries=HISTORY_MAX_RETRIES, on_drop=None):
+        self.name = name
+        self.flush_fn = flush_fn
+        self.on_drop = on_drop
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._thread_pid = None
+        self._start_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self.rows_written = 0
+        self.rows_dropped = 0
+        self.batches_written = 0
+        self.batches_failed = 0
+        self.last_flush_seconds = 0.0
+        self.total_flush_seconds = 0.0
+
+    def _ensure_started(self):
+        # Start lazily so each forked worker gets its own flusher thread
+        if self._thread is not None and self._thread_pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or self._thread_pid != os.getpid() or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=f"{self.name}-writer", daemon=True)
+                self._thread_pid = os.getpid()
+                self._thread.start()
+
+    def add(self, row):
+        """Queue a row for writing. Returns False if the buffer is full."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(row)
+            return True
+        except queue.Full:
+            return False
+
+    def _collect_batch(self):
+        try:
+            first = self._queue.get(timeout=0.5)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._stopping.is_set():
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _flush(self, batch):
+        delay = 0.5
+        for attempt in range(1, self.max_retries + 1):
+            started = time.perf_counter()
+            try:
+                self.flush_fn(batch)
+                elapsed = time.perf_counter() - started
+                self.last_flush_seconds = round(elapsed, 4)
+                self.total_flush_seconds += elapsed
+                self.batches_written += 1
+                self.rows_written += len(batch)
+                return True
+            except Exception as e:
+                error = e
+                print(f"{self.name} writer: batch of {len(batch)} failed (attempt {attempt}/{self.max_retries}): {e}")
+                if attempt < self.max_retries and not self._stopping.is_set():
+                    time.sleep(delay)
+                    delay = min(delay * 2, 10)
+        self.batches_failed += 1
+        self._flush_rows(batch, error)
+        return False
+
+    def _flush_rows(self, batch, error):
+        # A single row has already been retried on its own
+        for row in batch:
+            if len(batch) > 1:
+                try:
+                    self.flush_fn([row])
+                    self.rows_written += 1
+                    continue
+                except Exception as e:
+                    error = e
+            print(f"{self.name} writer: dropping row: {error}")
+            self.rows_dropped += 1
+            if self.on_drop:
+                try:
+                    self.on_drop(row)
+                except Exception as e:
+                    print(f"{self.name} writer: on_drop failed: {e}")
+
+    def _run(self):
+        while not self._stopping.is_set():
+            batch = self._collect_batch()
+            if batch:
+                self._flush(batch)
+
+    def drain(self, timeout=10):
+        """Stop the background thread and write whatever is still queued."""
+        self._stopping.set()
+        if self._thread is not None and self._thread_pid == os.getpid():
+            self._thread.join(timeout=timeout)
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
+        if batch:
+            self._flush(batch)
+
+    def stats(self):
+        return {
+            'queue_depth': self._queue.qsize(),
+            'rows_written': self.rows_written,
+            'rows_dropped': self.rows_dropped,
+            'batches_written': self.batches_written,
+            'batches_failed': self.batches_failed,
+            'last_flush_seconds': self.last_flush_seconds,
+            'avg_flush_seconds': round(self.total_flush_seconds / self.batches_written, 4) if self.batches_written else 0.0,
+        }
+
+    def register_shutdown(self):
+        atexit.register(self.drain)
+        return self
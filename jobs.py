@@ -0,0 +1,191 @@
+import os
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Defaults, overridable from .env
+JOB_WORKERS = int(os.getenv('YOUTUBE_JOB_WORKERS', 2))
+JOB_MAX_PENDING = int(os.getenv('YOUTUBE_JOB_MAX_PENDING', 20))
+JOB_RESULT_TTL = int(os.getenv('YOUTUBE_JOB_RESULT_TTL', 600))
+# How long a shared record of an unfinished job is kept, in case its worker dies
+JOB_RECORD_TTL = int(os.getenv('JOB_RECORD_TTL', 6 * 3600))
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+class Job:
+    """A unit of background work and its progress."""
+
+    def __init__(self, owner=None):
+        self.id = uuid.uuid4().hex
+        self.owner = owner
+        self.status = 'queued'  # queued -> running -> finished | failed
+        self.stage = 'queued'
+        self.result = None
+        self.error = None
+        self.segments = {}  # index -> partial result published while running
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.on_change = None  # set by JobQueue to publish progress to a shared store
+
+    def _changed(self):
+        if self.on_change:
+            self.on_change(self)
+
+    def set_stage(self, stage):
+        """Called by the job function to report which pipeline stage it is in."""
+        self.stage = stage
+        self._changed()
+
+    def add_segment(self, index, segment):
+        """Called by the job function to publish a partial result before it finishes."""
+        self.segments[index] = segment
+        self._changed()
+
+    def ready_segments(self):
+        """The partial results available so far, contiguous from the start."""
+        ready = []
+        while len(ready) in self.segments:
+            ready.append(self.segments[len(ready)])
+        return ready
+
+    @property
+    def done(self):
+        return self.status in ('finished', 'failed')
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'stage': self.stage,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+
+    def to_record(self):
+        """Everything needed to rebuild the job in another process."""
+        record = self.to_dict()
+        record['owner'] = self.owner
+        record['segments'] = self.segments
+        return record
+
+    @classmethod
+    def from_record(cls, record):
+        job = cls(owner=record.get('owner'))
+        job.id = record['job_id']
+        for field in ('status', 'stage', 'result', 'error', 'created_at', 'started_at', 'finished_at'):
+            setattr(job, field, record.get(field))
+        # JSON object keys are strings
+        job.segments = {int(index): segment for index, segment in (record.get('segments') or {}).items()}
+        return job
+
+
+class JobQueue:
+    """
+    Bounded background job runner.
+
+    `submit` returns a Job immediately and the work runs on a small worker pool, so
+    long pipelines don't hold a web worker. At most `max_pending` jobs may be queued or
+    running at once. Finished jobs are kept for `result_ttl` seconds for polling and
+    then dropped.
+
+    With a shared `store` (see shared_state.py) every change to a job is also written
+    there, so a status poll that lands on another worker or host still finds it. The
+    work itself, and the `max_pending` limit, stay with the process that accepted it.
+    """
+
+    def __init__(self, name, max_workers=JOB_WORKERS, max_pending=JOB_MAX_PENDING, result_ttl=JOB_RESULT_TTL,
+                 store=None):
+        self.name = name
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self.store = store
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def _expire(self):
+        now = time.time()
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.done and now - job.finished_at > self.result_ttl]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def _record_key(self, job_id):
+        return f"job:{self.name}:{job_id}"
+
+    def _publish(self, job):
+        if self.store is None:
+            return
+        try:
+            self.store.set(self._record_key(job.id), json.dumps(job.to_record()).encode('utf-8'),
+                           ttl=self.result_ttl if job.done else JOB_RECORD_TTL)
+        except Exception as e:
+            # Local pollers still see the job; only cross-worker polling is affected
+            print(f"{self.name} job {job.id}: could not publish to shared store: {e}")
+
+    def _pending(self):
+        return sum(1 for job in self._jobs.values() if not job.done)
+
+    def submit(self, fn, owner=None):
+        """
+        Queue `fn(job)` and return the Job. `fn` returns the job result or raises.
+        Raises QueueFullError if too many jobs are already pending.
+        """
+        with self._lock:
+            self._expire()
+            if self._pending() >= self.max_pending:
+                raise QueueFullError(f"{self.name} queue is full ({self.max_pending} pending jobs)")
+            job = Job(owner=owner)
+            self._jobs[job.id] = job
+        job.on_change = self._publish
+        self._publish(job)
+        self._executor.submit(self._run, job, fn)
+        return job
+
+    def _run(self, job, fn):
+        job.status = 'running'
+        job.started_at = time.time()
+        self._publish(job)
+        try:
+            job.result = fn(job)
+            job.status = 'finished'
+            job.stage = 'done'
+        except Exception as e:
+            print(f"{self.name} job {job.id} failed: {e}")
+            job.error = str(e)
+            job.status = 'failed'
+        finally:
+            job.finished_at = time.time()
+            self._publish(job)
+
+    def get(self, job_id):
+        """The job, or a read-only snapshot of it from the shared store if another process runs it."""
+        with self._lock:
+            self._expire()
+            job = self._jobs.get(job_id)
+        if job is None and self.store is not None:
+            try:
+                record = self.store.get(self._record_key(job_id))
+            except Exception as e:
+                print(f"{self.name} job {job_id}: could not read shared store: {e}")
+                record = None
+            if record is not None:
+                job = Job.from_record(json.loads(record))
+        return job
+
+    def stats(self):
+        with self._lock:
+            self._expire()
+            counts = {'queued': 0, 'running': 0, 'finished': 0, 'failed': 0}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            return counts
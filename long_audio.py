@@ -0,0 +1,83 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from gcp_clients import get_speech_client
+
+# Synchronous recognize() accepts up to 60 s of audio; stay safely below it
+MAX_CHUNK_MS = int(os.getenv('RECOGNITION_MAX_CHUNK_MS', 55000))
+MIN_CHUNK_MS = 5000
+MIN_SILENCE_MS = 400
+SILENCE_THRESH_OFFSET_DB = 16
+RECOGNITION_SAMPLE_RATE = 16000
+RECOGNITION_MAX_WORKERS = int(os.getenv('RECOGNITION_MAX_WORKERS', 8))
+
+recognition_executor = ThreadPoolExecutor(max_workers=RECOGNITION_MAX_WORKERS, thread_name_prefix='recognize')
+
+
+def find_cut_points(audio, max_chunk_ms=MAX_CHUNK_MS, min_chunk_ms=MIN_CHUNK_MS):
+    """
+    Choose cut positions (ms) so that every piece is at most `max_chunk_ms` long.
+    Cuts are placed in the middle of the latest silence that fits; if a stretch has
+    no usable silence it is cut hard at the limit.
+    """
+    duration = len(audio)
+    if duration <= max_chunk_ms:
+        return []
+    silence_thresh = audio.dBFS - SILENCE_THRESH_OFFSET_DB if audio.dBFS != float('-inf') else -50
+    from pydub import silence
+    silences = silence.detect_silence(audio, min_silence_len=MIN_SILENCE_MS, silence_thresh=silence_thresh, seek_step=10)
+    candidates = [(start + end) // 2 for start, end in silences]
+
+    cuts = []
+    cursor = 0
+    while duration - cursor > max_chunk_ms:
+        limit = cursor + max_chunk_ms
+        fitting = [c for c in candidates if cursor + min_chunk_ms <= c <= limit]
+        cut = fitting[-1] if fitting else limit
+        cuts.append(cut)
+        cursor = cut
+    return cuts
+
+
+def split_audio(audio, max_chunk_ms=MAX_CHUNK_MS):
+    """Split a pydub AudioSegment at silence boundaries into pieces under the API limit."""
+    bounds = [0] + find_cut_points(audio, max_chunk_ms) + [len(audio)]
+    return [audio[start:end] for start, end in zip(bounds, bounds[1:])]
+
+
+def _recognize_chunk(chunk, language_code, speech_client):
+    from google.cloud import speech
+    # Raw 16-bit PCM goes to the API as LINEAR16, so no encoder (or temp file) is involved
+    pcm = chunk.set_frame_rate(RECOGNITION_SAMPLE_RATE).set_channels(1).set_sample_width(2)
+    config = speech.RecognitionConfig(
+        encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
+        sample_rate_hertz=RECOGNITION_SAMPLE_RATE,
+        audio_channel_count=1,
+        enable_automatic_punctuation=True,
+        language_code=language_code,
+    )
+    response = speech_client.recognize(config=config, audio=speech.RecognitionAudio(content=pcm.raw_data))
+    return " ".join(result.alternatives[0].transcript.strip()
+                    for result in response.results if result.alternatives)
+
+
+def recognize_long_audio_segments(audio, language_code, speech_client=None):
+    """
+    Recognize audio of any length: split it at silences and recognize the pieces in
+    parallel on the bounded recognition pool. Returns the non-empty chunk transcripts in order.
+    """
+    speech_client = speech_client or get_speech_client()
+    chunks = split_audio(audio)
+    print(f"Recognizing {len(audio) / 1000:.1f}s of audio in {len(chunks)} chunk(s)")
+    if len(chunks) == 1:
+        transcripts = [_recognize_chunk(chunks[0], language_code, speech_client)]
+    else:
+        transcripts = recognition_executor.map(
+            lambda chunk: _recognize_chunk(chunk, language_code, speech_client),
+            chunks
+        )
+    return [t for t in transcripts if t]
+
+
+def recognize_long_audio(audio, language_code, speech_client=None):
+    """Recognize audio of any length and return the stitched transcript."""
+    return " ".join(recognize_long_audio_segments(audio, language_code, speech_client))
@@ -0,0 +1,42 @@
+class RouteRegistry:
+    """
+    Collects views and app hooks at import time so create_app() can register them.
+
+    It takes the same decorators as a Flask app (`route`, `after_request`,
+    `context_processor`, `cli_command`). Unlike a Blueprint, endpoint names are not
+    prefixed, so existing `url_for('play')` calls and templates keep working.
+    """
+
+    def __init__(self):
+        self._routes = []  # (rule, endpoint, view, options)
+        self._hooks = []  # (app method name, function)
+        self._commands = []  # (name, function)
+
+    def route(self, rule, **options):
+        def decorator(view):
+            endpoint = options.pop('endpoint', view.__name__)
+            self._routes.append((rule, endpoint, view, options))
+            return view
+        return decorator
+
+    def after_request(self, func):
+        self._hooks.append(('after_request', func))
+        return func
+
+    def context_processor(self, func):
+        self._hooks.append(('context_processor', func))
+        return func
+
+    def cli_command(self, name):
+        def decorator(func):
+            self._commands.append((name, func))
+            return func
+        return decorator
+
+    def init_app(self, app):
+        for rule, endpoint, view, options in self._routes:
+            app.add_url_rule(rule, endpoint, view, **options)
+        for hook, func in self._hooks:
+            getattr(app, hook)(func)
+        for name, func in self._commands:
+            app.cli.command(name)(func)
@@ -2,7 +2,7 @@ from flask import Blueprint, request, jsonify, current_app
 from functools import wraps
 from cryptography.fernet import InvalidToken
 import json
-from flask_login import login_required
+from flask_login import login_required, current_user
 
 security_bp = Blueprint('security_api', __name__)
 
@@ -75,11 +75,22 @@ def rotate_key():
                 'error': 'Unauthorized: Only admins can rotate keys'
             }), 403
 
-        success = current_app.security_manager.rotate_key()
-        return jsonify({
-            'success': success,
-            'message': 'Key rotation successful' if success else 'Key rotation failed'
-        })
+        result = current_app.security_manager.rotate_key()
+        if not result:
+            return jsonify({
+                'success': False,
+                'message': 'Key rotation failed'
+            }), 500
+
+        response = {
+            'success': True,
+            'message': 'Key rotation successful',
+            'key_version': current_app.security_manager.keyring.current_version
+        }
+        if result is not True:
+            # Existing ciphertexts are being re-encrypted in the background
+            response['rekey_job_id'] = result.id
+        return jsonify(response)
 
     except Exception as e:
         current_app.logger.error(f"Key rotation error: {str(e)}")
@@ -87,3 +98,22 @@ def rotate_key():
             'success': False,
             'error': str(e)
         }), 500
+
+@security_bp.route('/key/rotate/<string:job_id>')
+@require_military_mode
+@login_required
+def rekey_status(job_id):
+    """Progress of the background re-encryption started by a key rotation"""
+    if not current_user.is_admin:
+        return jsonify({
+            'success': False,
+            'error': 'Unauthorized: Only admins can view key rotation jobs'
+        }), 403
+
+    job = current_app.security_manager.rekey_job(job_id)
+    if not job:
+        return jsonify({
+            'success': False,
+            'error': 'Job not found or expired'
+        }), 404
+    return jsonify({'success': job.status != 'failed', **job.to_dict()})
@@ -1,51 +1,453 @@
 import os
-from cryptography.fernet import Fernet
+import struct
+import threading
+from cryptography.exceptions import InvalidTag
+from cryptography.fernet import Fernet, InvalidToken
 from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from datetime import datetime
 import base64
 import json
+from concurrent.futures import ThreadPoolExecutor
 from flask import current_app
+from ttl_cache import TTLCache
 
 # Constants
 KEY_SALT = os.getenv('SECURITY_SALT', 'default-salt')  # Should be set in .env
 KEY_ITERATIONS = 100000
 KEY_LENGTH = 32
+# Placeholder secrets that ship with the code and must never become key material
+PUBLIC_DEFAULT_SECRETS = {'dev-secret-key-please-change-in-production'}
+
+# Versioned keyring
+KEY_VERSION = int(os.getenv('SECURITY_KEY_VERSION', 1))
+KEY_ID_PREFIX = 'k'
+REKEY_BATCH_SIZE = int(os.getenv('SECURITY_REKEY_BATCH_SIZE', 200))
+
+# Envelope encryption (per-owner data keys)
+DATA_KEY_CACHE_TTL = int(os.getenv('DATA_KEY_CACHE_TTL', 900))
+DECRYPT_MAX_WORKERS = int(os.getenv('DECRYPT_MAX_WORKERS', 4))
+DECRYPT_CHUNK_SIZE = 32
+
+# Streaming encryption (chunked AES-256-GCM) for audio artifacts
+STREAM_MAGIC = b'VTSE'
+STREAM_VERSION = 2
+STREAM_CHUNK_SIZE = int(os.getenv('STREAM_CHUNK_SIZE', 64 * 1024))
+STREAM_SUFFIX = '.enc'
+_STREAM_HEADER = struct.Struct('>4sBII16s')  # magic, version, key id (0 = caller's key), chunk size, salt
+_CHUNK_LENGTH = struct.Struct('>I')
+_TAG_SIZE = 16
+
+
+def _stream_cipher(key, salt):
+    """AES-GCM cipher for one stream, derived from a Fernet-format key and the stream's salt."""
+    hkdf = HKDF(algorithm=hashes.SHA256(), length=32, salt=salt, info=b'voice-translation audio stream')
+    return AESGCM(hkdf.derive(base64.urlsafe_b64decode(key)))
+
+
+def _chunk_nonce(index, final):
+    # Each stream has its own derived key, so a counter is a safe nonce. The final flag
+    # is part of the nonce so a stream cut at a chunk boundary fails to authenticate.
+    return struct.pack('>QI', index, 1 if final else 0)
+
+
+class StreamEncryptor:
+    """
+    File-like writer that encrypts everything written to it into `fileobj`.
+
+    Plaintext is sealed in `chunk_size` pieces, each with its own authentication tag,
+    so memory use stays at about one chunk however large the audio is. The header
+    binds every chunk, chunks are numbered and the last one is marked, which makes
+    reordering, splicing or truncation detectable. Call `close()` to write the final
+    chunk; the underlying file is left open.
+    """
+
+    def __init__(self, key, fileobj, chunk_size=STREAM_CHUNK_SIZE, key_id=0):
+        self.fileobj = fileobj
+        self.chunk_size = chunk_size
+        salt = os.urandom(16)
+        self._header = _STREAM_HEADER.pack(STREAM_MAGIC, STREAM_VERSION, key_id, chunk_size, salt)
+        self._cipher = _stream_cipher(key, salt)
+        self._buffer = bytearray()
+        self._index = 0
+        self.closed = False
+        self.bytes_written = 0
+        fileobj.write(self._header)
+
+    def _seal(self, plaintext, final):
+        sealed = self._cipher.encrypt(_chunk_nonce(self._index, final), bytes(plaintext), self._header)
+        self.fileobj.write(_CHUNK_LENGTH.pack(len(sealed)))
+        self.fileobj.write(sealed)
+        self._index += 1
+
+    def write(self, data):
+        if self.closed:
+            raise ValueError("write to closed StreamEncryptor")
+        self._buffer += data
+        self.bytes_written += len(data)
+        # Hold back the tail so the final chunk is only empty for an empty stream
+        while len(self._buffer) > self.chunk_size:
+            self._seal(self._buffer[:self.chunk_size], final=False)
+            del self._buffer[:self.chunk_size]
+        return len(data)
+
+    def flush(self):
+        self.fileobj.flush()
+
+    def close(self):
+        if not self.closed:
+            self._seal(self._buffer, final=True)
+            self._buffer = bytearray()
+            self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def decrypt_stream(key, fileobj):
+    """
+    Yield the plaintext of a StreamEncryptor stream one chunk at a time.
+
+    `key` may be a callable taking the key id from the stream header and returning the
+    key to use. Raises InvalidToken if the header, any chunk or the stream's length fails to
+    authenticate. Plaintext already yielded before a failure was authentic.
+    """
+    header = fileobj.read(_STREAM_HEADER.size)
+    if len(header) != _STREAM_HEADER.size:
+        raise InvalidToken("Truncated stream header")
+    magic, version, key_id, _, salt = _STREAM_HEADER.unpack(header)
+    if magic != STREAM_MAGIC or version != STREAM_VERSION:
+        raise InvalidToken("Not an encrypted audio stream")
+    cipher = _stream_cipher(key(key_id) if callable(key) else key, salt)
+
+    def read_chunk():
+        length = fileobj.read(_CHUNK_LENGTH.size)
+        if not length:
+            return None
+        if len(length) != _CHUNK_LENGTH.size:
+            raise InvalidToken("Truncated chunk")
+        sealed = fileobj.read(_CHUNK_LENGTH.unpack(length)[0])
+        if len(sealed) != _CHUNK_LENGTH.unpack(length)[0]:
+            raise InvalidToken("Truncated chunk")
+        return sealed
+
+    index = 0
+    current = read_chunk()
+    if current is None:
+        raise InvalidToken("Stream has no chunks")
+    while current is not None:
+        following = read_chunk()  # read ahead to know whether this is the last chunk
+        try:
+            yield cipher.decrypt(_chunk_nonce(index, following is None), current, header)
+        except InvalidTag:
+            raise InvalidToken(f"Chunk {index} failed authentication")
+        current = following
+        index += 1
+
+
+def stream_plaintext_size(path):
+    """Plaintext length of an encrypted stream file, computed from its size and header."""
+    with open(path, 'rb') as f:
+        header = f.read(_STREAM_HEADER.size)
+    if len(header) != _STREAM_HEADER.size:
+        raise InvalidToken("Truncated stream header")
+    chunk_size = _STREAM_HEADER.unpack(header)[3]
+    body = os.path.getsize(path) - _STREAM_HEADER.size
+    overhead = _CHUNK_LENGTH.size + _TAG_SIZE
+    chunks = max(1, -(-body // (chunk_size + overhead)))
+    return body - chunks * overhead
+
+
+class Keyring:
+    """
+    Versioned Fernet keys derived from one master secret.
+
+    Key N is PBKDF2(secret, salt + N), so every worker derives the same keys and a
+    rotated-out key can always be re-derived to read older data. Each key is derived
+    at most once per process and cached. Tokens are tagged with the key id
+    ("k<N>:<fernet token>") so decryption picks the right key with a dict lookup.
+    The current version is persisted to `state_path` (if given) so a rotation in one
+    worker is picked up by the others.
+    """
+
+    def __init__(self, secret, salt=KEY_SALT, current_version=KEY_VERSION, state_path=None):
+        self._secret = secret.encode() if isinstance(secret, str) else secret
+        self._salt = salt
+        self._current = current_version
+        self._state_path = state_path
+        self._state_mtime = None
+        self._keys = {}  # version -> urlsafe base64 key
+        self._fernets = {}  # version -> Fernet
+        self._lock = threading.Lock()
+        self.derivations = 0
+
+    # --- Versions ---
+    def _refresh_state(self):
+        if not self._state_path:
+            return
+        try:
+            mtime = os.stat(self._state_path).st_mtime
+        except OSError:
+            return
+        if mtime != self._state_mtime:
+            try:
+                with open(self._state_path) as f:
+                    self._current = max(self._current, int(json.load(f)['current_version']))
+                self._state_mtime = mtime
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Keyring: ignoring unreadable state file {self._state_path}: {e}")
+
+    @property
+    def current_version(self):
+        self._refresh_state()
+        return self._current
+
+    def rotate(self):
+        """Make a new key current and return its version. Older keys stay readable."""
+        with self._lock:
+            self._refresh_state()
+            self._current += 1
+            version = self._current
+            if self._state_path:
+                tmp_path = f"{self._state_path}.tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump({'current_version': version}, f)
+                os.replace(tmp_path, self._state_path)
+                self._state_mtime = os.stat(self._state_path).st_mtime
+        self.fernet(version)  # derive now rather than on the first request
+        return version
+
+    # --- Keys ---
+    def key(self, version):
+        """The key for `version`, deriving it on first use."""
+        key = self._keys.get(version)
+        if key is None:
+            with self._lock:
+                key = self._keys.get(version)
+                if key is None:
+                    kdf = PBKDF2HMAC(
+                        algorithm=hashes.SHA256(),
+                        length=KEY_LENGTH,
+                        salt=f"{self._salt}:{version}".encode(),
+                        iterations=KEY_ITERATIONS,
+                    )
+                    key = base64.urlsafe_b64encode(kdf.derive(self._secret))
+                    self._keys[version] = key
+                    self.derivations += 1
+        return key
+
+    def fernet(self, version):
+        cipher = self._fernets.get(version)
+        if cipher is None:
+            cipher = self._fernets.setdefault(version, Fernet(self.key(version)))
+        return cipher
+
+    # --- Tokens ---
+    @staticmethod
+    def key_id(token):
+        """The key version a token was encrypted with, or None for an untagged token."""
+        prefix, sep, _ = token.partition(':')
+        if sep and prefix.startswith(KEY_ID_PREFIX) and prefix[len(KEY_ID_PREFIX):].isdigit():
+            return int(prefix[len(KEY_ID_PREFIX):])
+        return None
+
+    def encrypt(self, data):
+        """Encrypt bytes with the current key and return a tagged token string."""
+        version = self.current_version
+        return f"{KEY_ID_PREFIX}{version}:{self.fernet(version).encrypt(data).decode()}"
+
+    def decrypt(self, token):
+        """Decrypt a tagged token. Raises InvalidToken if it is untagged or does not verify."""
+        version = self.key_id(token)
+        if version is None:
+            raise InvalidToken("Token has no key id")
+        return self.fernet(version).decrypt(token.partition(':')[2].encode())
+
+    def needs_rekey(self, token):
+        return self.key_id(token) != self.current_version
+
+    def reencrypt(self, token):
+        """Return `token` re-encrypted under the current key (unchanged if it already is)."""
+        if not self.needs_rekey(token):
+            return token
+        return self.encrypt(self.decrypt(token))
+
+    def stats(self):
+        return {
+            'current_version': self.current_version,
+            'derived_keys': sorted(self._keys),
+            'derivations': self.derivations,
+        }
+
+
+def reencrypt_batches(keyring, fetch_batch, store_batch, batch_size=REKEY_BATCH_SIZE, progress=None):
+    """
+    Re-encrypt stored tokens under the keyring's current key, one batch at a time.
+
+    `fetch_batch(after, limit)` returns up to `limit` (id, token) pairs with id greater
+    than `after` (None for the first batch), ordered by id; `store_batch(pairs)` writes
+    the re-encrypted pairs back. Tokens that fail to decrypt are counted and left alone.
+    `progress(counts)` is called after every batch. Returns the final counts.
+    """
+    counts = {'scanned': 0, 'reencrypted': 0, 'failed': 0, 'batches': 0}
+    after = None
+    while True:
+        rows = fetch_batch(after, batch_size)
+        if not rows:
+            break
+        updated = []
+        for row_id, token in rows:
+            if keyring.needs_rekey(token):
+                try:
+                    updated.append((row_id, keyring.reencrypt(token)))
+                except InvalidToken:
+                    counts['failed'] += 1
+        if updated:
+            store_batch(updated)
+        counts['scanned'] += len(rows)
+        counts['reencrypted'] += len(updated)
+        counts['batches'] += 1
+        after = rows[-1][0]
+        if progress:
+            progress(dict(counts))
+        if len(rows) < batch_size:
+            break
+    return counts
+
+
+class EnvelopeEncryptor:
+    """
+    Encrypts each owner's records with their own data key, wrapped by the keyring.
+
+    Only the wrapped data key is persisted, through `load_wrapped(owner)` (returning the
+    token or None) and `store_wrapped(owner, token)` (which must keep an existing key
+    and return whichever wrapped key is stored, so two workers never both create one).
+    Unwrapped keys are cached for `ttl` seconds, so decrypting a page of records costs
+    one key lookup. Rotating the keyring only means re-wrapping data keys.
+    """
+
+    def __init__(self, keyring, load_wrapped, store_wrapped, ttl=DATA_KEY_CACHE_TTL, max_workers=DECRYPT_MAX_WORKERS):
+        self.keyring = keyring
+        self.load_wrapped = load_wrapped
+        self.store_wrapped = store_wrapped
+        self._keys = TTLCache(ttl=ttl)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='decrypt')
+        self._lock = threading.Lock()
+        self._owner_locks = {}
+        self.keys_created = 0
+        self.records_decrypted = 0
+        self.decrypt_failures = 0
+
+    def data_key(self, owner):
+        """The owner's data key as a Fernet, creating and storing one on first use."""
+        owner = str(owner)
+        cipher = self._keys.get(owner)
+        if cipher is not None:
+            return cipher
+        with self._lock:
+            owner_lock = self._owner_locks.setdefault(owner, threading.Lock())
+        with owner_lock:
+            cipher = self._keys.get(owner)
+            if cipher is None:
+                wrapped = self.load_wrapped(owner)
+                if not wrapped:
+                    wrapped = self.store_wrapped(owner, self.keyring.encrypt(Fernet.generate_key()))
+                    self.keys_created += 1
+                cipher = Fernet(self.keyring.decrypt(wrapped))
+                self._keys.set(owner, cipher)
+        with self._lock:
+            self._owner_locks.pop(owner, None)
+        return cipher
+
+    def invalidate(self, owner):
+        self._keys.invalidate(str(owner))
+
+    def encrypt(self, owner, data):
+        return self.data_key(owner).encrypt(data).decode()
+
+    def decrypt(self, owner, token):
+        return self.data_key(owner).decrypt(token.encode())
+
+    def decrypt_many(self, owner, tokens):
+        """
+        Decrypt a batch of the owner's tokens, returning plaintexts in order (None for
+        any that fail). Large batches are split across the decrypt pool.
+        """
+        cipher = self.data_key(owner)
+
+        def decrypt_chunk(chunk):
+            plaintexts = []
+            for token in chunk:
+                try:
+                    plaintexts.append(cipher.decrypt(token.encode()))
+                except (InvalidToken, AttributeError):
+                    plaintexts.append(None)
+            return plaintexts
+
+        chunks = [tokens[i:i + DECRYPT_CHUNK_SIZE] for i in range(0, len(tokens), DECRYPT_CHUNK_SIZE)]
+        if len(chunks) <= 1:
+            # A normal history page; not worth a hop to the pool
+            results = [decrypt_chunk(chunk) for chunk in chunks]
+        else:
+            results = self._executor.map(decrypt_chunk, chunks)
+        plaintexts = [plaintext for chunk in results for plaintext in chunk]
+        failures = plaintexts.count(None)
+        self.records_decrypted += len(plaintexts) - failures
+        self.decrypt_failures += failures
+        return plaintexts
+
+    def stats(self):
+        return {
+            'cached_keys': self._keys.stats(),
+            'keys_created': self.keys_created,
+            'records_decrypted': self.records_decrypted,
+            'decrypt_failures': self.decrypt_failures,
+        }
 
 
 class SecurityManager:
     def __init__(self, app=None):
         self.app = app
-        self.key = None
-        self.fernet = None
+        self.keyring = None
+        # True when no usable secret was configured and keys are random for this process only
+        self.ephemeral = False
+        # Optional (fetch_batch, store_batch) pair re-encrypted after a rotation; see reencrypt_batches
+        self.rekey_source = None
+        self._rekey_jobs = None
         if app is not None:
             self.init_app(app)
 
     def init_app(self, app):
         """Initialize the security manager with the Flask app"""
         self.app = app
-        self.key = self._generate_key()
-        self.fernet = Fernet(self.key)
+        secret = os.getenv('SECURITY_MASTER_KEY') or app.config.get('SECRET_KEY')
+        self.ephemeral = False
+        if not secret or secret in PUBLIC_DEFAULT_SECRETS:
+            # Never derive keys from a secret anyone can read in the source. A random secret
+            # keeps encryption working, but keys differ per process and are lost on restart.
+            app.logger.error("No SECURITY_MASTER_KEY or non-default SECRET_KEY configured; "
+                             "using a random per-process encryption key. Set SECURITY_MASTER_KEY.")
+            secret = os.urandom(32)
+            self.ephemeral = True
+        elif KEY_SALT == 'default-salt':
+            app.logger.warning("SECURITY_SALT is not set; using the default key derivation salt")
+        os.makedirs(app.instance_path, exist_ok=True)
+        self.keyring = Keyring(secret, state_path=os.path.join(app.instance_path, 'keyring.json'))
         app.security_manager = self
 
-    def _generate_key(self):
-        """Generate a secure key using PBKDF2HMAC"""
-        try:
-            kdf = PBKDF2HMAC(
-                algorithm=hashes.SHA256(),
-                length=KEY_LENGTH,
-                salt=KEY_SALT.encode(),
-                iterations=KEY_ITERATIONS,
-            )
-            # Use a secure random key for production
-            key = base64.urlsafe_b64encode(kdf.derive(os.urandom(32)))
-            if self.app:
-                self.app.logger.info("Successfully generated encryption key")
-            return key
-        except Exception as e:
-            if self.app:
-                self.app.logger.error(f"Error generating encryption key: {e}")
-            raise
+    @property
+    def key(self):
+        """The current key (urlsafe base64, Fernet format)."""
+        return self.keyring.key(self.keyring.current_version)
+
+    @property
+    def fernet(self):
+        return self.keyring.fernet(self.keyring.current_version)
 
     def encrypt(self, data, metadata=None):
         """
@@ -58,13 +460,14 @@ class SecurityManager:
         """
         try:
             timestamp = datetime.utcnow().isoformat()
-            encrypted_data = self.fernet.encrypt(data.encode())
+            encrypted_data = self.keyring.encrypt(data.encode())
             
             encrypted_info = {
-                'encrypted_data': encrypted_data.decode(),
+                'encrypted_data': encrypted_data,
+                'key_id': self.keyring.key_id(encrypted_data),
                 'timestamp': timestamp,
                 'metadata': metadata or {},
-                'encryption_version': '1.0'
+                'encryption_version': '2.0'
             }
             
             return encrypted_info
@@ -81,8 +484,7 @@ class SecurityManager:
             tuple: Decrypted data, metadata
         """
         try:
-            encrypted_data = encrypted_info['encrypted_data'].encode()
-            decrypted_data = self.fernet.decrypt(encrypted_data)
+            decrypted_data = self.keyring.decrypt(encrypted_info['encrypted_data'])
             
             return decrypted_data.decode(), encrypted_info.get('metadata', {})
         except Exception as e:
@@ -90,16 +492,52 @@ class SecurityManager:
             raise
 
     def rotate_key(self):
-        """Rotate encryption key"""
+        """
+        Rotate to a new key version. Data under older versions stays readable; if a
+        rekey source is configured, a background job re-encrypts it in batches.
+        Returns the rekey Job, or True if there is nothing to re-encrypt.
+        """
         try:
-            new_key = self._generate_key()
-            self.key = new_key
-            self.fernet = Fernet(new_key)
-            current_app.logger.info("Successfully rotated encryption key")
-            return True
+            version = self.keyring.rotate()
+            current_app.logger.info(f"Rotated encryption key to version {version}")
         except Exception as e:
             current_app.logger.error(f"Key rotation error: {e}")
             return False
+        if not self.rekey_source:
+            return True
+        from jobs import QueueFullError
+        fetch_batch, store_batch = self.rekey_source
+        try:
+            return self._rekey_queue().submit(lambda job: reencrypt_batches(
+                self.keyring, fetch_batch, store_batch,
+                progress=lambda counts: job.set_stage(f"reencrypted {counts['reencrypted']} of {counts['scanned']}")
+            ))
+        except QueueFullError:
+            # The running job re-encrypts under whichever key is current as it goes
+            current_app.logger.warning("Re-encryption already in progress; not starting another")
+            return True
+
+    def _rekey_queue(self):
+        # Created on first use; with a shared state backend, any worker can report progress
+        if self._rekey_jobs is None:
+            from jobs import JobQueue
+            from shared_state import get_state_backend
+            self._rekey_jobs = JobQueue('rekey', max_workers=1, max_pending=1, store=get_state_backend())
+        return self._rekey_jobs
+
+    def rekey_job(self, job_id):
+        return self._rekey_queue().get(job_id)
+
+    def encrypt_stream(self, fileobj, key=None, chunk_size=STREAM_CHUNK_SIZE):
+        """Return a StreamEncryptor writing into `fileobj` (defaults to the current keyring key)."""
+        if key:
+            return StreamEncryptor(key, fileobj, chunk_size)
+        version = self.keyring.current_version
+        return StreamEncryptor(self.keyring.key(version), fileobj, chunk_size, key_id=version)
+
+    def decrypt_stream(self, fileobj, key=None):
+        """Yield decrypted chunks of a stream written by `encrypt_stream`."""
+        return decrypt_stream(key or self.keyring.key, fileobj)
 
     def verify_key(self):
         """Verify encryption key integrity"""
@@ -0,0 +1,111 @@
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from batch_translate import translate_batch
+from translation_cache import base_language
+
+MAX_SENTENCE_CHARS = int(os.getenv('MAX_SENTENCE_CHARS', 400))
+SYNTHESIS_MAX_WORKERS = int(os.getenv('SYNTHESIS_MAX_WORKERS', 8))
+
+# Sentence terminators for the languages in language_map (Latin, Devanagari danda, CJK, Arabic)
+_SENTENCE_END = re.compile(r'(?<=[.!?।॥؟])\s+|(?<=[。！？])')
+
+# Words that end in a period without ending the sentence ("Dr. Rao", "e.g. this")
+_ABBREVIATIONS = frozenset({
+    'mr', 'mrs', 'ms', 'dr', 'prof', 'sr', 'jr', 'st', 'mt', 'rev', 'hon', 'gen', 'col', 'capt', 'lt', 'sgt',
+    'vs', 'e.g', 'i.e', 'cf', 'no', 'fig', 'approx',
+})
+# Initials and dotted acronyms ("J. K. Rowling", "U.S.")
+_INITIALS = re.compile(r'(?:\w\.)*\w')
+
+# Scripts written without spaces between sentences
+_UNSPACED_LANGUAGES = {'ja', 'zh'}
+
+synthesis_executor = ThreadPoolExecutor(max_workers=SYNTHESIS_MAX_WORKERS, thread_name_prefix='synthesize')
+
+
+def _is_sentence_break(text, match):
+    terminator = text[match.start() - 1]
+    if terminator not in '.!?':
+        return True
+    # A Latin sentence doesn't continue in lower case
+    if text[match.end():match.end() + 1].islower():
+        return False
+    if terminator == '.':
+        start = match.start() - 1
+        while start > 0 and not text[start - 1].isspace():
+            start -= 1
+        word = text[start:match.start() - 1].lstrip('("\'').lower()
+        if word in _ABBREVIATIONS or _INITIALS.fullmatch(word):
+            return False
+    return True
+
+
+def _sentence_parts(text):
+    start = 0
+    for match in _SENTENCE_END.finditer(text):
+        if _is_sentence_break(text, match):
+            yield text[start:match.start()]
+            start = match.end()
+    yield text[start:]
+
+
+def split_sentences(text, max_chars=MAX_SENTENCE_CHARS):
+    """Split a transcript into sentences, breaking overly long ones at word boundaries."""
+    sentences = []
+    for part in _sentence_parts(text or ''):
+        part = part.strip()
+        while len(part) > max_chars:
+            cut = part.rfind(' ', 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            sentences.append(part[:cut].strip())
+            part = part[cut:].strip()
+        if part:
+            sentences.append(part)
+    return sentences
+
+
+def translate_and_synthesize_sentences(transcript, source_lang_code, target_lang_code, synthesize, audio_store,
+                                       tts_language_code=None, voice=None, on_segment=None):
+    """
+    Translate and synthesize a transcript one sentence at a time.
+
+    All sentences are translated in one batch, then each translated sentence is
+    synthesized in parallel (and de-duplicated by the audio store). `on_segment(index,
+    segment)` is called as each sentence's audio becomes ready, so callers can start
+    playback before the rest is done.
+
+    Returns (translated_text, segments, combined_audio_filename) where segments is the
+    ordered playlist of {'source_text', 'translated_text', 'audio_filename'} dicts.
+    """
+    sentences = split_sentences(transcript)
+    translations = translate_batch(sentences, source_lang_code, target_lang_code)
+    segments = [
+        {'source_text': sentence, 'translated_text': translated, 'audio_filename': None}
+        for sentence, translated in zip(sentences, translations)
+    ]
+
+    futures = {
+        synthesis_executor.submit(
+            audio_store.get_or_create,
+            text=segment['translated_text'],
+            language_code=tts_language_code or target_lang_code,
+            synthesize=lambda text=segment['translated_text']: synthesize(text),
+            voice=voice,
+            encoding='mp3'
+        ): index
+        for index, segment in enumerate(segments)
+        if segment['translated_text'] and segment['translated_text'].strip()
+    }
+    for future in as_completed(futures):
+        index = futures[future]
+        segments[index]['audio_filename'] = future.result()
+        if on_segment:
+            on_segment(index, segments[index])
+
+    playlist = [segment['audio_filename'] for segment in segments if segment['audio_filename']]
+    combined = audio_store.combine(playlist) if playlist else None
+    separator = '' if base_language(target_lang_code) in _UNSPACED_LANGUAGES else ' '
+    translated_text = separator.join(segment['translated_text'] for segment in segments if segment['translated_text'])
+    return translated_text, segments, combined
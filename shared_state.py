@@ -0,0 +1,256 @@
+import os
+import json
+import sqlite3
+import threading
+import time
+
+from ttl_cache import TTLCache
+
+# Defaults, overridable from .env
+STATE_BACKEND = os.getenv('STATE_BACKEND', 'memory')  # memory | sqlite | redis
+STATE_SQLITE_PATH = os.getenv('STATE_SQLITE_PATH', os.path.join(os.getcwd(), 'cache', 'shared_state.db'))
+STATE_REDIS_URL = os.getenv('STATE_REDIS_URL', 'redis://localhost:6379/0')
+STATE_KEY_PREFIX = os.getenv('STATE_KEY_PREFIX', 'voice-translation:')
+SQLITE_PURGE_INTERVAL = 60
+
+
+class SQLiteBackend:
+    """
+    Shared state in a SQLite file, for several worker processes on one host.
+
+    Values are bytes with an optional expiry. Artifacts already live on the host's
+    disk, which every worker there can read, so they are not copied into the backend
+    (`remote_artifacts` is False).
+    """
+
+    name = 'sqlite'
+    remote_artifacts = False
+
+    def __init__(self, path=STATE_SQLITE_PATH):
+        self.path = path
+        self._conn = None
+        self._conn_pid = None
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+
+    def _connection(self):
+        # SQLite connections must not cross a fork, so reopen in each worker process
+        if self._conn is None or self._conn_pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS state ('
+                ' key TEXT PRIMARY KEY,'
+                ' value BLOB NOT NULL,'
+                ' expires_at REAL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_state_expires_at ON state(expires_at)')
+            conn.commit()
+            self._conn = conn
+            self._conn_pid = os.getpid()
+        return self._conn
+
+    def _purge(self, conn, now):
+        if now - self._last_purge >= SQLITE_PURGE_INTERVAL:
+            self._last_purge = now
+            conn.execute('DELETE FROM state WHERE expires_at IS NOT NULL AND expires_at <= ?', (now,))
+
+    def get(self, key):
+        with self._lock:
+            row = self._connection().execute(
+                'SELECT value FROM state WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)',
+                (key, time.time())
+            ).fetchone()
+        return bytes(row[0]) if row else None
+
+    def set(self, key, value, ttl=None, keep_ttl=False):
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            if keep_ttl:
+                conn.execute('UPDATE state SET value = ? WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)',
+                             (value, key, now))
+            else:
+                conn.execute('INSERT OR REPLACE INTO state (key, value, expires_at) VALUES (?, ?, ?)',
+                             (key, value, now + ttl if ttl else None))
+            self._purge(conn, now)
+            conn.commit()
+
+    def incr(self, key, delta, minimum=None):
+        # One UPDATE statement, so increments from other processes are never lost
+        total, params = 'CAST(value AS INTEGER) + ?', [delta]
+        if minimum is not None:
+            total, params = f'MAX({total}, ?)', params + [minimum]
+        with self._lock:
+            conn = self._connection()
+            # Values are stored as JSON bytes, so write the number back as text in a BLOB
+            conn.execute(
+                f'UPDATE state SET value = CAST(CAST({total} AS TEXT) AS BLOB)'
+                ' WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)',
+                params + [key, time.time()]
+            )
+            conn.commit()
+
+    def delete(self, key):
+        with self._lock:
+            conn = self._connection()
+            conn.execute('DELETE FROM state WHERE key = ?', (key,))
+            conn.commit()
+
+    def stats(self):
+        with self._lock:
+            keys = self._connection().execute('SELECT COUNT(*) FROM state').fetchone()[0]
+        return {'backend': self.name, 'path': self.path, 'keys': keys}
+
+
+# INCRBY that leaves missing keys missing, clamps at an optional floor and keeps the TTL
+_REDIS_INCR_EXISTING = """
+local value = redis.call('GET', KEYS[1])
+if not value then return nil end
+value = tonumber(value) + tonumber(ARGV[1])
+if ARGV[2] ~= '' then value = math.max(value, tonumber(ARGV[2])) end
+redis.call('SET', KEYS[1], value, 'KEEPTTL')
+return value
+"""
+
+
+class RedisBackend:
+    """
+    Shared state on a Redis-protocol server, for workers spread over several hosts.
+
+    Anything that speaks the Redis protocol works (Redis, Valkey, KeyDB, or a local
+    server standing in for one). Artifacts are copied into the server so any node can
+    serve them (`remote_artifacts` is True). Needs the optional `redis` package.
+    """
+
+    name = 'redis'
+    remote_artifacts = True
+
+    def __init__(self, url=STATE_REDIS_URL, prefix=STATE_KEY_PREFIX):
+        self.url = url
+        self.prefix = prefix
+        self._client = None
+        self._client_pid = None
+        self._incr_script = None
+        self._lock = threading.Lock()
+
+    def _redis(self):
+        # Reconnect in each worker process rather than sharing sockets across fork()
+        if self._client is None or self._client_pid != os.getpid():
+            with self._lock:
+                if self._client is None or self._client_pid != os.getpid():
+                    try:
+                        import redis
+                    except ImportError:
+                        raise RuntimeError("STATE_BACKEND=redis needs the 'redis' package (pip install redis)")
+                    self._client = redis.Redis.from_url(self.url)
+                    self._incr_script = self._client.register_script(_REDIS_INCR_EXISTING)
+                    self._client_pid = os.getpid()
+        return self._client
+
+    def get(self, key):
+        return self._redis().get(self.prefix + key)
+
+    def set(self, key, value, ttl=None, keep_ttl=False):
+        if keep_ttl:
+            self._redis().set(self.prefix + key, value, keepttl=True, xx=True)
+        else:
+            self._redis().set(self.prefix + key, value, ex=int(ttl) if ttl else None)
+
+    def incr(self, key, delta, minimum=None):
+        # Runs server-side as one script, so concurrent workers can't interleave
+        self._redis()
+        self._incr_script(keys=[self.prefix + key], args=[delta, '' if minimum is None else minimum])
+
+    def delete(self, key):
+        self._redis().delete(self.prefix + key)
+
+    def stats(self):
+        return {'backend': self.name, 'url': self.url.split('@')[-1], 'keys': self._redis().dbsize()}
+
+
+class SharedCache:
+    """
+    TTLCache-compatible cache whose entries live in a shared backend.
+
+    Values must be JSON-serializable. Every worker (and, with Redis, every host)
+    sees the same entries, at the cost of a backend round trip per lookup.
+    """
+
+    def __init__(self, backend, namespace, ttl):
+        self.backend = backend
+        self.namespace = namespace
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, key):
+        return f"cache:{self.namespace}:{key}"
+
+    def get(self, key, default=None):
+        raw = self.backend.get(self._key(key))
+        if raw is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return json.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        self.backend.set(self._key(key), json.dumps(value).encode('utf-8'), ttl=self.ttl if ttl is None else ttl)
+
+    def update(self, key, func):
+        """
+        Replace a live entry with func(value), keeping its expiry. Missing keys are left alone.
+        This is a read then a write, so concurrent workers can overwrite each other; use incr() for counters.
+        """
+        raw = self.backend.get(self._key(key))
+        if raw is not None:
+            self.backend.set(self._key(key), json.dumps(func(json.loads(raw))).encode('utf-8'), keep_ttl=True)
+
+    def incr(self, key, delta, minimum=None):
+        """Atomically add `delta` to a live integer entry (not going below `minimum`), keeping its expiry."""
+        self.backend.incr(self._key(key), delta, minimum)
+
+    def invalidate(self, key):
+        self.backend.delete(self._key(key))
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': self.backend.name,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_state_backend():
+    """The configured shared backend, or None when STATE_BACKEND=memory (process-local state)."""
+    global _backend
+    if STATE_BACKEND == 'memory':
+        return None
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if STATE_BACKEND == 'sqlite':
+                    _backend = SQLiteBackend()
+                elif STATE_BACKEND == 'redis':
+                    _backend = RedisBackend()
+                else:
+                    raise ValueError(f"Unknown STATE_BACKEND {STATE_BACKEND!r} (expected memory, sqlite or redis)")
+    return _backend
+
+
+def make_cache(namespace, ttl, max_entries=10000):
+    """A TTLCache, or a SharedCache when a shared backend is configured."""
+    backend = get_state_backend()
+    if backend is None:
+        return TTLCache(ttl=ttl, max_entries=max_entries)
+    return SharedCache(backend, namespace, ttl)
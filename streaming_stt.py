@@ -0,0 +1,177 @@
+import os
+import json
+import queue
+import threading
+import time
+import uuid
+from gcp_clients import get_speech_client
+
+# Defaults, overridable from .env
+STREAM_MAX_SESSIONS = int(os.getenv('STREAM_MAX_SESSIONS', 50))
+STREAM_IDLE_TIMEOUT = int(os.getenv('STREAM_IDLE_TIMEOUT', 60))
+STREAM_MAX_BUFFERED_CHUNKS = int(os.getenv('STREAM_MAX_BUFFERED_CHUNKS', 400))
+
+_CLOSE = object()
+
+
+class StreamingSession:
+    """
+    One live recognition stream.
+
+    The browser POSTs MediaRecorder chunks (WEBM/Opus) while the user is still
+    talking; they are fed to Speech `streaming_recognize` on a background thread and
+    interim/final transcripts are published as events. When the audio ends,
+    `on_complete(transcript, emit)` runs so translation can start right away.
+    """
+
+    def __init__(self, owner, language_code, on_complete=None):
+        self.id = uuid.uuid4().hex
+        self.owner = owner
+        self.language_code = language_code
+        self.on_complete = on_complete
+        self.transcript_parts = []
+        self.last_activity = time.time()
+        self.closed = False
+        self.finished = False
+        self._audio = queue.Queue(maxsize=STREAM_MAX_BUFFERED_CHUNKS)
+        self._events = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=f"stream-{self.id[:8]}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    # --- Audio input ---
+    def feed(self, chunk):
+        if self.closed:
+            raise ValueError("Stream is already closed.")
+        self.last_activity = time.time()
+        if chunk:
+            self._audio.put(chunk, timeout=5)
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.last_activity = time.time()
+            self._audio.put(_CLOSE)
+
+    def _audio_requests(self):
+        from google.cloud import speech
+        while True:
+            chunk = self._audio.get()
+            if chunk is _CLOSE:
+                return
+            yield speech.StreamingRecognizeRequest(audio_content=chunk)
+
+    # --- Events ---
+    def emit(self, event, data):
+        self._events.put((event, data))
+
+    def events(self, poll_seconds=15):
+        """Yield (event, data) pairs until the session finishes; yields None as a keep-alive."""
+        while True:
+            try:
+                item = self._events.get(timeout=poll_seconds)
+            except queue.Empty:
+                yield None
+                continue
+            yield item
+            if item[0] in ('done', 'error'):
+                return
+
+    # --- Recognition thread ---
+    def _run(self):
+        from google.cloud import speech
+        try:
+            config = speech.StreamingRecognitionConfig(
+                config=speech.RecognitionConfig(
+                    encoding=speech.RecognitionConfig.AudioEncoding.WEBM_OPUS,
+                    sample_rate_hertz=48000,
+                    language_code=self.language_code,
+                    enable_automatic_punctuation=True,
+                ),
+                interim_results=True,
+            )
+            responses = get_speech_client().streaming_recognize(config=config, requests=self._audio_requests())
+            for response in responses:
+                for result in response.results:
+                    if not result.alternatives:
+                        continue
+                    text = result.alternatives[0].transcript
+                    if result.is_final:
+                        self.transcript_parts.append(text.strip())
+                        self.emit('final', {'text': text, 'transcript': self.transcript})
+                    else:
+                        self.emit('interim', {'text': text, 'transcript': self.transcript})
+
+            if not self.transcript:
+                self.emit('error', {'error': 'Speech recognition could not understand audio (no results).'})
+                return
+            self.emit('transcript', {'transcript': self.transcript, 'detected_source_language': self.language_code})
+            if self.on_complete:
+                self.on_complete(self.transcript, self.emit)
+            self.emit('done', {'transcript': self.transcript})
+        except Exception as e:
+            print(f"Streaming session {self.id} failed: {e}")
+            self.emit('error', {'error': f"Speech recognition service error: {e}"})
+        finally:
+            self.finished = True
+            self.last_activity = time.time()
+            # Unblock a producer that is still waiting to enqueue audio
+            while not self._audio.empty():
+                try:
+                    self._audio.get_nowait()
+                except queue.Empty:
+                    break
+
+    @property
+    def transcript(self):
+        return ' '.join(part for part in self.transcript_parts if part)
+
+
+class StreamingSessionManager:
+    """Tracks live sessions for this process and drops idle ones."""
+
+    def __init__(self, max_sessions=STREAM_MAX_SESSIONS, idle_timeout=STREAM_IDLE_TIMEOUT):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def _expire(self):
+        now = time.time()
+        for session_id, session in list(self._sessions.items()):
+            if now - session.last_activity > self.idle_timeout:
+                session.close()
+                if session.finished or now - session.last_activity > 2 * self.idle_timeout:
+                    del self._sessions[session_id]
+
+    def create(self, owner, language_code, on_complete=None):
+        with self._lock:
+            self._expire()
+            if len(self._sessions) >= self.max_sessions:
+                raise RuntimeError("Too many live streams in progress.")
+            session = StreamingSession(owner, language_code, on_complete=on_complete)
+            self._sessions[session.id] = session
+        session.start()
+        return session
+
+    def get(self, session_id, owner):
+        with self._lock:
+            self._expire()
+            session = self._sessions.get(session_id)
+        if session is None or session.owner != owner:
+            return None
+        return session
+
+    def stats(self):
+        with self._lock:
+            self._expire()
+            return {
+                'sessions': len(self._sessions),
+                'active': sum(1 for s in self._sessions.values() if not s.finished),
+            }
+
+
+def format_sse(event, data):
+    """Serialize one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
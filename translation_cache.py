@@ -0,0 +1,254 @@
+import os
+import hashlib
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+# Defaults, overridable from .env
+CACHE_DIR = os.getenv('TRANSLATION_CACHE_DIR', os.path.join(os.getcwd(), 'cache'))
+MEMORY_MAX_ENTRIES = int(os.getenv('TRANSLATION_CACHE_MEMORY_ENTRIES', 4096))
+DISK_MAX_BYTES = int(os.getenv('TRANSLATION_CACHE_DISK_BYTES', 64 * 1024 * 1024))
+DISK_SYNC_INTERVAL = float(os.getenv('TRANSLATION_CACHE_SYNC_INTERVAL', 60))
+ACCESS_FLUSH_INTERVAL = float(os.getenv('TRANSLATION_CACHE_ACCESS_FLUSH', 30))
+
+
+def base_language(lang_code):
+    """Reduce a locale such as 'hi-IN' to the base language 'hi' used by the translator."""
+    return (lang_code or '').split('-')[0].lower()
+
+
+def normalize_text(text):
+    """Normalize text so trivially different inputs share one cache entry."""
+    return ' '.join(unicodedata.normalize('NFC', text).split())
+
+
+class TranslationCache:
+    """
+    Content-addressed cache in front of GoogleTranslator.
+
+    Entries are keyed on (source base language, target base language, normalized text).
+    Lookups go to an in-process LRU first, then to a SQLite file on disk that is
+    shared by every worker on the host. The disk tier is trimmed to `disk_max_bytes`
+    by evicting the least recently used rows.
+
+    Only the memory tier is under the process-wide lock; each thread reads and writes
+    the disk tier on its own SQLite connection. Each process keeps a running total of
+    the disk tier's size and re-reads the real total every `sync_interval` seconds
+    (other workers write to the same file). Disk hits only buffer their access time;
+    the buffer is written in one batch with the next insert or after
+    `access_flush_interval` seconds. Eviction deletes a bounded batch of the least
+    recently used rows in one statement.
+    """
+
+    def __init__(self, db_path, memory_max_entries=MEMORY_MAX_ENTRIES, disk_max_bytes=DISK_MAX_BYTES,
+                 sync_interval=DISK_SYNC_INTERVAL, access_flush_interval=ACCESS_FLUSH_INTERVAL):
+        self.db_path = db_path
+        self.memory_max_entries = memory_max_entries
+        self.disk_max_bytes = disk_max_bytes
+        self.sync_interval = sync_interval
+        self.access_flush_interval = access_flush_interval
+        self._memory = OrderedDict()
+        # Guards the memory tier and counters only; disk I/O runs outside it
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # Guards the disk bookkeeping below (never held during I/O)
+        self._disk_state_lock = threading.Lock()
+        self._evicting = threading.Lock()
+        self._disk_pid = None
+        self._disk_bytes = 0
+        self._synced_at = 0.0
+        self._pending_access = {}  # key -> last access time not yet written
+        self._flushed_at = 0.0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    # --- Keys ---
+    @staticmethod
+    def make_key(source, target, text):
+        raw = f"{base_language(source)}\x1f{base_language(target)}\x1f{normalize_text(text)}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    # --- Disk tier ---
+    def _connection(self):
+        # One connection per thread, so lookups on different threads don't queue behind
+        # each other's disk I/O; reopened in each worker process since they can't cross a fork
+        local = self._local
+        if getattr(local, 'conn', None) is None or local.pid != os.getpid():
+            directory = os.path.dirname(self.db_path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS translations ('
+                ' key TEXT PRIMARY KEY,'
+                ' translated_text TEXT NOT NULL,'
+                ' size INTEGER NOT NULL,'
+                ' last_access REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_translations_last_access ON translations(last_access)')
+            conn.commit()
+            local.conn = conn
+            local.pid = os.getpid()
+            with self._disk_state_lock:
+                first_in_process = self._disk_pid != os.getpid()
+                if first_in_process:
+                    self._disk_pid = os.getpid()
+                    self._pending_access = {}
+                    self._flushed_at = time.monotonic()
+            if first_in_process:
+                self._sync_size(conn)
+        return local.conn
+
+    def _sync_size(self, conn):
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM translations').fetchone()[0]
+        with self._disk_state_lock:
+            self._disk_bytes = total
+            self._synced_at = time.monotonic()
+        return total
+
+    def _take_pending_access(self):
+        with self._disk_state_lock:
+            pending, self._pending_access = self._pending_access, {}
+            self._flushed_at = time.monotonic()
+        return pending
+
+    def _flush_access(self, conn, pending):
+        if pending:
+            conn.executemany('UPDATE translations SET last_access = ? WHERE key = ?',
+                             [(accessed, key) for key, accessed in pending.items()])
+
+    def _disk_get(self, key):
+        conn = self._connection()
+        row = conn.execute('SELECT translated_text FROM translations WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        with self._disk_state_lock:
+            self._pending_access[key] = time.time()
+            due = time.monotonic() - self._flushed_at >= self.access_flush_interval
+        if due:
+            self._flush_access(conn, self._take_pending_access())
+            conn.commit()
+        return row[0]
+
+    def _disk_put(self, key, translated_text):
+        conn = self._connection()
+        size = len(key) + len(translated_text.encode('utf-8'))
+        pending = self._take_pending_access()
+        pending.pop(key, None)
+        conn.execute(
+            'INSERT OR REPLACE INTO translations (key, translated_text, size, last_access) VALUES (?, ?, ?, ?)',
+            (key, translated_text, size, time.time())
+        )
+        self._flush_access(conn, pending)
+        conn.commit()
+        with self._disk_state_lock:
+            # A replaced row is counted twice until the next sync; that only makes eviction a little early
+            self._disk_bytes += size
+            sync_due = time.monotonic() - self._synced_at >= self.sync_interval
+            total = self._disk_bytes
+        if sync_due:
+            total = self._sync_size(conn)
+        if total > self.disk_max_bytes:
+            self._disk_evict(conn)
+
+    def _disk_evict(self, conn):
+        # One thread per process evicts; trim to 90% of the budget so we don't evict on every insert
+        if not self._evicting.acquire(blocking=False):
+            return
+        try:
+            count, total = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM translations').fetchone()
+            target = int(self.disk_max_bytes * 0.9)
+            if total <= target or not count:
+                return
+            # Delete a bounded number of the least recently used rows, sized from the average row
+            average = max(total // count, 1)
+            limit = -(-(total - target) // average)
+            conn.execute(
+                'DELETE FROM translations WHERE key IN ('
+                ' SELECT key FROM translations ORDER BY last_access ASC LIMIT ?)',
+                (limit,)
+            )
+            conn.commit()
+            self._sync_size(conn)
+        finally:
+            self._evicting.release()
+
+    # --- Memory tier ---
+    def _memory_put(self, key, translated_text):
+        self._memory[key] = translated_text
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_max_entries:
+            self._memory.popitem(last=False)
+
+    # --- Public API ---
+    def get(self, source, target, text):
+        """Return the cached translation or None."""
+        key = self.make_key(source, target, text)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return self._memory[key]
+        try:
+            translated_text = self._disk_get(key)
+        except sqlite3.Error as e:
+            print(f"Translation cache disk read failed: {e}")
+            translated_text = None
+        with self._lock:
+            if translated_text is not None:
+                self.disk_hits += 1
+                self._memory_put(key, translated_text)
+                return translated_text
+            self.misses += 1
+            return None
+
+    def put(self, source, target, text, translated_text):
+        """Store a translation in both tiers."""
+        if not translated_text:
+            return
+        key = self.make_key(source, target, text)
+        with self._lock:
+            self._memory_put(key, translated_text)
+        try:
+            self._disk_put(key, translated_text)
+        except sqlite3.Error as e:
+            print(f"Translation cache disk write failed: {e}")
+
+    def translate(self, source, target, text):
+        """Translate `text`, going to the network only on a cache miss."""
+        if not text or not text.strip():
+            return text
+        cached = self.get(source, target, text)
+        if cached is not None:
+            return cached
+        from deep_translator import GoogleTranslator
+        translated_text = GoogleTranslator(source=base_language(source), target=base_language(target)).translate(text)
+        self.put(source, target, text, translated_text)
+        return translated_text
+
+    def stats(self):
+        """Return hit/miss counters for monitoring."""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_ratio': round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                'memory_entries': len(self._memory),
+                'disk_bytes': self._disk_bytes,
+                'pending_access_writes': len(self._pending_access),
+            }
+
+
+# Shared process-wide cache
+translation_cache = TranslationCache(os.path.join(CACHE_DIR, 'translations.sqlite3'))
+
+
+def cached_translate(source, target, text):
+    """Drop-in replacement for GoogleTranslator(source, target).translate(text)."""
+    return translation_cache.translate(source, target, text)
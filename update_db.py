@@ -1,14 +1,64 @@
-from app import db, app
-
-def update_database():
-    with app.app_context():
-        try:
-            # Add the new columns
-            db.engine.execute('ALTER TABLE translation_history ADD COLUMN IF NOT EXISTS encrypted_data TEXT')
-            db.engine.execute('ALTER TABLE translation_history ADD COLUMN IF NOT EXISTS is_encrypted BOOLEAN DEFAULT FALSE')
-            print("Successfully added new columns to translation_history table")
-        except Exception as e:
-            print(f"Error updating database: {e}")
+import os
+import sys
+
+from dotenv import load_dotenv, find_dotenv
+
+load_dotenv(find_dotenv(), override=True)
+
+# Schema changes, safe to run more than once
+MIGRATIONS = [
+    'ALTER TABLE translation_history ADD COLUMN IF NOT EXISTS encrypted_data TEXT',
+    'ALTER TABLE translation_history ADD COLUMN IF NOT EXISTS is_encrypted BOOLEAN DEFAULT FALSE',
+    # Per-user history data key, wrapped by the server keyring
+    'ALTER TABLE users ADD COLUMN IF NOT EXISTS wrapped_data_key TEXT',
+    # Bulk re-wrap after a key rotation: one UPDATE per batch instead of one per user
+    '''CREATE OR REPLACE FUNCTION rewrap_data_keys(pairs jsonb) RETURNS integer
+LANGUAGE sql AS $$
+    WITH updated AS (
+        UPDATE users SET wrapped_data_key = p.wrapped_data_key
+        FROM jsonb_to_recordset(pairs) AS p(id text, wrapped_data_key text)
+        WHERE users.id::text = p.id
+        RETURNING 1
+    )
+    SELECT count(*)::integer FROM updated
+$$''',
+]
+
+
+def migration_sql():
+    return ';\n'.join(MIGRATIONS) + ';'
+
+
+def update_database(database_url=None):
+    """
+    Apply MIGRATIONS over a direct Postgres connection (the Supabase connection string
+    in DATABASE_URL). Without one, print the SQL to run in the Supabase SQL editor.
+    Returns True if the migrations were applied.
+    """
+    database_url = database_url or os.getenv('DATABASE_URL')
+    if not database_url:
+        print("DATABASE_URL is not set. Run this SQL in the Supabase SQL editor:\n")
+        print(migration_sql())
+        return False
+
+    import psycopg2
+    try:
+        conn = psycopg2.connect(database_url)
+    except psycopg2.Error as e:
+        print(f"Error connecting to the database: {e}")
+        return False
+    try:
+        with conn, conn.cursor() as cursor:
+            for statement in MIGRATIONS:
+                cursor.execute(statement)
+        print("Successfully added new columns to translation_history and users tables")
+        return True
+    except psycopg2.Error as e:
+        print(f"Error updating database: {e}")
+        return False
+    finally:
+        conn.close()
+
 
 if __name__ == '__main__':
-    update_database() 
\ No newline at end of file
+    sys.exit(0 if update_database() else 1)
@@ -1,20 +1,26 @@
 import os
+import io
 import uuid
 from flask import current_app
 from pydub import AudioSegment
-from google.cloud import speech
 from google.cloud import texttospeech
 from google.cloud import translate_v2 as translate
 import html
 import yt_dlp
 from yt_dlp.utils import DownloadError # Ensure this is imported correctly
 import google.api_core.exceptions
-from deep_translator import GoogleTranslator
 from gtts import gTTS
+from sentence_pipeline import translate_and_synthesize_sentences
+from long_audio import recognize_long_audio_segments
+
+yt_dlp.utils.std_headers['User-Agent'] = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
 
 # Timeout for the long-running speech recognition operation in seconds (e.g., 15 minutes)
 GCS_OPERATION_TIMEOUT = 900
 
+# Longest stretch of a video that is processed, in seconds
+YOUTUBE_MAX_DURATION = int(os.getenv('YOUTUBE_MAX_DURATION', 900))
+
 def download_youtube_audio_refined(youtube_url, output_dir):
     """Downloads first 5 minutes of audio from a YouTube video using yt-dlp, saves it, and returns the path."""
     try:
@@ -86,21 +92,27 @@ def download_youtube_audio_refined(youtube_url, output_dir):
         current_app.logger.error(f"Generic error during yt-dlp download for URL ({youtube_url}): {e}")
         return None, f"An unexpected error occurred during download: {str(e)}"
 
-def process_youtube_video(youtube_url, source_lang_code, target_lang_code, speech_client, upload_folder):
+def process_youtube_video(youtube_url, source_lang_code, target_lang_code, speech_client, upload_folder, progress_callback=None, on_segment=None):
     """
-    Process first 5 minutes of YouTube video:
+    Process the first YOUTUBE_MAX_DURATION seconds of a YouTube video:
     1. Download audio
-    2. Transcribe using Google Speech-to-Text
-    3. Translate using Google Translator
-    4. Convert to speech using gTTS
+    2. Transcribe using Google Speech-to-Text (in parallel silence-split chunks)
+    3. Translate sentence by sentence (batched)
+    4. Convert each sentence to speech using gTTS, in parallel
+
+    If given, progress_callback(stage) is called as each stage starts, and
+    on_segment(index, segment) as each translated sentence's audio is ready.
     """
     audio_file = None
-    flac_file = None
+
+    def report(stage):
+        if progress_callback:
+            progress_callback(stage)
     
     try:
         current_app.logger.info(f"Starting YouTube video processing for URL: {youtube_url}")
         
-        # Configure yt-dlp options for first 5 minutes with a separate FFmpegPostProcessor
+        # Configure yt-dlp options for the first YOUTUBE_MAX_DURATION seconds with a separate FFmpegPostProcessor
         ydl_opts = {
             'format': 'bestaudio/best',
             'postprocessors': [{
@@ -114,7 +126,7 @@ def process_youtube_video(youtube_url, source_lang_code, target_lang_code, speec
             'outtmpl': os.path.join(upload_folder, '%(id)s.%(ext)s'),
             'postprocessor_args': [
                 '-ss', '00:00:00',
-                '-t', '60',      # Changed from 300 to 60 seconds (1 minute)
+                '-t', str(YOUTUBE_MAX_DURATION),  # Long audio is recognized in chunks, see long_audio.py
                 '-ar', '16000',  # Reduced to 16kHz for better compatibility
                 '-ac', '1',      # Mono audio
                 '-b:a', '64k'    # Explicitly set bitrate
@@ -124,6 +136,7 @@ def process_youtube_video(youtube_url, source_lang_code, target_lang_code, speec
         }
 
         # Download audio
+        report('downloading')
         current_app.logger.info("Attempting to download YouTube audio...")
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
             info = ydl.extract_info(youtube_url, download=True)
@@ -140,50 +153,52 @@ def process_youtube_video(youtube_url, source_lang_code, target_lang_code, speec
 
         current_app.logger.info(f"Successfully downloaded audio to: {audio_file}")
 
-        # Convert audio to FLAC for Google Speech-to-Text
-        current_app.logger.info("Converting audio to FLAC...")
-        flac_file = audio_file.replace('.mp3', '.flac')
+        # Decode the downloaded audio
+        report('converting')
+        current_app.logger.info("Decoding downloaded audio...")
         # Ensure the audio file actually exists before trying to load it
         if not os.path.exists(audio_file):
             raise FileNotFoundError(f"Downloaded MP3 file not found at expected path: {audio_file}")
         audio = AudioSegment.from_mp3(audio_file)
-        audio.export(flac_file, format="flac")
-        current_app.logger.info(f"Successfully converted audio to FLAC: {flac_file}")
-
-        # Read the audio file
-        current_app.logger.info("Reading FLAC audio content...")
-        with open(flac_file, "rb") as audio_file_content:
-            content = audio_file_content.read()
-        current_app.logger.info("FLAC audio content read.")
+        current_app.logger.info(f"Decoded {len(audio) / 1000:.1f}s of audio")
 
-        # Configure and perform speech recognition
+        # Split at silences and recognize the chunks in parallel
+        report('recognizing')
         current_app.logger.info(f"Performing speech recognition using language code: {source_lang_code}")
-        audio_rec_config = speech.RecognitionAudio(content=content) # Renamed to avoid confusion with pydub audio object
-        config = speech.RecognitionConfig(
-            encoding=speech.RecognitionConfig.AudioEncoding.FLAC,
-            language_code=source_lang_code,
-            enable_automatic_punctuation=True,
-        )
-        
-        # Get transcription
-        response = speech_client.recognize(config=config, audio=audio_rec_config)
-        original_transcript = " ".join([result.alternatives[0].transcript for result in response.results])
+        original_transcript = " ".join(recognize_long_audio_segments(audio, source_lang_code, speech_client))
+        if not original_transcript:
+            raise ValueError("Speech recognition could not understand the video audio.")
         current_app.logger.info(f"Transcription successful. Original text: {original_transcript}")
 
-        # Translate the transcript
+        # Translate and synthesize sentence by sentence
+        report('translating')
         current_app.logger.info(f"Translating text to target language code: {target_lang_code}")
         base_lang_code_for_gtts = target_lang_code.split('-')[0]
         source_base_lang = source_lang_code.split('-')[0]
-        translated_text = GoogleTranslator(source=source_base_lang, target=base_lang_code_for_gtts).translate(original_transcript)
-        current_app.logger.info(f"Translation successful. Translated text: {translated_text}")
 
-        # Generate translated audio using gTTS
-        current_app.logger.info("Generating translated audio using gTTS...")
-        tts = gTTS(text=translated_text, lang=base_lang_code_for_gtts)
-        tts_audio_filename = f"translated_{target_lang_code}_{uuid.uuid4().hex}.mp3"
-        tts_audio_path = os.path.join(upload_folder, tts_audio_filename)
-        tts.save(tts_audio_path)
-        current_app.logger.info(f"Translated audio saved to: {tts_audio_path}")
+        def synthesize(text):
+            buffer = io.BytesIO()
+            gTTS(text=text, lang=base_lang_code_for_gtts).write_to_fp(buffer)
+            return buffer.getvalue()
+
+        def segment_ready(index, segment):
+            report('synthesizing')
+            if on_segment:
+                on_segment(index, segment)
+
+        # Sentences are translated in one batch and synthesized in parallel with gTTS;
+        # identical sentences reuse the stored blob instead of calling gTTS again
+        translated_text, segments, tts_audio_filename = translate_and_synthesize_sentences(
+            transcript=original_transcript,
+            source_lang_code=source_base_lang,
+            target_lang_code=base_lang_code_for_gtts,
+            synthesize=synthesize,
+            audio_store=current_app.audio_store,
+            voice={'provider': 'gtts'},
+            on_segment=segment_ready
+        )
+        current_app.logger.info(f"Translation successful. Translated text: {translated_text}")
+        current_app.logger.info(f"Translated audio ready: {tts_audio_filename} ({len(segments)} sentence(s))")
 
         return original_transcript, tts_audio_filename, translated_text, None
 
@@ -202,7 +217,7 @@ def process_youtube_video(youtube_url, source_lang_code, target_lang_code, speec
 
     finally:
         current_app.logger.info("Cleaning up temporary files...")
-        for file_path in [audio_file, flac_file]:
+        for file_path in [audio_file]:
             if file_path and os.path.exists(file_path):
                 try:
                     os.remove(file_path)